@@ -0,0 +1,183 @@
+#! /usr/bin/python3
+
+import os
+import sys
+import json
+import glob
+import shlex
+import argparse
+import logging
+import subprocess
+
+from typing import Dict, List, Any
+
+POSE_TYPES = ["openpose", "mediapipe"]
+
+CONVERT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "preprocessing",
+                              "convert_and_split_data.py")
+
+CREATE_CORPUS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "create_synthetic_corpus.py")
+
+MEGABYTES = 1024 ** 2
+
+
+def get_total_size(paths: List[str]) -> int:
+    """
+
+    :param paths:
+    :return: Total size in bytes.
+    """
+    return sum([os.path.getsize(path) for path in paths])
+
+
+def run_conversion(corpus_dir: str, output_dir: str, pose_type: str, seed: int, dev_size: int, test_size: int,
+                   converter_args: List[str]) -> Dict[str, Any]:
+    """
+    Runs the converter in a separate process, so that its peak memory is not influenced by previous runs.
+
+    :param corpus_dir:
+    :param output_dir:
+    :param pose_type:
+    :param seed:
+    :param dev_size:
+    :param test_size:
+    :param converter_args: Additional arguments for the converter.
+    :return: Throughput statistics.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    output_prefix = "benchmark"
+
+    command = [sys.executable, CONVERT_SCRIPT,
+               "--download-sub", corpus_dir,
+               "--output-dir", output_dir,
+               "--output-prefix", output_prefix,
+               "--pose-type", pose_type,
+               "--seed", str(seed),
+               "--dev-size", str(dev_size),
+               "--test-size", str(test_size)] + converter_args
+
+    logging.debug("Executing: %s" % " ".join([shlex.quote(part) for part in command]))
+
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    report_path = os.path.join(output_dir, ".".join([output_prefix, pose_type, "report", "json"]))
+
+    with open(report_path, "r") as handle:
+        report = json.load(handle)
+
+    input_bytes = get_total_size(glob.glob(os.path.join(corpus_dir, pose_type, "*.%s.tar.xz" % pose_type)))
+    output_bytes = get_total_size(glob.glob(os.path.join(output_dir, "%s.%s.*.h5" % (output_prefix, pose_type))))
+
+    wall_seconds = report["wall_seconds"]
+
+    peak_rss_mb = report["peak_rss_mb"]
+    if report["max_worker_peak_rss_mb"] is not None:
+        peak_rss_mb = max(peak_rss_mb, report["max_worker_peak_rss_mb"])
+
+    return {"pose_type": pose_type,
+            "num_videos": report["num_videos"],
+            "num_examples": report["num_examples"],
+            "num_frames": report["num_frames"],
+            "wall_seconds": wall_seconds,
+            "cpu_seconds": report["cpu_seconds"],
+            "examples_per_second": report["num_examples"] / wall_seconds,
+            "frames_per_second": report["num_frames"] / wall_seconds,
+            "input_mb": input_bytes / MEGABYTES,
+            "input_mb_per_second": input_bytes / MEGABYTES / wall_seconds,
+            "output_mb": output_bytes / MEGABYTES,
+            "output_mb_per_second": output_bytes / MEGABYTES / wall_seconds,
+            "peak_rss_mb": peak_rss_mb,
+            "stages": report["stages"]}
+
+
+def print_results(results: List[Dict[str, Any]]):
+    """
+
+    :param results:
+    :return:
+    """
+    columns = ["pose_type", "num_videos", "num_examples", "num_frames", "wall_seconds", "examples_per_second",
+               "frames_per_second", "input_mb_per_second", "output_mb_per_second", "peak_rss_mb"]
+
+    print("\t".join(columns))
+
+    for result in results:
+        print("\t".join(["%.2f" % result[column] if isinstance(result[column], float) else str(result[column])
+                         for column in columns]))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--corpus-dir", type=str,
+                        help="Folder with a corpus in the same layout as a download folder. If it does not exist, "
+                             "a synthetic corpus is created there first.", required=True)
+    parser.add_argument("--output-dir", type=str,
+                        help="Folder for converted data, one subfolder for each pose type.", required=True)
+    parser.add_argument("--pose-types", type=str, nargs="+", default=POSE_TYPES, choices=POSE_TYPES,
+                        help="Pose types to benchmark (default: both).", required=False)
+    parser.add_argument("--num-videos", type=int, default=10,
+                        help="Number of videos if a synthetic corpus is created (default: 10).", required=False)
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Random seed for the synthetic corpus and data splits.", required=False)
+    parser.add_argument("--dev-size", type=int, default=0,
+                        help="Number of examples in dev set (default: 0).", required=False)
+    parser.add_argument("--test-size", type=int, default=0,
+                        help="Number of examples in test set (default: 0).", required=False)
+    parser.add_argument("--converter-args", type=str, default="",
+                        help="Additional arguments for convert_and_split_data.py, in one string, for instance "
+                             "--converter-args=\"--normalize-poses --num-workers 4\" (with '=', since the value "
+                             "starts with '--').", required=False)
+    parser.add_argument("--results", type=str, default=None,
+                        help="Also save results (including times of each stage) in this JSON file.",
+                        required=False)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    logging.debug(args)
+
+    if not os.path.exists(args.corpus_dir):
+        command = [sys.executable, CREATE_CORPUS_SCRIPT,
+                   "--output-dir", args.corpus_dir,
+                   "--num-videos", str(args.num_videos),
+                   "--seed", str(args.seed),
+                   "--pose-types"] + args.pose_types
+
+        logging.debug("Creating synthetic corpus: %s" % " ".join([shlex.quote(part) for part in command]))
+
+        subprocess.run(command, check=True)
+
+    results = []  # type: List[Dict[str, Any]]
+
+    for pose_type in args.pose_types:
+        result = run_conversion(corpus_dir=args.corpus_dir,
+                                output_dir=os.path.join(args.output_dir, pose_type),
+                                pose_type=pose_type,
+                                seed=args.seed,
+                                dev_size=args.dev_size,
+                                test_size=args.test_size,
+                                converter_args=shlex.split(args.converter_args))
+
+        logging.debug("%s: %.1f examples/s, %.1f frames/s, %.2f MB/s in, %.2f MB/s out, peak RSS %.1f MB" %
+                      (pose_type, result["examples_per_second"], result["frames_per_second"],
+                       result["input_mb_per_second"], result["output_mb_per_second"], result["peak_rss_mb"]))
+
+        results.append(result)
+
+    print_results(results)
+
+    if args.results is not None:
+        with open(args.results, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#! /usr/bin/python3
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+import numpy as np
+
+from typing import Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "preprocessing"))
+
+# noinspection PyUnresolvedReferences
+from convert_and_split_data import load_mediapipe_frames_dict, formatted_holistic_pose, MEDIAPIPE_COMPONENTS
+from pose_format import Pose
+from pose_format.numpy import NumPyPoseBody
+
+
+def load_mediapipe_frames_dict_per_frame(frames: Dict[int, Dict], fps: float = 24) -> Pose:
+    """
+    Previous implementation that decodes one frame at a time, kept as a reference for speed and correctness.
+
+    :param frames:
+    :param fps:
+    :return:
+    """
+
+    def load_mediapipe_frame(frame):
+        def load_landmarks(name, num_points: int):
+            points = [[float(p) for p in r.split(",")] for r in frame[name]["landmarks"]]
+            points = [(ps + [1.0])[:4] for ps in points]  # Add visibility to all points
+            if len(points) == 0:
+                points = [[0, 0, 0, 0] for _ in range(num_points)]
+            return np.array([[x, y, z] for x, y, z, c in points]), np.array([c for x, y, z, c in points])
+        face_data, face_confidence = load_landmarks("face_landmarks", 128)
+        body_data, body_confidence = load_landmarks("pose_landmarks", 33)
+        lh_data, lh_confidence = load_landmarks("left_hand_landmarks", 21)
+        rh_data, rh_confidence = load_landmarks("right_hand_landmarks", 21)
+        data = np.concatenate([body_data, face_data, lh_data, rh_data])
+        conf = np.concatenate([body_confidence, face_confidence, lh_confidence, rh_confidence])
+        return data, conf
+
+    def load_mediapipe_frames():
+        max_frames = int(max(frames.keys())) + 1
+        pose_body_data = np.zeros(shape=(max_frames, 1, 21 + 21 + 33 + 128, 3), dtype=np.float64)
+        pose_body_conf = np.zeros(shape=(max_frames, 1, 21 + 21 + 33 + 128), dtype=np.float64)
+        for frame_id, frame in frames.items():
+            data, conf = load_mediapipe_frame(frame)
+            pose_body_data[frame_id][0] = data
+            pose_body_conf[frame_id][0] = conf
+        return NumPyPoseBody(data=pose_body_data, confidence=pose_body_conf, fps=fps)
+
+    pose = formatted_holistic_pose()
+
+    pose.body = load_mediapipe_frames()
+
+    return pose
+
+
+def create_synthetic_frames(num_frames: int, missing_hand_rate: float) -> Dict[int, Dict]:
+    """
+    Frames in the same format as the JSON files in "*.mediapipe.tar.xz" archives. Pose landmarks have a visibility
+    value, all other components do not.
+
+    :param num_frames:
+    :param missing_hand_rate: Probability that a hand is not detected in a frame.
+    :return:
+    """
+    frames = {}  # type: Dict[int, Dict]
+
+    for frame_id in range(num_frames):
+        frame = {}
+
+        for name, num_points in MEDIAPIPE_COMPONENTS:
+            if "hand" in name and np.random.random() < missing_hand_rate:
+                frame[name] = {"landmarks": []}
+                continue
+
+            num_values = 4 if name == "pose_landmarks" else 3
+            points = np.random.random(size=(num_points, num_values))
+
+            frame[name] = {"landmarks": [",".join(["%.6f" % p for p in point]) for point in points]}
+
+        frames[frame_id] = frame
+
+    return frames
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--num-frames", type=int, default=5000,
+                        help="Number of frames per synthetic video (default: 5000, i.e. 200 seconds at 25 fps).",
+                        required=False)
+    parser.add_argument("--missing-hand-rate", type=float, default=0.3,
+                        help="Probability that a hand is missing in a frame.", required=False)
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Number of timed runs for each implementation, the fastest one is reported.",
+                        required=False)
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Random seed for synthetic frames.", required=False)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    logging.debug(args)
+
+    np.random.seed(args.seed)
+
+    frames = create_synthetic_frames(num_frames=args.num_frames, missing_hand_rate=args.missing_hand_rate)
+
+    timings = {}  # type: Dict[str, float]
+    poses = {}  # type: Dict[str, Pose]
+
+    for name, function in [("per_frame", load_mediapipe_frames_dict_per_frame),
+                           ("vectorized", load_mediapipe_frames_dict)]:
+        best = None
+
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            poses[name] = function(frames, fps=25)
+            seconds = time.perf_counter() - start
+
+            best = seconds if best is None else min(best, seconds)
+
+        timings[name] = best
+
+    reference, vectorized = poses["per_frame"].body, poses["vectorized"].body
+
+    # the reference decodes to float64, values must be the same after conversion to the decoded data type
+    assert np.array_equal(reference.data.astype(vectorized.data.dtype), vectorized.data), \
+        "Decoded data is different."
+    assert np.array_equal(reference.confidence.astype(vectorized.confidence.dtype), vectorized.confidence), \
+        "Decoded confidence is different."
+    assert reference.fps == vectorized.fps
+
+    for name, seconds in timings.items():
+        print("%s\t%.3f seconds\t%.0f frames/s" % (name, seconds, args.num_frames / seconds))
+
+    print("speedup\t%.2fx" % (timings["per_frame"] / timings["vectorized"]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+#! /usr/bin/python3
+
+import io
+import os
+import cv2
+import srt
+import json
+import tarfile
+import argparse
+import datetime
+import logging
+
+import numpy as np
+
+from typing import Dict, List
+
+# same order and number of points as in Openpose and Mediapipe output files
+
+OPENPOSE_COMPONENTS = [("pose_keypoints_2d", 25),
+                       ("face_keypoints_2d", 70),
+                       ("hand_left_keypoints_2d", 21),
+                       ("hand_right_keypoints_2d", 21)]
+
+MEDIAPIPE_COMPONENTS = [("pose_landmarks", 33),
+                        ("face_landmarks", 128),
+                        ("left_hand_landmarks", 21),
+                        ("right_hand_landmarks", 21)]
+
+POSE_TYPES = ["openpose", "mediapipe"]
+
+# fast compression, reading the archives takes about the same time with any preset
+XZ_PRESET = 1
+
+
+class RandomWalk:
+    """
+    Keypoints that move a little from frame to frame, so that synthetic poses compress like real ones.
+    """
+
+    def __init__(self, num_points: int, num_values: int, scale: float = 1.0):
+        """
+
+        :param num_points:
+        :param num_values: Number of coordinates per point.
+        :param scale: Range of coordinates.
+        """
+        self.scale = scale
+        self.points = np.random.random(size=(num_points, num_values)) * scale
+
+    def step(self) -> np.array:
+        """
+
+        :return: Points of the next frame.
+        """
+        self.points += np.random.normal(scale=0.002 * self.scale, size=self.points.shape)
+        self.points = np.clip(self.points, 0.0, self.scale)
+
+        return self.points
+
+
+def create_synthetic_mediapipe_frame(walks: Dict[str, RandomWalk], missing_hand_rate: float) -> Dict:
+    """
+    A frame in the same format as the JSON files in "*.mediapipe.tar.xz" archives. Pose landmarks have a visibility
+    value, all other components do not.
+
+    :param walks: Random walk of each component, see `create_mediapipe_walks`.
+    :param missing_hand_rate: Probability that a hand is not detected in a frame.
+    :return:
+    """
+    frame = {}
+
+    for name, num_points in MEDIAPIPE_COMPONENTS:
+        points = walks[name].step()
+
+        if "hand" in name and np.random.random() < missing_hand_rate:
+            frame[name] = {"landmarks": []}
+            continue
+
+        frame[name] = {"landmarks": [",".join(["%.6f" % p for p in point]) for point in points]}
+
+    return frame
+
+
+def create_mediapipe_walks() -> Dict[str, RandomWalk]:
+    """
+
+    :return:
+    """
+    return {name: RandomWalk(num_points=num_points, num_values=4 if name == "pose_landmarks" else 3)
+            for name, num_points in MEDIAPIPE_COMPONENTS}
+
+
+def create_synthetic_openpose_frame(walks: List[Dict[str, RandomWalk]], num_people: int,
+                                    missing_hand_rate: float) -> Dict:
+    """
+    A frame in the same format as the JSON files in "*.openpose.tar.xz" archives, with pixel coordinates and
+    confidence values. Keypoints of hands that are not detected have zero confidence.
+
+    :param walks: Random walks of each person, see `create_openpose_walks`.
+    :param num_people:
+    :param missing_hand_rate:
+    :return:
+    """
+    people = []
+
+    for person_walks in walks[:num_people]:
+        person = {"person_id": [-1]}
+
+        for name, num_points in OPENPOSE_COMPONENTS:
+            points = person_walks[name].step()
+
+            keypoints = np.concatenate([points, np.random.uniform(0.3, 1.0, size=(num_points, 1))], axis=1)
+
+            if "hand" in name and np.random.random() < missing_hand_rate:
+                keypoints[:] = 0.0
+
+            person[name] = [round(float(value), 3) for value in keypoints.flatten()]
+
+        people.append(person)
+
+    return {"version": 1.3, "people": people}
+
+
+def create_openpose_walks(max_people: int) -> List[Dict[str, RandomWalk]]:
+    """
+
+    :param max_people:
+    :return:
+    """
+    return [{name: RandomWalk(num_points=num_points, num_values=2, scale=1000.0)
+             for name, num_points in OPENPOSE_COMPONENTS}
+            for _ in range(max_people)]
+
+
+def add_json_member(tar_handle: tarfile.TarFile, name: str, obj: Dict):
+    """
+
+    :param tar_handle:
+    :param name:
+    :param obj:
+    :return:
+    """
+    content = json.dumps(obj).encode("utf-8")
+
+    member = tarfile.TarInfo(name)
+    member.size = len(content)
+
+    tar_handle.addfile(member, io.BytesIO(content))
+
+
+def write_openpose_archive(filepath: str, file_id: str, num_frames: int, missing_hand_rate: float,
+                           missing_person_rate: float, second_person_rate: float):
+    """
+    Writes "[corpus].[id].openpose.tar.xz" with one file per frame in the subfolder "openpose".
+
+    :param filepath:
+    :param file_id:
+    :param num_frames:
+    :param missing_hand_rate:
+    :param missing_person_rate: Probability that nobody is detected in a frame.
+    :param second_person_rate: Probability that a second person is detected in a frame.
+    :return:
+    """
+    walks = create_openpose_walks(max_people=2)
+
+    with tarfile.open(filepath, "w:xz", preset=XZ_PRESET) as tar_handle:
+        for frame_id in range(num_frames):
+            if np.random.random() < missing_person_rate:
+                num_people = 0
+            elif np.random.random() < second_person_rate:
+                num_people = 2
+            else:
+                num_people = 1
+
+            frame = create_synthetic_openpose_frame(walks=walks, num_people=num_people,
+                                                    missing_hand_rate=missing_hand_rate)
+
+            add_json_member(tar_handle, "openpose/%s_%012d_keypoints.json" % (file_id, frame_id), frame)
+
+
+def write_mediapipe_archive(filepath: str, num_frames: int, missing_hand_rate: float):
+    """
+    Writes "[corpus].[id].mediapipe.tar.xz" with one file per frame in the subfolder "poses".
+
+    :param filepath:
+    :param num_frames:
+    :param missing_hand_rate:
+    :return:
+    """
+    walks = create_mediapipe_walks()
+
+    with tarfile.open(filepath, "w:xz", preset=XZ_PRESET) as tar_handle:
+        for frame_id in range(num_frames):
+            frame = create_synthetic_mediapipe_frame(walks=walks, missing_hand_rate=missing_hand_rate)
+
+            add_json_member(tar_handle, "poses/%06d.json" % frame_id, frame)
+
+
+def write_video(filepath: str, fps: float, num_frames: int):
+    """
+    A tiny video that only serves to have the correct framerate and number of frames in its metadata.
+
+    :param filepath:
+    :param fps:
+    :param num_frames:
+    :return:
+    """
+    writer = cv2.VideoWriter(filepath, cv2.VideoWriter_fourcc(*"mp4v"), fps, (16, 16))
+
+    for frame_id in range(num_frames):
+        writer.write(np.full(shape=(16, 16, 3), fill_value=frame_id % 256, dtype=np.uint8))
+
+    writer.release()
+
+
+def create_subtitles(duration: float, min_subtitle_duration: float,
+                     max_subtitle_duration: float) -> List[srt.Subtitle]:
+    """
+    Consecutive subtitles with short pauses in between, covering the entire video.
+
+    :param duration: Duration of the video in seconds.
+    :param min_subtitle_duration:
+    :param max_subtitle_duration:
+    :return:
+    """
+    subtitles = []  # type: List[srt.Subtitle]
+
+    start = np.random.uniform(0.0, 1.0)
+
+    while start + min_subtitle_duration < duration:
+        end = min(duration, start + np.random.uniform(min_subtitle_duration, max_subtitle_duration))
+
+        subtitles.append(srt.Subtitle(index=len(subtitles) + 1,
+                                      start=datetime.timedelta(seconds=start),
+                                      end=datetime.timedelta(seconds=end),
+                                      content="Synthetischer Satz Nummer %d." % (len(subtitles) + 1)))
+
+        start = end + np.random.uniform(0.0, 0.5)
+
+    return subtitles
+
+
+def parse_framerates(framerates: str) -> List[float]:
+    """
+
+    :param framerates: For instance "25,50,29.97".
+    :return:
+    """
+    return [float(framerate) for framerate in framerates.split(",")]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--output-dir", type=str,
+                        help="Folder for the corpus, it will have the subfolders 'videos', 'subtitles' and one for "
+                             "each pose type (same layout as a download folder).", required=True)
+    parser.add_argument("--corpus-name", type=str, default="synthetic",
+                        help="First part of all file names (default: synthetic).", required=False)
+    parser.add_argument("--num-videos", type=int, default=10,
+                        help="Number of videos (default: 10).", required=False)
+    parser.add_argument("--min-duration", type=float, default=60.0,
+                        help="Minimum duration of videos in seconds (default: 60).", required=False)
+    parser.add_argument("--max-duration", type=float, default=300.0,
+                        help="Maximum duration of videos in seconds (default: 300).", required=False)
+    parser.add_argument("--framerates", type=str, default="25,25,50,30",
+                        help="Comma-separated framerates, assigned to videos in turn. Repeat a framerate to make "
+                             "it more frequent (default: 25,25,50,30).", required=False)
+    parser.add_argument("--pose-types", type=str, nargs="+", default=POSE_TYPES, choices=POSE_TYPES,
+                        help="Pose archives to create (default: both).", required=False)
+    parser.add_argument("--min-subtitle-duration", type=float, default=1.0,
+                        help="Minimum duration of subtitles in seconds (default: 1).", required=False)
+    parser.add_argument("--max-subtitle-duration", type=float, default=6.0,
+                        help="Maximum duration of subtitles in seconds (default: 6).", required=False)
+    parser.add_argument("--missing-hand-rate", type=float, default=0.3,
+                        help="Probability that a hand is missing in a frame (default: 0.3).", required=False)
+    parser.add_argument("--missing-person-rate", type=float, default=0.01,
+                        help="Probability that no person is detected in an Openpose frame (default: 0.01).",
+                        required=False)
+    parser.add_argument("--second-person-rate", type=float, default=0.05,
+                        help="Probability that a second person is detected in an Openpose frame (default: 0.05).",
+                        required=False)
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Random seed.", required=False)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    logging.debug(args)
+
+    np.random.seed(args.seed)
+
+    framerates = parse_framerates(args.framerates)
+
+    for folder in ["videos", "subtitles"] + args.pose_types:
+        os.makedirs(os.path.join(args.output_dir, folder), exist_ok=True)
+
+    total_frames = 0
+
+    for video_index in range(args.num_videos):
+        file_id = "%s.%03d" % (args.corpus_name, video_index)
+
+        fps = framerates[video_index % len(framerates)]
+        duration = np.random.uniform(args.min_duration, args.max_duration)
+        num_frames = int(duration * fps)
+
+        total_frames += num_frames
+
+        write_video(os.path.join(args.output_dir, "videos", file_id + ".mp4"), fps=fps, num_frames=num_frames)
+
+        subtitles = create_subtitles(duration=num_frames / fps,
+                                     min_subtitle_duration=args.min_subtitle_duration,
+                                     max_subtitle_duration=args.max_subtitle_duration)
+
+        with open(os.path.join(args.output_dir, "subtitles", file_id + ".srt"), "w") as handle:
+            handle.write(srt.compose(subtitles))
+
+        if "openpose" in args.pose_types:
+            write_openpose_archive(os.path.join(args.output_dir, "openpose", file_id + ".openpose.tar.xz"),
+                                   file_id=file_id,
+                                   num_frames=num_frames,
+                                   missing_hand_rate=args.missing_hand_rate,
+                                   missing_person_rate=args.missing_person_rate,
+                                   second_person_rate=args.second_person_rate)
+
+        if "mediapipe" in args.pose_types:
+            write_mediapipe_archive(os.path.join(args.output_dir, "mediapipe", file_id + ".mediapipe.tar.xz"),
+                                    num_frames=num_frames,
+                                    missing_hand_rate=args.missing_hand_rate)
+
+        logging.debug("Video %d/%d: %s, %g fps, %d frames, %d subtitles" %
+                      (video_index + 1, args.num_videos, file_id, fps, num_frames, len(subtitles)))
+
+    logging.debug("Created %d videos with %d frames in total." % (args.num_videos, total_frames))
+
+
+if __name__ == '__main__':
+    main()
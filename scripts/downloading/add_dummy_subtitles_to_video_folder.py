@@ -1,36 +1,16 @@
 #! /usr/bin/python3
 
 import os
-import cv2
+import sys
 import srt
 import argparse
 import datetime
 import logging
 
-from typing import Tuple
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "preprocessing"))
 
-
-def get_num_frames_and_fps(filename: str) -> Tuple[int, int]:
-    """
-    https://stackoverflow.com/a/60976166/1987598
-    """
-    cap = cv2.VideoCapture(filename)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    num_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-
-    cap.release()
-
-    return int(num_frames), fps
-
-
-def get_duration(filename: str) -> float:
-    """
-    https://stackoverflow.com/a/60976166/1987598
-    """
-    num_frames, fps = get_num_frames_and_fps(filename)
-    duration = float(num_frames) / float(fps)
-
-    return duration
+# noinspection PyUnresolvedReferences
+from video_manifest import update_manifest
 
 
 def get_subtitle_name(video_name: str) -> str:
@@ -62,6 +42,8 @@ def parse_args():
     parser.add_argument("--download-sub", type=str,
                         help="Input folder with original download data which has subfolders"
                              " 'openpose', 'mediapipe' and 'videos' - but not 'subtitles'.", required=True)
+    parser.add_argument("--num-workers", type=int, default=8,
+                        help="Number of videos probed in parallel.", required=False)
 
     args = parser.parse_args()
 
@@ -80,11 +62,13 @@ def main():
 
     os.makedirs(subtitle_folder, exist_ok=True)
 
-    for video_name in os.listdir(video_folder):
+    # durations are read from the manifest of the video folder (only new or changed videos are probed)
+
+    video_infos = update_manifest(video_dir=video_folder, num_workers=args.num_workers)
 
-        video_path = os.path.join(video_folder, video_name)
+    for video_name, video_info in video_infos.items():
 
-        duration = get_duration(video_path)
+        duration = video_info.duration
 
         subtitle_name = get_subtitle_name(video_name)
         subtitle_path = os.path.join(subtitle_folder, subtitle_name)
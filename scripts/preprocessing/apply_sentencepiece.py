@@ -6,14 +6,79 @@ import logging
 
 import sentencepiece as spm
 
+from typing import List, Iterator, IO
+
+
+def read_batches(handle: IO[str], batch_size: int) -> Iterator[List[str]]:
+    """
+
+    :param handle:
+    :param batch_size: Number of lines per batch.
+    :return:
+    """
+    batch = []  # type: List[str]
+
+    for line in handle:
+        batch.append(line.strip())
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
+def apply_sentencepiece(sp: spm.SentencePieceProcessor,
+                        input_handle: IO[str],
+                        output_handle: IO[str],
+                        batch_size: int,
+                        num_threads: int) -> int:
+    """
+    Each batch of lines is encoded in a single call, which encodes lines in parallel with several threads (and
+    returns them in their original order).
+
+    :param sp:
+    :param input_handle:
+    :param output_handle:
+    :param batch_size:
+    :param num_threads:
+    :return: Number of lines.
+    """
+    num_lines = 0
+
+    for batch in read_batches(input_handle, batch_size=batch_size):
+        pieces_by_line = sp.encode(batch, out_type=str, num_threads=num_threads)
+
+        output_handle.writelines([" ".join(pieces) + "\n" for pieces in pieces_by_line])
+
+        num_lines += len(batch)
+
+    return num_lines
+
 
 def parse_args():
     parser = argparse.ArgumentParser()
 
     parser.add_argument("--model", type=str, help="Path where model file is stored.", required=True)
+    parser.add_argument("--inputs", type=str, nargs="+", default=None,
+                        help="Input files, the model is loaded once for all of them. Default: read from STDIN.",
+                        required=False)
+    parser.add_argument("--outputs", type=str, nargs="+", default=None,
+                        help="One output file for each input file. Default: write to STDOUT.", required=False)
+    parser.add_argument("--batch-size", type=int, default=10000,
+                        help="Number of lines encoded at once (default: 10000).", required=False)
+    parser.add_argument("--num-threads", type=int, default=1,
+                        help="Number of threads that encode a batch (default: 1).", required=False)
 
     args = parser.parse_args()
 
+    if (args.inputs is None) != (args.outputs is None):
+        parser.error("--inputs and --outputs must be used together")
+
+    if args.inputs is not None and len(args.inputs) != len(args.outputs):
+        parser.error("--inputs and --outputs must have the same number of files")
+
     return args
 
 
@@ -26,13 +91,17 @@ def main():
 
     sp = spm.SentencePieceProcessor(model_file=args.model)
 
-    for line in sys.stdin:
-        line = line.strip()
+    if args.inputs is None:
+        apply_sentencepiece(sp, input_handle=sys.stdin, output_handle=sys.stdout, batch_size=args.batch_size,
+                            num_threads=args.num_threads)
+        return
 
-        pieces = sp.encode(line, out_type=str)
+    for input_path, output_path in zip(args.inputs, args.outputs):
+        with open(input_path, "r") as input_handle, open(output_path, "w") as output_handle:
+            num_lines = apply_sentencepiece(sp, input_handle=input_handle, output_handle=output_handle,
+                                            batch_size=args.batch_size, num_threads=args.num_threads)
 
-        pieces_line = " ".join(pieces)
-        print(pieces_line)
+        logging.debug("Encoded %d lines: %s -> %s" % (num_lines, input_path, output_path))
 
 
 if __name__ == '__main__':
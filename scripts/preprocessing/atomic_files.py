@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import contextlib
+
+from typing import IO, Iterator
+
+
+def get_default_file_mode() -> int:
+    """
+    Permissions of a new file created with `open`, as given by the umask of this process.
+
+    :return:
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+
+    return 0o666 & ~umask
+
+
+@contextlib.contextmanager
+def write_atomically(path: str, mode: str = "w") -> Iterator[IO]:
+    """
+    Yields a temporary file in the folder of `path`, which replaces `path` when the block ends, so that concurrent
+    readers never see a partial file. If the block raises an error, the temporary file is removed and `path` is
+    left as it was.
+
+    Temporary files are only readable by their owner, the file at `path` gets the usual permissions of new files
+    instead (folders such as caches can be shared by several users).
+
+    :param path:
+    :param mode: "w" for text, "wb" for binary files.
+    :return:
+    """
+    with tempfile.NamedTemporaryFile(mode=mode, dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp",
+                                     delete=False) as handle:
+        temp_path = handle.name
+
+        try:
+            yield handle
+        except BaseException:
+            handle.close()
+            os.remove(temp_path)
+            raise
+
+    os.chmod(temp_path, get_default_file_mode())
+    os.replace(temp_path, path)
+
+
+def copy_atomically(source_path: str, target_path: str):
+    """
+    Copy a file with `write_atomically`.
+
+    :param source_path:
+    :param target_path:
+    :return:
+    """
+    with open(source_path, "rb") as source_handle, write_atomically(target_path, mode="wb") as target_handle:
+        shutil.copyfileobj(source_handle, target_handle)
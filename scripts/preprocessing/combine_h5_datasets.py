@@ -1,20 +1,131 @@
 #! /usr/bin/python3
 
+import os
+import json
+import h5py
 import argparse
 import logging
 
+from typing import List
 
-# noinspection PyUnresolvedReferences
-from sockeye import h5_io
+from dataset_metadata import compute_metadata_from_h5, write_metadata
+
+
+COMBINE_MODES = ["bulk", "link", "iterate"]
+
+
+def expand_inputs(inputs: List[str]) -> List[str]:
+    """
+    Replace shard index files ([prefix].[pose type].[subset].shards.json) by the pose files of their shards.
+
+    :param inputs:
+    :return:
+    """
+    paths = []  # type: List[str]
+
+    for input_path in inputs:
+        if not input_path.endswith(".shards.json"):
+            paths.append(input_path)
+            continue
+
+        with open(input_path, "r") as handle:
+            index = json.load(handle)
+
+        shard_dir = os.path.dirname(input_path)
+
+        paths.extend([os.path.join(shard_dir, shard["poses"]) for shard in index["shards"]])
+
+    return paths
+
+
+def combine_iterate(input_paths: List[str], output_path: str):
+    """
+    Read every example as an array and write it again. Only this mode needs sockeye.
+
+    :param input_paths:
+    :param output_path:
+    :return:
+    """
+    # noinspection PyUnresolvedReferences
+    from sockeye import h5_io
+
+    readers = [h5_io.H5Reader(filename=input_path) for input_path in input_paths]
+
+    writer = h5_io.H5Writer(filename=output_path)
+
+    for reader in readers:
+        for sample in reader.iterate():
+            writer.add(sample)
+
+    writer.close()
+
+    for reader in readers:
+        reader.close()
+
+
+def combine_bulk(input_paths: List[str], output_path: str):
+    """
+    Copy the datasets of all inputs with their stored bytes, without decoding them into arrays (compressed
+    datasets stay compressed, with the same filters and chunks). Only their names change, to continue the
+    numbering of the previous inputs.
+
+    :param input_paths:
+    :param output_path:
+    :return:
+    """
+    offset = 0
+
+    with h5py.File(output_path, "w") as output_file:
+        for input_path in input_paths:
+            with h5py.File(input_path, "r") as input_file:
+                size = len(input_file.keys())
+
+                for index in range(size):
+                    h5py.h5o.copy(input_file.id, str(index).encode("ascii"),
+                                  output_file.id, str(offset + index).encode("ascii"))
+
+            offset += size
+
+
+def combine_link(input_paths: List[str], output_path: str):
+    """
+    Write a file that only has external links to the datasets of the inputs, nothing is copied. h5py resolves
+    the links transparently when examples are read, as long as the inputs exist at the same (relative) path.
+
+    :param input_paths:
+    :param output_path:
+    :return:
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+
+    offset = 0
+
+    with h5py.File(output_path, "w") as output_file:
+        for input_path in input_paths:
+            relative_path = os.path.relpath(os.path.abspath(input_path), output_dir)
+
+            with h5py.File(input_path, "r") as input_file:
+                size = len(input_file.keys())
+
+            for index in range(size):
+                output_file[str(offset + index)] = h5py.ExternalLink(relative_path, str(index))
+
+            offset += size
 
 
 def parse_args():
     parser = argparse.ArgumentParser()
 
     parser.add_argument("--inputs", type=str, nargs="+",
-                        help="Paths to 2 or more h5 datasets.", required=True)
+                        help="Paths to 2 or more h5 datasets, or shard index files ([prefix].[pose type].[subset]"
+                             ".shards.json) of sharded datasets.", required=True)
     parser.add_argument("--output", type=str,
                         help="Path where combined dataset should be stored.", required=True)
+    parser.add_argument("--mode", type=str, default="bulk", choices=COMBINE_MODES,
+                        help="'bulk': copy stored datasets without decoding them. 'link': only link to the "
+                             "datasets of the inputs, which must be kept (relative paths are resolved from the "
+                             "folder of the output). 'iterate': read and write each example as an array "
+                             "(default: bulk).", required=False)
 
     args = parser.parse_args()
 
@@ -27,18 +138,17 @@ def main():
     logging.basicConfig(level=logging.DEBUG)
     logging.debug(args)
 
-    readers = [h5_io.H5Reader(filename=input_path) for input_path in args.inputs]
+    input_paths = expand_inputs(args.inputs)
 
-    writer = h5_io.H5Writer(filename=args.output)
+    if args.mode == "bulk":
+        combine_bulk(input_paths=input_paths, output_path=args.output)
+    elif args.mode == "link":
+        combine_link(input_paths=input_paths, output_path=args.output)
+    else:
+        combine_iterate(input_paths=input_paths, output_path=args.output)
 
-    for reader in readers:
-        for sample in reader.iterate():
-            writer.add(sample)
-
-    writer.close()
-
-    for reader in readers:
-        reader.close()
+    # only reads the shapes of the combined examples
+    write_metadata(args.output, compute_metadata_from_h5(args.output))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,119 @@
+import os
+import json
+
+from typing import Dict, List, Any, Optional
+
+
+class ConversionJournal:
+    """
+    Append-only record of a conversion run, so that an interrupted run can be resumed. The first line has the
+    options of the run, then there is one line for each video whose examples are completely written (with the
+    size and text offset of each output subset at that point), and a last line once the run is complete.
+
+    Each line is flushed to disk before the next video is written, so after a crash the journal never refers to
+    examples that are not in the output files.
+    """
+
+    def __init__(self, path: str):
+        """
+
+        :param path:
+        """
+        self.path = path
+
+        self.options = None  # type: Optional[Dict[str, Any]]
+        self.entries = []  # type: List[Dict[str, Any]]
+        self.complete = False
+
+        self.handle = None
+
+    def read(self):
+        """
+        Load an existing journal. A partially written last line (from a crash while writing it) is ignored.
+
+        :return:
+        """
+        with open(self.path, "r") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+
+                if "options" in record:
+                    self.options = record["options"]
+                elif "complete" in record:
+                    self.complete = True
+                else:
+                    self.entries.append(record)
+
+    @property
+    def last_entry(self) -> Optional[Dict[str, Any]]:
+
+        if len(self.entries) == 0:
+            return None
+
+        return self.entries[-1]
+
+    def start(self, options: Dict[str, Any]):
+        """
+        Start a new journal, overwriting an existing one.
+
+        :param options:
+        :return:
+        """
+        self.options = options
+        self.entries = []
+        self.complete = False
+
+        self.handle = open(self.path, "w")
+        self.write_record({"options": options})
+
+    def resume(self):
+        """
+        Continue an existing journal. It is rewritten first (to remove a partial last line, if there is one), and
+        then replaces the existing journal in one step.
+
+        :return:
+        """
+        temp_path = self.path + ".tmp"
+
+        self.handle = open(temp_path, "w")
+
+        self.write_record({"options": self.options})
+
+        for entry in self.entries:
+            self.write_record(entry)
+
+        os.replace(temp_path, self.path)
+
+    def write_record(self, record: Dict[str, Any]):
+        """
+
+        :param record:
+        :return:
+        """
+        self.handle.write(json.dumps(record) + "\n")
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+
+    def commit(self, entry: Dict[str, Any]):
+        """
+
+        :param entry:
+        :return:
+        """
+        self.entries.append(entry)
+        self.write_record(entry)
+
+    def close(self, complete: bool = True):
+        """
+
+        :param complete: Whether all videos were converted.
+        :return:
+        """
+        if complete:
+            self.complete = True
+            self.write_record({"complete": True})
+
+        self.handle.close()
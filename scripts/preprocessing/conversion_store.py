@@ -0,0 +1,143 @@
+import os
+import json
+import fcntl
+import hashlib
+import logging
+import contextlib
+
+from typing import Dict, Any, List, Iterator
+
+
+COMPLETE_MARKER = "CONVERSION_DONE"
+
+LOCK_SUFFIX = ".lock"
+
+
+def get_download_checksum(download_sub: str, subfolders: List[str]) -> str:
+    """
+    Checksum of the names, sizes and modification times of all files in some subfolders of a download folder,
+    without reading them.
+
+    :param download_sub:
+    :param subfolders: For instance "subtitles", "videos" and the pose types.
+    :return:
+    """
+    files = []  # type: List[List[Any]]
+
+    for subfolder in subfolders:
+        for root, dirnames, filenames in os.walk(os.path.join(download_sub, subfolder)):
+            dirnames.sort()
+
+            for filename in sorted(filenames):
+                path = os.path.join(root, filename)
+                stat = os.stat(path)
+
+                files.append([os.path.relpath(path, download_sub), stat.st_size, stat.st_mtime_ns])
+
+    return hashlib.sha1(json.dumps(files).encode("utf-8")).hexdigest()
+
+
+def get_code_checksum(module_paths: List[str]) -> str:
+    """
+
+    :param module_paths: Source files of the code that converts data.
+    :return:
+    """
+    code_hash = hashlib.sha1()
+
+    for module_path in module_paths:
+        with open(module_path, "rb") as handle:
+            code_hash.update(handle.read())
+
+    return code_hash.hexdigest()
+
+
+def get_entry_dir(store_dir: str, name: str, key_options: Dict[str, Any]) -> str:
+    """
+    Entries are named by their corpus (or another readable name) and a hash of everything that affects the
+    converted data.
+
+    :param store_dir:
+    :param name:
+    :param key_options:
+    :return:
+    """
+    key = hashlib.sha1(json.dumps(key_options, sort_keys=True).encode("utf-8")).hexdigest()
+
+    return os.path.join(store_dir, ".".join([name, key]))
+
+
+@contextlib.contextmanager
+def locked_entry(entry_dir: str) -> Iterator[None]:
+    """
+    Only one process at a time can create an entry, other processes that need the same entry wait until it is
+    complete. The lock is released by the operating system if a process dies.
+
+    :param entry_dir:
+    :return:
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(entry_dir)), exist_ok=True)
+
+    with open(entry_dir + LOCK_SUFFIX, "w") as lock_handle:
+        fcntl.flock(lock_handle, fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+
+def entry_is_complete(entry_dir: str) -> bool:
+    """
+
+    :param entry_dir:
+    :return:
+    """
+    return os.path.exists(os.path.join(entry_dir, COMPLETE_MARKER))
+
+
+def mark_entry_complete(entry_dir: str, key_options: Dict[str, Any]):
+    """
+    The marker file also records the options of the entry, for humans.
+
+    :param entry_dir:
+    :param key_options:
+    :return:
+    """
+    marker_path = os.path.join(entry_dir, COMPLETE_MARKER)
+    temp_path = marker_path + ".tmp"
+
+    with open(temp_path, "w") as handle:
+        json.dump(key_options, handle, indent=2)
+
+    os.replace(temp_path, marker_path)
+
+
+def link_entry(entry_dir: str, output_dir: str) -> int:
+    """
+    Symlink all files of a complete entry into an output folder, replacing files with the same names. Linked files
+    are shared by all models that use the entry, they must not be modified in place.
+
+    :param entry_dir:
+    :param output_dir:
+    :return: Number of linked files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    entry_dir = os.path.abspath(entry_dir)
+
+    filenames = sorted([filename for filename in os.listdir(entry_dir) if filename != COMPLETE_MARKER])
+
+    for filename in filenames:
+        link_path = os.path.join(output_dir, filename)
+        temp_path = link_path + ".tmp"
+
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+
+        os.symlink(os.path.join(entry_dir, filename), temp_path)
+        os.replace(temp_path, link_path)
+
+    logging.debug("Linked %d files of '%s' into '%s'" % (len(filenames), entry_dir, output_dir))
+
+    return len(filenames)
@@ -2,85 +2,173 @@
 
 import os
 import re
+import sys
+import time
 import datetime
 import srt
-import cv2
+import json
 import tarfile
-import tempfile
+import cProfile
 import argparse
 import logging
+import hashlib
+import functools
+import resource
+import multiprocessing
 
 import numpy as np
+import numpy.ma as ma
 import mediapipe as mp
 
 from tqdm import tqdm
 from collections import Counter
-from typing import List, Dict, Iterator, Tuple, Optional
+from typing import List, Dict, Iterator, Tuple, Optional, IO, Set, NamedTuple, Any
 
-# noinspection PyUnresolvedReferences
-from sockeye import h5_io
 from pose_format import Pose, PoseHeader
 from pose_format.numpy import NumPyPoseBody
-from pose_format.pose_header import PoseHeaderDimensions
-from pose_format.utils.openpose_135 import load_openpose_135_directory
+from pose_format.pose_header import PoseHeaderDimensions, PoseNormalizationInfo
+from pose_format.utils.openpose_135 import OpenPose_Components as OpenPose_135_Components
 from pose_format.utils.holistic import holistic_components
-from pose_format.utils.openpose import load_frames_directory_dict
+from pose_format.utils.openpose import load_openpose, get_frame_id, OPENPOSE_FRAME_PATTERN
+from pose_format.utils.fast_math import distance_batch
+
+from pose_cache import PoseCache
+from h5_writer import H5DatasetWriter, H5_COMPRESSION_FILTERS, count_h5_examples
+from conversion_journal import ConversionJournal
+from instrumentation import STAGE_TIMER, StageTimer, timed, timed_stage, timed_iterator, subtract_stages, \
+    round_stages, get_peak_rss_mb
+from video_manifest import update_manifest
+from conversion_store import get_entry_dir, get_download_checksum, get_code_checksum, locked_entry, \
+    entry_is_complete, mark_entry_complete, link_entry
+from resample_poses import resample_pose_arrays, get_num_target_frames, get_source_frame_range, round_framerate, \
+    RESAMPLING_METHODS
 
 
 mp_holistic = mp.solutions.holistic
 FACEMESH_CONTOURS_POINTS = [str(p) for p in
                             sorted(set([p for p_tup in list(mp_holistic.FACEMESH_CONTOURS) for p in p_tup]))]
 
+MEDIAPIPE_FRAME_PATTERN = r"(?:^|\D)?(\d+).*?.json"
+
+
+def is_within_directory(directory: str, target: str) -> bool:
+    """
+
+    :param directory:
+    :param target:
+    :return:
+    """
+    abs_directory = os.path.abspath(directory)
+    abs_target = os.path.abspath(target)
+
+    prefix = os.path.commonprefix([abs_directory, abs_target])
+
+    return prefix == abs_directory
 
-def extract_tar_xz_file(filepath: str, target_dir: str):
+
+def iterate_tar_xz_members(filepath: str, member_dir: str) -> Iterator[Tuple[str, IO[bytes]]]:
     """
+    Stream the regular files in the subfolder `member_dir` of a tar.xz archive, without extracting anything to disk.
+    File objects are only valid until the next member is requested, since the archive is read as a stream.
 
     :param filepath:
-    :param target_dir:
-    :return:
-    """
-    with tarfile.open(filepath) as tar_handle:
-        def is_within_directory(directory, target):
-            
-            abs_directory = os.path.abspath(directory)
-            abs_target = os.path.abspath(target)
-        
-            prefix = os.path.commonprefix([abs_directory, abs_target])
-            
-            return prefix == abs_directory
-        
-        def safe_extract(tar, path=".", members=None, *, numeric_owner=False):
-        
-            for member in tar.getmembers():
-                member_path = os.path.join(path, member.name)
-                if not is_within_directory(path, member_path):
-                    raise Exception("Attempted Path Traversal in Tar File")
-        
-            tar.extractall(path, members, numeric_owner=numeric_owner) 
-            
-        
-        safe_extract(tar_handle, path=target_dir)
-
-
-def read_openpose_surrey_format(filepath: str, fps: int) -> Pose:
+    :param member_dir:
+    :return:
     """
-    Read files of the form "focusnews.071.openpose.tar.xz".
-    Assumes a 135 keypoint Openpose model.
+    # only used to detect members that would end up outside of the archive root if extracted
+    virtual_root = os.path.abspath("extract_pose_file")
+
+    with tarfile.open(filepath, mode="r|*") as tar_handle:
+        for member in tar_handle:
+            member_path = os.path.join(virtual_root, member.name)
+            if not is_within_directory(virtual_root, member_path):
+                raise Exception("Attempted Path Traversal in Tar File")
+
+            if not member.isfile():
+                continue
+
+            if os.path.dirname(os.path.normpath(member.name)) != member_dir:
+                continue
+
+            yield os.path.basename(member.name), tar_handle.extractfile(member)
+
+
+@timed("read_archive")
+def read_tar_xz_frames(filepath: str,
+                       member_dir: str,
+                       pattern: str,
+                       needed_frames: Optional[Set[int]] = None) -> Tuple[Dict[int, Dict], int]:
+    """
+    Streaming equivalent of extracting an archive and calling `load_frames_directory_dict` on one of its subfolders.
 
     :param filepath:
+    :param member_dir:
+    :param pattern: Regular expression to find frame IDs in file names.
+    :param needed_frames: If given, only these frames are parsed, all other frames are skipped.
+    :return: Tuple of (frames, number of frames in the archive, regardless of which frames were parsed).
+    """
+    frames = {}  # type: Dict[int, Dict]
+
+    max_frame_id = -1
+
+    for member_name, member_handle in iterate_tar_xz_members(filepath=filepath, member_dir=member_dir):
+        frame_id = get_frame_id(member_name, pattern=pattern)
+        max_frame_id = max(max_frame_id, frame_id)
+
+        if needed_frames is not None and frame_id not in needed_frames:
+            continue
+
+        content = member_handle.read()
+
+        with timed_stage("parse_json"):
+            frames[frame_id] = json.loads(content)
+
+    return frames, max_frame_id + 1
+
+
+@timed("decode_poses")
+def load_openpose_135_frames(frames: Dict[int, Dict],
+                             fps: float,
+                             num_frames: Optional[int] = None,
+                             dtype: np.dtype = np.float32) -> Pose:
+    """
+    Same as `load_openpose_135_directory` but for frames that are already loaded.
+
+    :param frames:
     :param fps:
+    :param num_frames:
+    :param dtype: Data type of pose data and confidence.
     :return:
     """
-    with tempfile.TemporaryDirectory(prefix="extract_pose_file") as tmpdir_name:
-        # extract tar.xz
-        extract_tar_xz_file(filepath=filepath, target_dir=tmpdir_name)
+    pose = load_openpose(frames, fps=fps, num_frames=num_frames)
 
-        openpose_dir = os.path.join(tmpdir_name, "openpose")
+    pose.body.data = pose.body.data[:, :, :135, :].astype(dtype, copy=False)
+    pose.body.confidence = pose.body.confidence[:, :, :135].astype(dtype, copy=False)
+    pose.header.components = OpenPose_135_Components
 
-        # load directory
-        poses = load_openpose_135_directory(directory=openpose_dir, fps=fps)
+    return pose
 
-    return poses
+
+def read_openpose_surrey_format(filepath: str,
+                                fps: float,
+                                needed_frames: Optional[Set[int]] = None,
+                                dtype: np.dtype = np.float32) -> Pose:
+    """
+    Read files of the form "focusnews.071.openpose.tar.xz".
+    Assumes a 135 keypoint Openpose model.
+
+    :param filepath:
+    :param fps:
+    :param needed_frames: If given, all other frames are left empty.
+    :param dtype:
+    :return:
+    """
+    frames, num_frames = read_tar_xz_frames(filepath=filepath,
+                                            member_dir="openpose",
+                                            pattern=OPENPOSE_FRAME_PATTERN,
+                                            needed_frames=needed_frames)
+
+    return load_openpose_135_frames(frames=frames, fps=fps, num_frames=num_frames, dtype=dtype)
 
 
 def formatted_holistic_pose():
@@ -94,59 +182,178 @@ def formatted_holistic_pose():
                                {"FACE_LANDMARKS": FACEMESH_CONTOURS_POINTS})
 
 
-def load_mediapipe_directory(directory: str, fps: float = 24) -> Pose:
+def parse_landmarks_rowwise(landmarks: List[str]) -> np.array:
     """
+    Slow path for landmark strings that do not all have the same number of values.
 
-    :param directory:
+    :param landmarks: Strings of the form "x,y,z" or "x,y,z,visibility".
+    :return: Array of shape (len(landmarks), 4).
+    """
+    points = [[float(p) for p in r.split(",")] for r in landmarks]
+    points = [(ps + [1.0])[:4] for ps in points]  # Add visibility to all points
+
+    return np.array(points, dtype=np.float64).reshape(-1, 4)
+
+
+def parse_landmarks(landmarks: List[str]) -> np.array:
+    """
+    Parse the landmark strings of many frames at once. Visibility is set to 1.0 for points that do not have it.
+
+    :param landmarks: Strings of the form "x,y,z" or "x,y,z,visibility".
+    :return: Array of shape (len(landmarks), 4).
+    """
+    num_rows = len(landmarks)
+
+    if num_rows == 0:
+        return np.zeros(shape=(0, 4), dtype=np.float64)
+
+    # text mode of fromstring parses in C without creating intermediate Python strings or floats, and stops early
+    # on malformed input (which then fails the size checks below)
+    values = np.fromstring(",".join(landmarks), dtype=np.float64, sep=",")
+
+    if values.size == num_rows * 4:
+        return values.reshape(num_rows, 4)
+
+    if values.size == num_rows * 3:
+        points = np.ones(shape=(num_rows, 4), dtype=np.float64)
+        points[:, :3] = values.reshape(num_rows, 3)
+        return points
+
+    return parse_landmarks_rowwise(landmarks)
+
+
+# order of components in the body array, with number of points
+MEDIAPIPE_COMPONENTS = [("pose_landmarks", 33),
+                        ("face_landmarks", 128),
+                        ("left_hand_landmarks", 21),
+                        ("right_hand_landmarks", 21)]
+
+
+@timed("decode_poses")
+def load_mediapipe_frames_dict(frames: Dict[int, Dict],
+                               fps: float = 24,
+                               num_frames: Optional[int] = None,
+                               dtype: np.dtype = np.float32) -> Pose:
+    """
+    Decodes all frames component by component: the landmark strings of all frames where a component is present
+    are parsed in a single call, and then copied into the preallocated body arrays at once. Frames where a
+    component is missing keep zeros for both data and confidence.
+
+    :param frames:
     :param fps:
+    :param num_frames: Number of frames if it cannot be derived from the frames, for instance because only
+                       some of the frames were loaded.
+    :param dtype: Data type of the body arrays. Landmarks are parsed as float64 and converted when they are copied
+                  into the body arrays.
     :return:
     """
+    if num_frames is None:
+        max_frames = int(max(frames.keys())) + 1
+    else:
+        max_frames = num_frames
+    total_points = sum([num_points for _, num_points in MEDIAPIPE_COMPONENTS])
 
-    frames = load_frames_directory_dict(directory=directory, pattern="(?:^|\D)?(\d+).*?.json")
+    pose_body_data = np.zeros(shape=(max_frames, 1, total_points, 3), dtype=dtype)
+    pose_body_conf = np.zeros(shape=(max_frames, 1, total_points), dtype=dtype)
 
-    def load_mediapipe_frame(frame):
-        def load_landmarks(name, num_points: int):
-            points = [[float(p) for p in r.split(",")] for r in frame[name]["landmarks"]]
-            points = [(ps + [1.0])[:4] for ps in points]  # Add visibility to all points
-            if len(points) == 0:
-                points = [[0, 0, 0, 0] for _ in range(num_points)]
-            return np.array([[x, y, z] for x, y, z, c in points]), np.array([c for x, y, z, c in points])
-        face_data, face_confidence = load_landmarks("face_landmarks", 128)
-        body_data, body_confidence = load_landmarks("pose_landmarks", 33)
-        lh_data, lh_confidence = load_landmarks("left_hand_landmarks", 21)
-        rh_data, rh_confidence = load_landmarks("right_hand_landmarks", 21)
-        data = np.concatenate([body_data, face_data, lh_data, rh_data])
-        conf = np.concatenate([body_confidence, face_confidence, lh_confidence, rh_confidence])
-        return data, conf
+    offset = 0
+
+    for name, num_points in MEDIAPIPE_COMPONENTS:
+        frame_ids = []  # type: List[int]
+        landmarks = []  # type: List[str]
 
-    def load_mediapipe_frames():
-        max_frames = int(max(frames.keys())) + 1
-        pose_body_data = np.zeros(shape=(max_frames, 1, 21 + 21 + 33 + 128, 3), dtype=np.float)
-        pose_body_conf = np.zeros(shape=(max_frames, 1, 21 + 21 + 33 + 128), dtype=np.float)
         for frame_id, frame in frames.items():
-            data, conf = load_mediapipe_frame(frame)
-            pose_body_data[frame_id][0] = data
-            pose_body_conf[frame_id][0] = conf
-        return NumPyPoseBody(data=pose_body_data, confidence=pose_body_conf, fps=fps)
+            frame_landmarks = frame[name]["landmarks"]
+
+            if len(frame_landmarks) == 0:
+                continue
+
+            if len(frame_landmarks) != num_points:
+                raise ValueError("Expected %d points for '%s' but found %d in frame %d." %
+                                 (num_points, name, len(frame_landmarks), frame_id))
+
+            frame_ids.append(frame_id)
+            landmarks.extend(frame_landmarks)
+
+        points = parse_landmarks(landmarks).reshape(len(frame_ids), num_points, 4)
+
+        pose_body_data[frame_ids, 0, offset:offset + num_points] = points[:, :, :3]
+        pose_body_conf[frame_ids, 0, offset:offset + num_points] = points[:, :, 3]
+
+        offset += num_points
 
     pose = formatted_holistic_pose()
 
-    pose.body = load_mediapipe_frames()
+    pose.body = NumPyPoseBody(data=pose_body_data, confidence=pose_body_conf, fps=fps)
 
     return pose
 
 
-def read_mediapipe_surrey_format(filepath: str, fps: int) -> Pose:
+def read_mediapipe_surrey_format(filepath: str,
+                                 fps: float,
+                                 needed_frames: Optional[Set[int]] = None,
+                                 dtype: np.dtype = np.float32) -> Pose:
     """
     Read files of the form "focusnews.103.mediapipe.tar.xz"
     """
-    with tempfile.TemporaryDirectory(prefix="extract_pose_file") as tmpdir_name:
-        # extract tar.xz
-        extract_tar_xz_file(filepath=filepath, target_dir=tmpdir_name)
-        poses_dir = os.path.join(tmpdir_name, "poses")
-        # load directory
-        pose = load_mediapipe_directory(directory=poses_dir, fps=fps)
-    return pose
+    frames, num_frames = read_tar_xz_frames(filepath=filepath,
+                                            member_dir="poses",
+                                            pattern=MEDIAPIPE_FRAME_PATTERN,
+                                            needed_frames=needed_frames)
+
+    return load_mediapipe_frames_dict(frames=frames, fps=fps, num_frames=num_frames, dtype=dtype)
+
+
+def read_pose_file(filepath: str,
+                   fps: float,
+                   needed_frames: Optional[Set[int]] = None,
+                   dtype: np.dtype = np.float32) -> Pose:
+    """
+    Read a pose file in either the Openpose or Mediapipe Surrey format, depending on its name.
+
+    :param filepath:
+    :param fps:
+    :param needed_frames: If given, only these frames are decoded, all other frames are left empty.
+    :param dtype: Data type of pose data and confidence.
+    :return:
+    """
+    filename = os.path.basename(filepath)
+
+    if "openpose" in filename:
+        return read_openpose_surrey_format(filepath=filepath, fps=fps, needed_frames=needed_frames, dtype=dtype)
+    elif "mediapipe" in filename:
+        return read_mediapipe_surrey_format(filepath=filepath, fps=fps, needed_frames=needed_frames, dtype=dtype)
+    else:
+        raise ValueError("Cannot make sense of pose file: '%s'." % filename)
+
+
+def read_pose_file_cached(filepath: str,
+                          fps: float,
+                          pose_cache: Optional[PoseCache],
+                          dtype: np.dtype = np.float32) -> Pose:
+    """
+    Read a pose file, or get its decoded poses from the cache if possible. Poses decoded with another data type
+    are cached separately.
+
+    :param filepath:
+    :param fps:
+    :param pose_cache:
+    :param dtype:
+    :return:
+    """
+    if pose_cache is None:
+        return read_pose_file(filepath=filepath, fps=fps, dtype=dtype)
+
+    with timed_stage("pose_cache"):
+        poses = pose_cache.get(filepath=filepath, fps=fps, dtype=dtype)
+
+    if poses is None:
+        poses = read_pose_file(filepath=filepath, fps=fps, dtype=dtype)
+
+        with timed_stage("pose_cache"):
+            pose_cache.put(filepath=filepath, fps=fps, dtype=dtype, pose=poses)
+
+    return poses
 
 
 def get_file_id(filename: str) -> str:
@@ -163,7 +370,7 @@ def get_file_id(filename: str) -> str:
     return parts[1]
 
 
-def subtitle_is_usable(subtitle: srt.Subtitle, fps: int) -> bool:
+def subtitle_is_usable(subtitle: srt.Subtitle, fps: float) -> bool:
     """
 
     :param subtitle:
@@ -186,43 +393,37 @@ def subtitle_is_usable(subtitle: srt.Subtitle, fps: int) -> bool:
     return True
 
 
-def get_framerate(filename: str) -> int:
-    """
-    Get framerate from mp4 video.
-
-    :param filename:
-    :return:
+def read_video_framerates(video_dir: str, num_workers: int = 1, target_fps: Optional[float] = None) -> Dict[str, float]:
     """
-    cap = cv2.VideoCapture(filename)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-
-    cap.release()
-
-    return int(fps)
-
+    Framerates are taken from the manifest of the video folder, only new or changed videos are probed.
 
-def read_video_framerates(video_dir: str) -> Dict[str, int]:
-    """
+    Without resampling, framerates are truncated to whole numbers as in the original conversion (29.97 becomes 29),
+    so that frame counts and the mapping of subtitle times to frames do not change. Resampling uses the exact
+    framerate, see `round_framerate`.
 
     :param video_dir:
+    :param num_workers:
+    :param target_fps: Framerate that poses are resampled to, None if they are not resampled.
     :return:
     """
-    framerate_by_id = {}  # type: Dict[str, int]
+    framerate_by_id = {}  # type: Dict[str, float]
 
-    for filename in os.listdir(video_dir):
-        filepath = os.path.join(video_dir, filename)
+    video_infos = update_manifest(video_dir=video_dir, num_workers=num_workers)
 
+    for filename, video_info in video_infos.items():
         file_id = get_file_id(filename)
-        framerate = get_framerate(filepath)
 
-        framerate_by_id[file_id] = framerate
+        if target_fps is None:
+            framerate_by_id[file_id] = int(video_info.fps)
+        else:
+            framerate_by_id[file_id] = round_framerate(video_info.fps)
 
     return framerate_by_id
 
 
 def read_subtitles(subtitle_dir: str,
-                   framerate_by_id: Dict[str, int],
-                   target_fps: Optional[int],) -> Tuple[Dict[str, List[srt.Subtitle]], int]:
+                   framerate_by_id: Dict[str, float],
+                   target_fps: Optional[float],) -> Tuple[Dict[str, List[srt.Subtitle]], int]:
     """
 
     :param subtitle_dir:
@@ -262,7 +463,7 @@ def read_subtitles(subtitle_dir: str,
     return subtitles_by_id, num_subtitles_skipped
 
 
-def miliseconds_to_frame_index(miliseconds: int, fps: int) -> int:
+def miliseconds_to_frame_index(miliseconds: int, fps: float) -> int:
     """
     :param miliseconds:
     :param fps:
@@ -271,7 +472,7 @@ def miliseconds_to_frame_index(miliseconds: int, fps: int) -> int:
     return int(fps * (miliseconds / 1000))
 
 
-def convert_srt_time_to_frame(srt_time: datetime.timedelta, fps: int) -> int:
+def convert_srt_time_to_frame(srt_time: datetime.timedelta, fps: float) -> int:
     """
     datetime.timedelta(seconds=4, microseconds=71000)
 
@@ -286,14 +487,19 @@ def convert_srt_time_to_frame(srt_time: datetime.timedelta, fps: int) -> int:
     return miliseconds_to_frame_index(miliseconds=miliseconds, fps=fps)
 
 
+@timed("slice")
 def reduce_pose_slice(pose_slice: np.array) -> np.array:
     """
-    Keep only the first person and reduce to 2 dimensions
+    Keep only the first person and reduce to 2 dimensions. For slices of a decoded video this is a view, nothing
+    is copied before the slice is written.
 
     :param pose_slice:
     :return:
     """
 
+    # the mask of masked arrays is not written to H5 files, only the underlying data
+    pose_slice = ma.getdata(pose_slice)
+
     # alternative: brackets around [0] to keep dimension
     pose_slice = pose_slice[:, 0, :, :]
 
@@ -318,93 +524,230 @@ def get_subtitle_content(subtitle: srt.Subtitle) -> str:
     return content
 
 
-def convert_fps_30_to_25(poses: Pose) -> Pose:
+def convert_pose_framerate(poses: Pose,
+                           video_fps: float,
+                           target_fps: Optional[float],
+                           resampling_method: str = "drop") -> Pose:
     """
-    Based on:
-    https://stackoverflow.com/a/21922346/1987598
+    Resample poses of an entire video to any other framerate, see `resample_pose_arrays`.
 
     :param poses:
+    :param video_fps:
+    :param target_fps:
+    :param resampling_method:
     :return:
     """
-    delete_indexes = np.arange(0, poses.body.data.shape[0], 6)
 
-    new_data = np.delete(poses.body.data, delete_indexes, axis=0)
-    new_confidence = np.delete(poses.body.confidence, delete_indexes, axis=0)
+    # base case
+    if video_fps == target_fps or target_fps is None:
+        return poses
+
+    new_data, new_confidence = resample_pose_arrays(data=poses.body.data,
+                                                    confidence=poses.body.confidence,
+                                                    video_fps=video_fps,
+                                                    target_fps=target_fps,
+                                                    method=resampling_method)
 
-    new_posebody = NumPyPoseBody(fps=25, data=new_data, confidence=new_confidence)
+    new_posebody = NumPyPoseBody(fps=target_fps, data=new_data, confidence=new_confidence)
 
     return Pose(header=poses.header, body=new_posebody)
 
 
-def convert_pose_framerate(poses: Pose, video_fps: int, target_fps: Optional[int]) -> Pose:
+def get_normalization_info(header: PoseHeader, pose_type: str) -> PoseNormalizationInfo:
     """
+    Poses are normalized by shoulder width.
 
-    :param poses:
-    :param video_fps:
-    :param target_fps:
+    :param header:
+    :param pose_type:
     :return:
     """
-
-    # base case
-    if video_fps == target_fps or target_fps is None:
-        return poses
-    elif video_fps == (2 * target_fps):
-        return poses.slice_step(2)
-    elif video_fps == 30 and target_fps == 25:
-        return convert_fps_30_to_25(poses)
+    if pose_type == "openpose":
+        return header.normalization_info(
+            p1=("BODY_135", "RShoulder"),
+            p2=("BODY_135", "LShoulder")
+        )
+    elif pose_type == "mediapipe":
+        return header.normalization_info(
+            p1=("POSE_LANDMARKS", "RIGHT_SHOULDER"),
+            p2=("POSE_LANDMARKS", "LEFT_SHOULDER")
+        )
     else:
-        raise ValueError("Cannot convert between video_fps: %d and target_fps: %d." % (video_fps, target_fps))
+        raise ValueError("Don't know how to normalize pose_type: %s" % pose_type)
 
 
-def get_normalized_poses_openpose(poses: Pose) -> Pose:
+@timed("normalize")
+def get_normalized_poses(poses: Pose, pose_type: str) -> Pose:
     """
 
     :param poses:
+    :param pose_type:
     :return:
     """
-    normalization_info = poses.header.normalization_info(
-        p1=("BODY_135", "RShoulder"),
-        p2=("BODY_135", "LShoulder")
-    )
+    normalization_info = get_normalization_info(header=poses.header, pose_type=pose_type)
 
     return poses.normalize(normalization_info)
 
 
-def get_normalized_poses_mediapipe(poses: Pose) -> Pose:
+class PointSelection(NamedTuple):
     """
+    Components and points to keep, in the format of `Pose.get_components`: components in the order they should
+    have, and for some of them the names of the points to keep (all points of other components are kept).
+    """
+    components: List[str]
+    points: Dict[str, List[str]]
 
-    :param poses:
+
+def get_template_pose(pose_type: str) -> Pose:
+    """
+    Pose with the same header as decoded poses of this type, and a single empty frame.
+
+    :param pose_type:
     :return:
     """
-    normalization_info = poses.header.normalization_info(
-         p1=("POSE_LANDMARKS", "RIGHT_SHOULDER"),
-         p2=("POSE_LANDMARKS", "LEFT_SHOULDER")
-    )
+    if pose_type == "openpose":
+        dimensions = PoseHeaderDimensions(width=1000, height=1000, depth=0)
+        header = PoseHeader(version=0.1, dimensions=dimensions, components=OpenPose_135_Components)
+        body = NumPyPoseBody(fps=25,
+                             data=np.zeros(shape=(1, 1, header.total_points(), 2)),
+                             confidence=np.zeros(shape=(1, 1, header.total_points())))
+        return Pose(header, body)
+    elif pose_type == "mediapipe":
+        return formatted_holistic_pose()
+    else:
+        raise ValueError("Unknown pose_type: %s" % pose_type)
 
-    return poses.normalize(normalization_info)
 
+def get_num_features(header: PoseHeader) -> int:
+    """
+    Number of values per frame in the H5 files: all points, each with all dimensions except confidence.
 
-def get_normalized_poses(poses: Pose, pose_type: str) -> Pose:
+    :param header:
+    :return:
     """
+    return sum([len(component.points) * (len(component.format) - 1) for component in header.components])
+
+
+def parse_point_selection(pose_type: str,
+                          components: Optional[List[str]],
+                          points: Optional[List[str]],
+                          normalize_poses: bool) -> Optional[PointSelection]:
+    """
+    Checks a selection of components and points against the header of a pose type.
 
-    :param poses:
     :param pose_type:
+    :param components: Component names, for instance ["POSE_LANDMARKS", "LEFT_HAND_LANDMARKS"]. Default: all.
+    :param points: Strings of the form "[component]:[point],[point],...", for instance
+                   "BODY_135:LShoulder,RShoulder,LElbow,RElbow". Default: all points of each component.
+    :param normalize_poses: If poses are normalized, the points used for normalization must be selected.
+    :return: None if nothing is left out.
+    """
+    if components is None and points is None:
+        return None
+
+    header = get_template_pose(pose_type).header
+
+    points_by_component = {component.name: component.points for component in header.components}
+
+    if components is None:
+        components = [component.name for component in header.components]
+
+    for component in components:
+        if component not in points_by_component:
+            raise ValueError("Unknown component '%s' for %s, choose from: %s" %
+                             (component, pose_type, ", ".join(points_by_component.keys())))
+
+    selected_points = {}  # type: Dict[str, List[str]]
+
+    for point_spec in points or []:
+        component, _, names = point_spec.partition(":")
+
+        if component not in components:
+            raise ValueError("Points are selected for component '%s', but it is not one of the selected "
+                             "components: %s" % (component, ", ".join(components)))
+
+        names = names.split(",")
+
+        for name in names:
+            if name not in points_by_component[component]:
+                raise ValueError("Unknown point '%s' in component '%s', choose from: %s" %
+                                 (name, component, ", ".join(points_by_component[component])))
+
+        selected_points[component] = names
+
+    selection = PointSelection(components=components, points=selected_points)
+
+    if normalize_poses:
+        selected_header = select_points(get_template_pose(pose_type), selection).header
+        try:
+            get_normalization_info(header=selected_header, pose_type=pose_type)
+        except ValueError:
+            raise ValueError("The selected points must include both shoulders to normalize poses.")
+
+    return selection
+
+
+@timed("select_points")
+def select_points(poses: Pose, point_selection: Optional[PointSelection]) -> Pose:
+    """
+
+    :param poses:
+    :param point_selection:
+    :return: A copy with only the selected points, or the same poses if there is no selection.
+    """
+    if point_selection is None:
+        return poses
+
+    selected = poses.get_components(point_selection.components, point_selection.points)
+
+    # get_components always returns masked arrays, but masking changes how poses are normalized
+    if not isinstance(poses.body.data, ma.MaskedArray):
+        selected.body.data = ma.getdata(selected.body.data)
+
+    return selected
+
+
+def get_needed_source_frames(subtitles: List[srt.Subtitle],
+                             video_fps: float,
+                             target_fps: Optional[float]) -> Set[int]:
+    """
+    Frames of the original video that are needed to extract the pose slices of these subtitles. If poses are
+    converted to a different framerate, these are the source frames that resampling maps to.
+
+    :param subtitles:
+    :param video_fps:
+    :param target_fps:
     :return:
     """
-    if pose_type == "openpose":
-        return get_normalized_poses_openpose(poses)
-    elif pose_type == "mediapipe":
-        return get_normalized_poses_mediapipe(poses)
+    needed_frames = set()  # type: Set[int]
+
+    if target_fps is None:
+        subtitle_fps = video_fps
     else:
-        raise ValueError("Don't know how to normalize pose_type: %s" % pose_type)
+        subtitle_fps = target_fps
+
+    for subtitle in subtitles:
+        start_frame = convert_srt_time_to_frame(subtitle.start, fps=subtitle_fps)
+        end_frame = convert_srt_time_to_frame(subtitle.end, fps=subtitle_fps)
+
+        if subtitle_fps != video_fps:
+            start_frame, end_frame = get_source_frame_range(start_frame=start_frame,
+                                                            end_frame=end_frame,
+                                                            video_fps=video_fps,
+                                                            target_fps=subtitle_fps)
+
+        needed_frames.update(range(start_frame, end_frame))
+
+    return needed_frames
 
 
 def extract_parallel_examples(subtitles: List[srt.Subtitle],
                               poses: Pose,
-                              video_fps: int,
-                              target_fps: Optional[int],
+                              video_fps: float,
+                              target_fps: Optional[float],
                               normalize_poses: bool,
-                              pose_type: str) -> Iterator[Tuple[str, np.array]]:
+                              pose_type: str,
+                              resampling_method: str = "drop",
+                              resample_slices_only: bool = False) -> Iterator[Tuple[str, np.array]]:
     """
 
     :param subtitles: Example:
@@ -417,14 +760,32 @@ def extract_parallel_examples(subtitles: List[srt.Subtitle],
     :param target_fps:
     :param normalize_poses:
     :param pose_type:
+    :param resampling_method:
+    :param resample_slices_only: If poses are converted to a different framerate, resample only the frames of
+                                 each subtitle instead of the entire video. Normalization is then computed on
+                                 the original frames.
     :return:
     """
-    poses = convert_pose_framerate(poses=poses, video_fps=video_fps, target_fps=target_fps)
+    resample_slices = resample_slices_only and target_fps is not None and video_fps != target_fps
 
-    if normalize_poses:
-        poses = get_normalized_poses(poses=poses, pose_type=pose_type)
+    if resample_slices:
+        if normalize_poses:
+            poses = get_normalized_poses(poses=poses, pose_type=pose_type)
+
+        pose_num_frames = get_num_target_frames(num_frames=poses.body.data.shape[0],
+                                                video_fps=video_fps,
+                                                target_fps=target_fps,
+                                                method=resampling_method)
+    else:
+        poses = convert_pose_framerate(poses=poses,
+                                       video_fps=video_fps,
+                                       target_fps=target_fps,
+                                       resampling_method=resampling_method)
+
+        if normalize_poses:
+            poses = get_normalized_poses(poses=poses, pose_type=pose_type)
 
-    pose_num_frames = poses.body.data.shape[0]
+        pose_num_frames = poses.body.data.shape[0]
 
     assert pose_num_frames > 0, "Pose object for entire video has zero frames."
 
@@ -448,7 +809,16 @@ def extract_parallel_examples(subtitles: List[srt.Subtitle],
                           (end_frame, pose_num_frames, str(subtitle)))
             end_frame = pose_num_frames
 
-        pose_slice = poses.body.data[start_frame:end_frame]
+        if resample_slices:
+            pose_slice, _ = resample_pose_arrays(data=poses.body.data,
+                                                 confidence=poses.body.confidence,
+                                                 video_fps=video_fps,
+                                                 target_fps=target_fps,
+                                                 method=resampling_method,
+                                                 start_frame=start_frame,
+                                                 end_frame=end_frame)
+        else:
+            pose_slice = poses.body.data[start_frame:end_frame]
 
         pose_slice = reduce_pose_slice(pose_slice)
 
@@ -457,116 +827,965 @@ def extract_parallel_examples(subtitles: List[srt.Subtitle],
         yield subtitle_content, pose_slice
 
 
-class ParallelWriter:
+class FrameChunkReader:
+    """
+    Decodes the frames of a pose archive in chunks of consecutive archive members, so that only one chunk of
+    frames is in memory at a time. Frames are numbered from 0 within each chunk, their IDs in the video are
+    returned alongside.
+    """
 
-    def __init__(self, output_dir: str, pose_type: str, subset: str, output_prefix: str,
-                 max_size: Optional[int] = None):
+    def __init__(self,
+                 filepath: str,
+                 fps: float,
+                 chunk_size: int,
+                 needed_frames: Optional[Set[int]] = None,
+                 dtype: np.dtype = np.float32,
+                 point_selection: Optional[PointSelection] = None):
         """
 
-        :param output_dir:
-        :param pose_type:
-        :param subset:
-        :param output_prefix:
-        :param max_size:
+        :param filepath:
+        :param fps:
+        :param chunk_size: Maximum number of frames decoded at once.
+        :param needed_frames: If given, all other frames are skipped.
+        :param dtype:
+        :param point_selection: If given, decoded chunks only have these points.
         """
-        self.output_dir = output_dir
-        self.pose_type = pose_type
+        self.filepath = filepath
+        self.fps = fps
+        self.chunk_size = max(chunk_size, 1)
+        self.needed_frames = needed_frames
+        self.dtype = dtype
+        self.point_selection = point_selection
 
-        assert subset in ["train", "dev", "test"]
+        filename = os.path.basename(filepath)
 
-        self.subset = subset
-        self.output_prefix = output_prefix
-        self.max_size = max_size
+        if "openpose" in filename:
+            self.member_dir, self.pattern = "openpose", OPENPOSE_FRAME_PATTERN
+        elif "mediapipe" in filename:
+            self.member_dir, self.pattern = "poses", MEDIAPIPE_FRAME_PATTERN
+        else:
+            raise ValueError("Cannot make sense of pose file: '%s'." % filename)
 
-        text_output_name = ".".join([self.output_prefix, self.subset, "txt"])
-        self.text_output_path = os.path.join(self.output_dir, text_output_name)
-        self.text_writer = open(self.text_output_path, "w")
+        # only known after all chunks were read
+        self.num_frames = 0
 
-        poses_output_name = ".".join([self.output_prefix, self.pose_type, self.subset, "h5"])
-        self.poses_output_path = os.path.join(self.output_dir, poses_output_name)
-        self.pose_writer = h5_io.H5Writer(filename=self.poses_output_path)
+    def decode_chunk(self, frames: Dict[int, Dict]) -> Tuple[List[int], Pose]:
+        """
 
-        self.size = 0
+        :param frames:
+        :return: Tuple of (frame IDs, poses of these frames).
+        """
+        frame_ids = sorted(frames.keys())
+        chunk_frames = {index: frames[frame_id] for index, frame_id in enumerate(frame_ids)}
 
-    def close(self):
-        self.text_writer.close()
-        self.pose_writer.close()
+        if self.member_dir == "openpose":
+            poses = load_openpose_135_frames(frames=chunk_frames, fps=self.fps, num_frames=len(frame_ids),
+                                             dtype=self.dtype)
+        else:
+            poses = load_mediapipe_frames_dict(frames=chunk_frames, fps=self.fps, num_frames=len(frame_ids),
+                                               dtype=self.dtype)
 
-    def add(self, text: str, pose_slice: np.array):
+        return frame_ids, select_points(poses=poses, point_selection=self.point_selection)
 
-        if self.max_size is not None:
-            assert self.size < self.max_size, "Reached maximum size of %d, refusing to add more examples." % self.max_size
+    def __iter__(self) -> Iterator[Tuple[List[int], Pose]]:
+        frames = {}  # type: Dict[int, Dict]
 
-        self.text_writer.write(text + "\n")
-        self.pose_writer.add(pose_slice)
+        max_frame_id = -1
 
-        self.size += 1
+        members = iterate_tar_xz_members(filepath=self.filepath, member_dir=self.member_dir)
 
-    @property
-    def writable(self) -> bool:
+        for member_name, member_handle in timed_iterator(members, "read_archive"):
+            frame_id = get_frame_id(member_name, pattern=self.pattern)
+            max_frame_id = max(max_frame_id, frame_id)
 
-        if self.max_size is None:
-            return True
+            if self.needed_frames is not None and frame_id not in self.needed_frames:
+                continue
 
-        return self.max_size > self.size
+            with timed_stage("read_archive"):
+                content = member_handle.read()
 
+            with timed_stage("parse_json"):
+                frames[frame_id] = json.loads(content)
 
-def decide_on_split(num_examples: int,
-                    train_size: Optional[int],
-                    dev_size: int,
-                    test_size: int,
-                    writers: Dict[str, ParallelWriter],
-                    dry_run: bool) -> Dict[int, ParallelWriter]:
+            if len(frames) >= self.chunk_size:
+                yield self.decode_chunk(frames)
+                frames = {}
+
+        if len(frames) > 0:
+            yield self.decode_chunk(frames)
+
+        self.num_frames = max_frame_id + 1
+
+
+@timed("normalize")
+def compute_normalization_statistics(filepath: str,
+                                     fps: float,
+                                     pose_type: str,
+                                     chunk_size: int,
+                                     dtype: np.dtype = np.float32,
+                                     point_selection: Optional[PointSelection] = None) -> Tuple[np.array, float]:
     """
+    Same statistics as `Pose.normalize` (center between the shoulders and mean shoulder width over the entire
+    video), accumulated chunk by chunk. Masked points are ignored.
 
-    :param num_examples:
-    :param train_size:
-    :param dev_size:
-    :param test_size:
-    :param writers:
-    :param dry_run:
-    :return:
+    :param filepath:
+    :param fps:
+    :param pose_type:
+    :param chunk_size:
+    :param dtype:
+    :param point_selection:
+    :return: Tuple of (center, mean distance).
     """
+    midpoint_sum, midpoint_count = 0.0, 0
+    distance_sum, distance_count = 0.0, 0
 
-    train_indexes = np.arange(num_examples, dtype=np.int32)
+    reader = FrameChunkReader(filepath=filepath, fps=fps, chunk_size=chunk_size, dtype=dtype,
+                              point_selection=point_selection)
 
-    # sub-sample if train_size has a limit
+    for _, poses in reader:
+        normalization_info = get_normalization_info(header=poses.header, pose_type=pose_type)
 
-    if train_size is not None:
-        total_size = train_size + dev_size + test_size
+        transposed = ma.asarray(poses.body.points_perspective())
 
-        if dry_run:
-            # for a dry run select the first N examples (non-random)
-            train_indexes = np.arange(total_size)
+        p1s = transposed[normalization_info.p1]
+        p2s = transposed[normalization_info.p2]
+
+        midpoints = (p2s + p1s) / 2
+        midpoint_sum += midpoints.filled(0).sum(axis=(0, 1), dtype=np.float64)
+        midpoint_count += midpoints.count(axis=(0, 1))
+
+        distances = ma.asarray(distance_batch(p1s, p2s))
+        distance_sum += distances.filled(0).sum(dtype=np.float64)
+        distance_count += distances.count()
+
+    center = (midpoint_sum / midpoint_count).astype(dtype)
+    mean_distance = distance_sum / distance_count
+
+    return center, mean_distance
+
+
+@timed("normalize")
+def normalize_pose_block(data: np.array, confidence: np.array, masked: bool,
+                         center: np.array, mean_distance: float) -> np.array:
+    """
+    Applies normalization statistics to some frames of a video. Like `Pose.normalize` for masked arrays,
+    points with zero confidence keep their original values.
+
+    :param data:
+    :param confidence:
+    :param masked: Whether poses of this type are loaded as masked arrays.
+    :param center:
+    :param mean_distance:
+    :return:
+    """
+    normalized = ((data - center) * (1 / mean_distance)).astype(data.dtype, copy=False)
+
+    if masked:
+        normalized = np.where((confidence == 0)[..., None], data, normalized)
+
+    return normalized
+
+
+class StreamingExample:
+    """
+    Bookkeeping for one subtitle in `extract_parallel_examples_streaming`.
+    """
+
+    def __init__(self, subtitle: srt.Subtitle, start_frame: int, end_frame: int, first_source_frame: int,
+                 end_source_frame: int):
+        self.subtitle = subtitle
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.first_source_frame = first_source_frame
+        self.end_source_frame = end_source_frame
+        self.num_missing_frames = end_source_frame - first_source_frame
+
+
+def extract_parallel_examples_streaming(subtitles: List[srt.Subtitle],
+                                        filepath: str,
+                                        video_fps: float,
+                                        target_fps: Optional[float],
+                                        normalize_poses: bool,
+                                        pose_type: str,
+                                        max_resident_frames: int,
+                                        resampling_method: str = "drop",
+                                        dtype: np.dtype = np.float32,
+                                        point_selection: Optional[PointSelection] = None) \
+        -> Iterator[Tuple[str, np.array]]:
+    """
+    Bounded-memory equivalent of `read_pose_file` and `extract_parallel_examples`. Frames are decoded in chunks
+    of `max_resident_frames`, an example is extracted as soon as all of its frames are decoded, and frames are
+    dropped as soon as no pending example needs them. Memory therefore depends on the longest subtitle instead of
+    the longest video (provided that archive members are in frame order, as they usually are).
+
+    Examples are yielded in the order of subtitles, each one as soon as it and all earlier examples are extracted.
+    An example with frames that are missing from the archive holds back later examples until the end of the file.
+
+    Examples are the same as `extract_parallel_examples` with `resample_slices_only`, up to float rounding. With
+    normalization, the archive is read twice: once for the statistics of the entire video, then for the examples.
+
+    :param subtitles:
+    :param filepath:
+    :param video_fps:
+    :param target_fps:
+    :param normalize_poses:
+    :param pose_type:
+    :param max_resident_frames:
+    :param resampling_method:
+    :param dtype:
+    :param point_selection:
+    :return:
+    """
+    if target_fps is None:
+        subtitle_fps = video_fps
+    else:
+        subtitle_fps = target_fps
+
+    resample = subtitle_fps != video_fps
+
+    if normalize_poses:
+        center, mean_distance = compute_normalization_statistics(filepath=filepath,
+                                                                 fps=video_fps,
+                                                                 pose_type=pose_type,
+                                                                 chunk_size=max_resident_frames,
+                                                                 dtype=dtype,
+                                                                 point_selection=point_selection)
+
+    pending = []  # type: List[StreamingExample]
+
+    # number of pending examples that need a frame, and which examples these are
+    frame_num_users = Counter()  # type: Counter
+    examples_by_frame = {}  # type: Dict[int, List[int]]
+
+    for index, subtitle in enumerate(subtitles):
+        start_frame = convert_srt_time_to_frame(subtitle.start, fps=subtitle_fps)
+        end_frame = convert_srt_time_to_frame(subtitle.end, fps=subtitle_fps)
+
+        if resample:
+            first_source_frame, end_source_frame = get_source_frame_range(start_frame=start_frame,
+                                                                          end_frame=end_frame,
+                                                                          video_fps=video_fps,
+                                                                          target_fps=subtitle_fps)
+        else:
+            first_source_frame, end_source_frame = start_frame, end_frame
+
+        pending.append(StreamingExample(subtitle=subtitle,
+                                        start_frame=start_frame,
+                                        end_frame=end_frame,
+                                        first_source_frame=first_source_frame,
+                                        end_source_frame=end_source_frame))
+
+        for frame_id in range(first_source_frame, end_source_frame):
+            frame_num_users[frame_id] += 1
+            examples_by_frame.setdefault(frame_id, []).append(index)
+
+    # extracted examples that cannot be yielded yet because an earlier example is still pending, by index
+    finished = {}  # type: Dict[int, Tuple[str, np.array]]
+    next_index = 0
+
+    # first person of decoded frames that are still needed, by frame ID
+    resident_data = {}  # type: Dict[int, np.array]
+    resident_confidence = {}  # type: Dict[int, np.array]
+
+    point_shape = None  # type: Optional[Tuple[int, int]]
+    masked = False
+
+    max_num_resident = 0
+
+    def extract_example(index: int, num_frames: Optional[int] = None) -> Tuple[str, np.array]:
+        """
+        :param index:
+        :param num_frames: Number of frames of the video, if known.
+        :return: Text and pose slice.
+        """
+        example = pending[index]
+
+        start_frame, end_frame = example.start_frame, example.end_frame
+        first_source_frame, end_source_frame = example.first_source_frame, example.end_source_frame
+
+        if num_frames is not None:
+            if resample:
+                pose_num_frames = get_num_target_frames(num_frames=num_frames, video_fps=video_fps,
+                                                        target_fps=subtitle_fps, method=resampling_method)
+            else:
+                pose_num_frames = num_frames
+
+            assert start_frame < pose_num_frames, "Start frame: '%d' must be lower than number of pose frames: '%d'. Subtitle: %s" % \
+                                                  (start_frame, pose_num_frames, str(example.subtitle))
+
+            if end_frame > pose_num_frames:
+                logging.debug("End frame: '%d' is higher than number of pose frames: '%d'. Subtitle: %s" % \
+                              (end_frame, pose_num_frames, str(example.subtitle)))
+                end_frame = pose_num_frames
+
+            end_source_frame = min(end_source_frame, num_frames)
+
+        # frames that are missing from the archive are zeros, as in `read_pose_file`
+
+        with timed_stage("slice"):
+            block_data = np.zeros(shape=(end_source_frame - first_source_frame, 1) + point_shape, dtype=dtype)
+            block_confidence = np.zeros(shape=(end_source_frame - first_source_frame, 1, point_shape[0]),
+                                        dtype=dtype)
+
+            for frame_id in range(first_source_frame, end_source_frame):
+                if frame_id in resident_data:
+                    block_data[frame_id - first_source_frame] = resident_data[frame_id]
+                    block_confidence[frame_id - first_source_frame] = resident_confidence[frame_id]
+
+        if normalize_poses:
+            block_data = normalize_pose_block(data=block_data, confidence=block_confidence, masked=masked,
+                                              center=center, mean_distance=mean_distance)
+
+        if resample:
+            pose_slice, _ = resample_pose_arrays(data=block_data,
+                                                 confidence=block_confidence,
+                                                 video_fps=video_fps,
+                                                 target_fps=subtitle_fps,
+                                                 method=resampling_method,
+                                                 start_frame=start_frame,
+                                                 end_frame=end_frame,
+                                                 source_offset=first_source_frame)
+        else:
+            pose_slice = block_data
+
+        # drop frames that no other pending example needs
+
+        for frame_id in range(example.first_source_frame, example.end_source_frame):
+            frame_num_users[frame_id] -= 1
+            if frame_num_users[frame_id] == 0:
+                del frame_num_users[frame_id]
+                resident_data.pop(frame_id, None)
+                resident_confidence.pop(frame_id, None)
+
+        return get_subtitle_content(example.subtitle), reduce_pose_slice(pose_slice)
+
+    reader = FrameChunkReader(filepath=filepath,
+                              fps=video_fps,
+                              chunk_size=max_resident_frames,
+                              needed_frames=set(frame_num_users.keys()),
+                              dtype=dtype,
+                              point_selection=point_selection)
+
+    for frame_ids, poses in reader:
+        data = ma.getdata(poses.body.data)
+        confidence = poses.body.confidence
+
+        point_shape = data.shape[2:]
+        masked = isinstance(poses.body.data, ma.MaskedArray)
+
+        completed = []  # type: List[int]
+
+        for row, frame_id in enumerate(frame_ids):
+
+            # frames without any person are left empty
+            if data.shape[1] > 0:
+                resident_data[frame_id] = data[row, 0].copy()
+                resident_confidence[frame_id] = confidence[row, 0].copy()
+
+            for index in examples_by_frame[frame_id]:
+                pending[index].num_missing_frames -= 1
+                if pending[index].num_missing_frames == 0:
+                    completed.append(index)
+
+        max_num_resident = max(max_num_resident, len(resident_data))
+
+        for index in completed:
+            finished[index] = extract_example(index)
+
+        while next_index in finished:
+            yield finished.pop(next_index)
+            next_index += 1
+
+    # remaining examples have frames beyond the end of the video or missing from the archive
+
+    assert point_shape is not None, "Pose file has no frames: '%s'" % filepath
+
+    for index in range(next_index, len(pending)):
+        if index in finished:
+            yield finished.pop(index)
+        else:
+            yield extract_example(index, num_frames=reader.num_frames)
+
+    if max_num_resident > max_resident_frames:
+        logging.warning("Up to %d decoded frames of '%s' were in memory, more than --max-resident-frames (%d), "
+                        "because subtitles are long or archive members are not in frame order." %
+                        (max_num_resident, filepath, max_resident_frames))
+
+
+class VideoJob(NamedTuple):
+    """
+    A video with the subtitles that were selected for one of the data splits.
+    """
+    filepath: str
+    video_fps: float
+    subtitles: List[srt.Subtitle]
+    example_ids: List[int]
+
+
+def convert_pose_file(job: VideoJob,
+                      target_fps: Optional[float],
+                      normalize_poses: bool,
+                      pose_type: str,
+                      pose_cache: Optional[PoseCache] = None,
+                      resampling_method: str = "drop",
+                      resample_slices_only: bool = False,
+                      dtype: np.dtype = np.float32,
+                      max_resident_frames: Optional[int] = None,
+                      point_selection: Optional[PointSelection] = None) -> Iterator[Tuple[str, np.array]]:
+    """
+    Convert the selected examples of a single video. This is the unit of work for parallel conversion. Examples
+    are returned as a list (that can be sent back from a worker process), except in bounded memory, where they
+    are generated one by one.
+
+    Only the frames needed for the selected examples are decoded, unless poses are normalized (normalization
+    takes into account all frames of a video) or decoded poses are cached (the cache needs entire videos).
+
+    :param job:
+    :param target_fps:
+    :param normalize_poses:
+    :param pose_type:
+    :param pose_cache:
+    :param resampling_method:
+    :param resample_slices_only:
+    :param dtype: Data type of decoded poses and therefore of the examples.
+    :param max_resident_frames: If given, convert in bounded memory with `extract_parallel_examples_streaming`,
+                                without using the pose cache. Examples are generated while they are consumed.
+    :param point_selection: If given, only these points are kept, right after decoding (the pose cache has all
+                            points).
+    :return:
+    """
+    if max_resident_frames is not None:
+        return extract_parallel_examples_streaming(subtitles=job.subtitles,
+                                                   filepath=job.filepath,
+                                                   video_fps=job.video_fps,
+                                                   target_fps=target_fps,
+                                                   normalize_poses=normalize_poses,
+                                                   pose_type=pose_type,
+                                                   max_resident_frames=max_resident_frames,
+                                                   resampling_method=resampling_method,
+                                                   dtype=dtype,
+                                                   point_selection=point_selection)
+
+    if normalize_poses or pose_cache is not None:
+        poses = read_pose_file_cached(filepath=job.filepath, fps=job.video_fps, pose_cache=pose_cache, dtype=dtype)
+    else:
+        needed_frames = get_needed_source_frames(subtitles=job.subtitles,
+                                                 video_fps=job.video_fps,
+                                                 target_fps=target_fps)
+        poses = read_pose_file(filepath=job.filepath, fps=job.video_fps, needed_frames=needed_frames, dtype=dtype)
+
+    poses = select_points(poses=poses, point_selection=point_selection)
+
+    return list(extract_parallel_examples(poses=poses,
+                                          subtitles=job.subtitles,
+                                          video_fps=job.video_fps,
+                                          target_fps=target_fps,
+                                          normalize_poses=normalize_poses,
+                                          pose_type=pose_type,
+                                          resampling_method=resampling_method,
+                                          resample_slices_only=resample_slices_only))
+
+
+def convert_pose_file_instrumented(job: VideoJob, **kwargs) -> Tuple[Iterator[Tuple[str, np.array]], Dict[str, Any]]:
+    """
+    Same as `convert_pose_file`, but also collects time and memory statistics of this video. Examples are
+    converted while they are consumed, and the statistics are complete once all examples are consumed. Time
+    that the caller spends between examples (for instance writing them) is not counted.
+
+    :param job:
+    :param kwargs: See `convert_pose_file`.
+    :return: Tuple of (examples, statistics).
+    """
+    statistics = {"video": os.path.basename(job.filepath),
+                  "num_examples": 0,
+                  "num_frames": 0,
+                  "wall_seconds": 0.0,
+                  "cpu_seconds": 0.0,
+                  "peak_rss_mb": 0.0,
+                  "pid": os.getpid(),
+                  "stages": {}}  # type: Dict[str, Any]
+
+    def generate_examples() -> Iterator[Tuple[str, np.array]]:
+        yield from convert_pose_file(job, **kwargs)
+
+    def instrument_examples() -> Iterator[Tuple[str, np.array]]:
+        examples = generate_examples()
+        video_stages = StageTimer()
+
+        while True:
+            stages_before = STAGE_TIMER.snapshot()
+
+            start_wall = time.perf_counter()
+            start_cpu = time.process_time()
+
+            example = next(examples, None)
+
+            statistics["wall_seconds"] += time.perf_counter() - start_wall
+            statistics["cpu_seconds"] += time.process_time() - start_cpu
+            video_stages.merge(subtract_stages(after=STAGE_TIMER.snapshot(), before=stages_before))
+
+            if example is None:
+                statistics["peak_rss_mb"] = get_peak_rss_mb()
+                statistics["stages"] = video_stages.stages
+                return
+
+            statistics["num_examples"] += 1
+            statistics["num_frames"] += example[1].shape[0]
+
+            yield example
+
+    return instrument_examples(), statistics
+
+
+class ParallelWriter:
+
+    def __init__(self, output_dir: str, pose_type: str, subset: str, output_prefix: str,
+                 max_size: Optional[int] = None,
+                 chunk_frames: Optional[int] = None,
+                 compression: Optional[str] = None,
+                 compression_level: Optional[int] = None,
+                 shuffle: bool = False,
+                 resume_state: Optional[Dict[str, int]] = None,
+                 write_text: bool = True,
+                 shard_max_examples: Optional[int] = None,
+                 shard_max_bytes: Optional[int] = None):
+        """
+
+        :param output_dir:
+        :param pose_type:
+        :param subset:
+        :param output_prefix:
+        :param max_size:
+        :param chunk_frames: See `H5DatasetWriter`.
+        :param compression: See `H5DatasetWriter`.
+        :param compression_level: See `H5DatasetWriter`.
+        :param shuffle: See `H5DatasetWriter`.
+        :param resume_state: State returned by `commit` in an earlier run. If given, existing output files are
+                             truncated to this state and continued.
+        :param write_text: Whether to write the text file. If several pose types are converted at once, their
+                           examples have the same texts, which only one of the writers needs to write. Sharded
+                           output always has text files, since shards of different pose types can differ.
+        :param shard_max_examples: If given (or `shard_max_bytes`), write shards of at most this many examples,
+                                   named [prefix].[pose type].[subset].[shard].{h5,txt}, and an index file
+                                   [prefix].[pose type].[subset].shards.json that lists them.
+        :param shard_max_bytes: Maximum size of the pose data of a shard (before compression), a shard has at
+                                least one example even if it is larger.
+        """
+        self.output_dir = output_dir
+        self.pose_type = pose_type
+
+        assert subset in ["train", "dev", "test"]
+
+        self.subset = subset
+        self.output_prefix = output_prefix
+        self.max_size = max_size
+
+        self.pose_writer_options = {"chunk_frames": chunk_frames,
+                                    "compression": compression,
+                                    "compression_level": compression_level,
+                                    "shuffle": shuffle}
+
+        self.shard_max_examples = shard_max_examples
+        self.shard_max_bytes = shard_max_bytes
+        self.sharded = shard_max_examples is not None or shard_max_bytes is not None
+
+        self.write_text = write_text or self.sharded
+
+        if resume_state is None:
+            self.size = 0
+            self.open_output(shard=0 if self.sharded else None)
+        else:
+            self.size = resume_state["size"]
+            self.open_output(shard=resume_state.get("shard"), resume_state=resume_state)
+
+    def get_output_paths(self, shard: Optional[int]) -> Tuple[str, str]:
+        """
+
+        :param shard:
+        :return: Tuple of (text path, poses path).
+        """
+        if shard is None:
+            text_output_name = ".".join([self.output_prefix, self.subset, "txt"])
+            poses_output_name = ".".join([self.output_prefix, self.pose_type, self.subset, "h5"])
+        else:
+            shard_name = "%05d" % shard
+            text_output_name = ".".join([self.output_prefix, self.pose_type, self.subset, shard_name, "txt"])
+            poses_output_name = ".".join([self.output_prefix, self.pose_type, self.subset, shard_name, "h5"])
+
+        return os.path.join(self.output_dir, text_output_name), os.path.join(self.output_dir, poses_output_name)
+
+    def open_output(self, shard: Optional[int], resume_state: Optional[Dict[str, int]] = None):
+        """
+        Open the text and pose files of a shard (or the only files, if output is not sharded).
+
+        :param shard:
+        :param resume_state:
+        :return:
+        """
+        self.shard = shard
+        self.text_output_path, self.poses_output_path = self.get_output_paths(shard)
+
+        if not self.write_text:
+            self.text_writer = None
+        elif resume_state is None:
+            self.text_writer = open(self.text_output_path, "w")
+        else:
+            self.text_writer = open(self.text_output_path, "r+")
+            self.text_writer.truncate(resume_state["text_offset"])
+            self.text_writer.seek(resume_state["text_offset"])
+
+        if resume_state is None:
+            resume_size = None
+        else:
+            resume_size = resume_state.get("shard_size", resume_state["size"])
+
+        self.pose_writer = H5DatasetWriter(filename=self.poses_output_path,
+                                           resume_size=resume_size,
+                                           **self.pose_writer_options)
+
+        self.shard_bytes = self.pose_writer.get_data_size()
+
+        if resume_state is not None and shard is not None:
+            # shards that were started after the last commit
+            next_shard = shard + 1
+            while any([os.path.exists(path) for path in self.get_output_paths(next_shard)]):
+                for path in self.get_output_paths(next_shard):
+                    if os.path.exists(path):
+                        os.remove(path)
+                next_shard += 1
+
+    def close_output(self):
+        if self.text_writer is not None:
+            self.text_writer.close()
+        self.pose_writer.close()
+        self.pose_writer.log_statistics()
+
+    @timed("write")
+    def commit(self) -> Dict[str, int]:
+        """
+        Write all examples so far through to disk.
+
+        :return: State that can be passed to the constructor to resume writing after these examples.
+        """
+        self.pose_writer.flush()
+        fsync_path(self.poses_output_path)
+
+        state = {"size": self.size}
+
+        if self.sharded:
+            state["shard"] = self.shard
+            state["shard_size"] = self.pose_writer.size
+
+        if self.text_writer is None:
+            state["text_offset"] = None
+        else:
+            self.text_writer.flush()
+            fsync_path(self.text_output_path)
+            state["text_offset"] = self.text_writer.tell()
+
+        return state
+
+    def close(self):
+        self.close_output()
+
+        if self.sharded:
+            self.write_shard_index()
+
+    def write_shard_index(self):
+        """
+        Index of all shards, with the number of examples of each one (from the metadata of the H5 files).
+
+        :return:
+        """
+        shards = []  # type: List[Dict[str, Any]]
+
+        first_example = 0
+
+        for shard in range(self.shard + 1):
+            text_output_path, poses_output_path = self.get_output_paths(shard)
+            num_examples = count_h5_examples(poses_output_path)
+
+            shards.append({"poses": os.path.basename(poses_output_path),
+                           "text": os.path.basename(text_output_path),
+                           "first_example": first_example,
+                           "num_examples": num_examples})
+
+            first_example += num_examples
+
+        index = {"pose_type": self.pose_type,
+                 "subset": self.subset,
+                 "num_examples": first_example,
+                 "shards": shards}
+
+        index_name = ".".join([self.output_prefix, self.pose_type, self.subset, "shards", "json"])
+
+        with open(os.path.join(self.output_dir, index_name), "w") as handle:
+            json.dump(index, handle, indent=2)
+
+    def shard_is_full(self, pose_slice: np.array) -> bool:
+        """
+
+        :param pose_slice: Next example.
+        :return: Whether the next example should be written to a new shard.
+        """
+        shard_size = self.pose_writer.size
+
+        if not self.sharded or shard_size == 0:
+            return False
+
+        if self.shard_max_examples is not None and shard_size >= self.shard_max_examples:
+            return True
+
+        if self.shard_max_bytes is not None and self.shard_bytes + pose_slice.nbytes > self.shard_max_bytes:
+            return True
+
+        return False
+
+    @timed("write")
+    def add(self, text: str, pose_slice: np.array):
+
+        if self.max_size is not None:
+            assert self.size < self.max_size, "Reached maximum size of %d, refusing to add more examples." % self.max_size
+
+        if self.shard_is_full(pose_slice):
+            self.close_output()
+            self.open_output(shard=self.shard + 1)
+
+        if self.text_writer is not None:
+            self.text_writer.write(text + "\n")
+        self.pose_writer.add(pose_slice)
+
+        self.size += 1
+        self.shard_bytes += pose_slice.nbytes
+
+    @property
+    def writable(self) -> bool:
+
+        if self.max_size is None:
+            return True
+
+        return self.max_size > self.size
+
+
+def fsync_path(path: str):
+    """
+
+    :param path:
+    :return:
+    """
+    file_descriptor = os.open(path, os.O_RDONLY)
+
+    try:
+        os.fsync(file_descriptor)
+    finally:
+        os.close(file_descriptor)
+
+
+# values of a split assignment array are indexes into this list
+SUBSETS = ["train", "dev", "test"]
+TRAIN, DEV, TEST = 0, 1, 2
+NOT_SELECTED = -1
+
+
+def decide_on_split(num_examples: int,
+                    train_size: Optional[int],
+                    dev_size: int,
+                    test_size: int,
+                    dry_run: bool) -> np.array:
+    """
+    Random split, draws from the global numpy random state.
+
+    :param num_examples:
+    :param train_size:
+    :param dev_size:
+    :param test_size:
+    :param dry_run:
+    :return: Array with one entry per example: the index of its subset in SUBSETS, or NOT_SELECTED.
+    """
+
+    train_indexes = np.arange(num_examples, dtype=np.int32)
+
+    # sub-sample if train_size has a limit
+
+    if train_size is not None:
+        total_size = train_size + dev_size + test_size
+
+        if dry_run:
+            # for a dry run select the first N examples (non-random)
+            train_indexes = np.arange(total_size)
         else:
             train_indexes = np.random.choice(train_indexes, size=(total_size,), replace=False)
 
-    # default: training writer
+    # default: training subset
 
-    writers_by_id = {index: writers["train"] for index in train_indexes}
+    assignment = np.full(shape=(max(num_examples, len(train_indexes)),), fill_value=NOT_SELECTED, dtype=np.int8)
+    assignment[train_indexes] = TRAIN
 
     # return immediately if no samples should go to dev or test
 
     if dev_size == test_size == 0:
-        return writers_by_id
+        return assignment
 
     # sample indexes for dev
 
     dev_indexes = np.random.choice(train_indexes, size=(dev_size,), replace=False)
 
-    for dev_index in dev_indexes:
-        writers_by_id[dev_index] = writers["dev"]
+    assignment[dev_indexes] = DEV
 
-    # sample indexes for test
+    # sample indexes for test (from the remaining train indexes, keeping their order)
 
-    remaining_train_indexes = np.asarray([i for i in train_indexes if i not in dev_indexes])
+    remaining_train_indexes = train_indexes[assignment[train_indexes] == TRAIN]
 
     test_indexes = np.random.choice(remaining_train_indexes, size=(test_size,), replace=False)
 
-    for test_index in test_indexes:
-        writers_by_id[test_index] = writers["test"]
+    assignment[test_indexes] = TEST
+
+    return assignment
+
+
+def get_example_key(file_id: str, subtitle: srt.Subtitle) -> str:
+    """
+    Identifies an example independently of all other videos and subtitles in a corpus.
+
+    :param file_id:
+    :param subtitle:
+    :return:
+    """
+    return "%s.%d" % (file_id, subtitle.index)
+
+
+def hash_example_key(example_key: str, seed: int) -> float:
+    """
+    Maps an example key to a number in [0, 1) that does not depend on the Python process (unlike `hash`).
+
+    :param example_key:
+    :param seed:
+    :return:
+    """
+    digest = hashlib.sha1(("%d\t%s" % (seed, example_key)).encode("utf-8")).digest()
+
+    return int.from_bytes(digest[:8], byteorder="big") / 2 ** 64
+
+
+def get_split_by_hash(example_key: str, seed: int, dev_fraction: float, test_fraction: float) -> int:
+    """
+    Subset of a single example. Can be computed without knowing the rest of the corpus, for instance in
+    parallel workers.
+
+    :param example_key:
+    :param seed:
+    :param dev_fraction:
+    :param test_fraction:
+    :return: Index of subset in SUBSETS.
+    """
+    value = hash_example_key(example_key=example_key, seed=seed)
+
+    if value < dev_fraction:
+        return DEV
+    elif value < dev_fraction + test_fraction:
+        return TEST
+    else:
+        return TRAIN
+
+
+def decide_on_split_by_hash(example_keys: List[str],
+                            train_size: Optional[int],
+                            dev_fraction: float,
+                            test_fraction: float,
+                            seed: int) -> np.array:
+    """
+    Stable split: each example is assigned by hashing its key, so adding videos to a corpus does not change the
+    subset of existing examples. If train_size has a limit, the train examples with the lowest hash values are
+    kept.
+
+    :param example_keys:
+    :param train_size:
+    :param dev_fraction:
+    :param test_fraction:
+    :param seed:
+    :return: Array with one entry per example: the index of its subset in SUBSETS, or NOT_SELECTED.
+    """
+    assert dev_fraction >= 0 and test_fraction >= 0, "Dev and test fractions cannot be negative."
+    assert dev_fraction + test_fraction < 1, "Dev and test fractions must add up to less than 1."
+
+    values = np.array([hash_example_key(example_key=key, seed=seed) for key in example_keys], dtype=np.float64)
+
+    assignment = np.full(shape=(len(example_keys),), fill_value=TRAIN, dtype=np.int8)
+
+    assignment[values < dev_fraction + test_fraction] = TEST
+    assignment[values < dev_fraction] = DEV
+
+    if train_size is not None:
+        train_indexes = np.flatnonzero(assignment == TRAIN)
+        order = np.argsort(values[train_indexes], kind="stable")
+
+        assignment[train_indexes[order[train_size:]]] = NOT_SELECTED
+
+    return assignment
+
+
+# options that change the converted examples, a run can only be resumed with the same values
+JOURNAL_OPTIONS = ["download_sub", "output_prefix", "seed", "train_size", "dev_size", "test_size", "split_method",
+                   "dev_fraction", "test_fraction", "dry_run", "normalize_poses", "pose_type", "target_fps",
+                   "resampling_method", "resample_slices_only", "dtype", "components", "points",
+                   "shard_max_examples", "shard_max_mb"]
+
+
+# options that change the stored bytes of converted examples (but not their values)
+STORE_OPTIONS = JOURNAL_OPTIONS + ["h5_chunk_frames", "h5_compression", "h5_compression_level", "h5_shuffle"]
+
+# local modules that converted data depends on, a change to one of them creates new entries in a conversion store
+CONVERSION_MODULES = ["convert_and_split_data", "h5_writer", "dataset_metadata", "resample_poses", "pose_cache",
+                      "conversion_journal", "video_manifest", "instrumentation"]
+
+
+def get_store_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Everything that affects the output of a run: options, the files in the download folder and the code.
+
+    :param args:
+    :return:
+    """
+    options = {name: getattr(args, name) for name in STORE_OPTIONS}
+    options["download_sub"] = os.path.abspath(options["download_sub"])
+
+    options["download_checksum"] = get_download_checksum(args.download_sub,
+                                                         subfolders=["subtitles", "videos"] + args.pose_type)
+
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    module_paths = [os.path.join(module_dir, module + ".py") for module in CONVERSION_MODULES]
+
+    options["code_checksum"] = get_code_checksum(module_paths)
+
+    return options
+
 
-    return writers_by_id
+def get_journal_options(args: argparse.Namespace, pose_type: str, jobs: List[VideoJob],
+                        split_assignment: np.array) -> Dict:
+    """
+    Options and a checksum of the planned videos and their examples, so that a resumed run is guaranteed to
+    produce the same data splits as an uninterrupted run.
+
+    :param args:
+    :param pose_type: Pose type of this journal.
+    :param jobs:
+    :param split_assignment:
+    :return:
+    """
+    options = {name: getattr(args, name) for name in JOURNAL_OPTIONS}
+    options["download_sub"] = os.path.abspath(options["download_sub"])
+    options["pose_type"] = pose_type
+
+    # with several pose types, only the first one writes texts
+    if len(args.pose_type) > 1:
+        options["pose_types"] = args.pose_type
+
+    planned = [[os.path.basename(job.filepath), job.example_ids, split_assignment[job.example_ids].tolist()]
+               for job in jobs]
+
+    options["jobs_checksum"] = hashlib.sha1(json.dumps(planned).encode("utf-8")).hexdigest()
+
+    return options
 
 
 def parse_args():
@@ -585,57 +1804,343 @@ def parse_args():
                         help="Random seed for data splits.", required=True)
     parser.add_argument("--train-size", type=int, default=None,
                         help="Maximum number of examples in train set. Default: no limit.", required=False)
-    parser.add_argument("--dev-size", type=int,
-                        help="Number of examples in dev set.", required=True)
-    parser.add_argument("--test-size", type=int,
-                        help="Number of examples in test set.", required=True)
+    parser.add_argument("--dev-size", type=int, default=None,
+                        help="Number of examples in dev set (required for --split-method random, ignored for hash).",
+                        required=False)
+    parser.add_argument("--test-size", type=int, default=None,
+                        help="Number of examples in test set (required for --split-method random, ignored for hash).",
+                        required=False)
+    parser.add_argument("--split-method", type=str, default="random", choices=["random", "hash"],
+                        help="'random': sample dev and test examples with --seed. 'hash': assign each example by "
+                             "hashing its video ID and subtitle index, so that adding videos does not change "
+                             "existing dev and test examples (default: random).", required=False)
+    parser.add_argument("--dev-fraction", type=float, default=None,
+                        help="Expected fraction of examples in dev set (required for --split-method hash).",
+                        required=False)
+    parser.add_argument("--test-fraction", type=float, default=None,
+                        help="Expected fraction of examples in test set (required for --split-method hash).",
+                        required=False)
     parser.add_argument("--dry-run", action="store_true",
                         help="Whether this is a dry run only.", required=False)
 
     parser.add_argument("--normalize-poses", action="store_true",
                         help="Whether to normalize poses by shoulder width.", required=False)
-    parser.add_argument("--pose-type", type=str,
-                        help="Type of poses (openpose or mediapipe).", required=True, choices=["openpose", "mediapipe"])
-    parser.add_argument("--target-fps", type=int, default=None,
+    parser.add_argument("--pose-type", type=str, nargs="+",
+                        help="Type of poses (openpose or mediapipe). If both are given, they are converted in one "
+                             "pass with the same examples in the same order, and the text files are written once.",
+                        required=True, choices=["openpose", "mediapipe"])
+    parser.add_argument("--target-fps", type=float, default=None,
                         help="If poses have a different framerate, force a conversion to this framerate.", required=False)
+    parser.add_argument("--resampling-method", type=str, default="drop", choices=RESAMPLING_METHODS,
+                        help="How poses are converted to --target-fps. 'drop': drop the same frames as earlier "
+                             "versions of this script (for 30 -> 25 fps, every sixth frame starting with the first). "
+                             "'nearest': take the closest preceding frame. 'linear': interpolate between "
+                             "neighbouring frames (default: drop).", required=False)
+    parser.add_argument("--resample-slices-only", action="store_true",
+                        help="Convert only the pose frames of subtitles to --target-fps instead of entire videos, "
+                             "to save memory and time. With --normalize-poses, normalization is then computed on "
+                             "the original frames.", required=False)
+    parser.add_argument("--dtype", type=str, default="float32", choices=["float32", "float64"],
+                        help="Data type of poses, from decoding to the H5 files (default: float32).", required=False)
+
+    parser.add_argument("--components", type=str, nargs="+", default=None,
+                        help="Keep only these pose components, in this order, for instance: POSE_LANDMARKS "
+                             "LEFT_HAND_LANDMARKS RIGHT_HAND_LANDMARKS (Openpose has a single component, BODY_135). "
+                             "Default: all components.", required=False)
+    parser.add_argument("--points", type=str, nargs="+", default=None,
+                        help="Keep only some points of a component, one argument per component of the form "
+                             "[component]:[point],[point],..., for instance BODY_135:LShoulder,RShoulder,LElbow. "
+                             "With --normalize-poses, both shoulders must be kept. Default: all points.",
+                        required=False)
+
+    parser.add_argument("--max-resident-frames", type=int, default=None,
+                        help="Convert videos in bounded memory: decode pose frames in chunks of this size and keep "
+                             "decoded frames only until the subtitles that need them are extracted. Does not use "
+                             "the pose cache, and with --normalize-poses pose files are read twice. Videos are "
+                             "converted in the main process, each example is written as soon as it is extracted. "
+                             "Default: decode entire videos.", required=False)
+
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its journal ([prefix].[pose type].journal.jsonl in the "
+                             "output folder): outputs are truncated to the last completely written video. Without "
+                             "a journal, start from scratch. Data splits are the same as in an uninterrupted run.",
+                        required=False)
+
+    parser.add_argument("--store-dir", type=str, default=None,
+                        help="Convert into an entry of this shared folder that is keyed by all options that affect "
+                             "the output, the files in --download-sub and the code, and link the output files into "
+                             "--output-dir. If the entry exists, nothing is converted, so that models which differ "
+                             "only in later steps share their converted data. Default: convert into --output-dir.",
+                        required=False)
+
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile conversion with cProfile and write the statistics to "
+                             "[prefix].[pose type].prof in the output folder (only the main process is profiled, "
+                             "use --num-workers 1 to include conversion).", required=False)
+
+    parser.add_argument("--h5-chunk-frames", type=int, default=None,
+                        help="Number of frames per HDF5 chunk. Default: contiguous datasets, or chunks chosen by "
+                             "h5py if a compression filter is used.", required=False)
+    parser.add_argument("--h5-compression", type=str, default=None, choices=H5_COMPRESSION_FILTERS,
+                        help="Lossless compression filter for H5 files. Default: no compression.", required=False)
+    parser.add_argument("--h5-compression-level", type=int, default=None,
+                        help="Compression level for gzip, from 0 to 9 (default: 4).", required=False)
+    parser.add_argument("--h5-shuffle", action="store_true",
+                        help="Apply the HDF5 shuffle filter before compression.", required=False)
+
+    parser.add_argument("--shard-max-examples", type=int, default=None,
+                        help="Split each output subset into shards of at most this many examples, with aligned "
+                             "text and pose files ([prefix].[pose type].[subset].[shard].{txt,h5}) and an index "
+                             "file ([prefix].[pose type].[subset].shards.json). Default: no shards.", required=False)
+    parser.add_argument("--shard-max-mb", type=float, default=None,
+                        help="Split each output subset into shards with at most this many megabytes of pose data "
+                             "(before compression), see --shard-max-examples. Default: no shards.", required=False)
+
+    parser.add_argument("--num-workers", type=int, default=1,
+                        help="Number of processes that convert videos (and threads that probe new videos) in "
+                             "parallel. Output is identical to a serial run regardless of this value "
+                             "(default: 1, no multiprocessing).", required=False)
+
+    parser.add_argument("--pose-cache-dir", type=str, default=None,
+                        help="Folder to cache decoded poses of entire videos, so that later runs (for instance with "
+                             "different normalization or target framerate) do not need to read pose archives again. "
+                             "Default: no cache.", required=False)
+    parser.add_argument("--pose-cache-max-gb", type=float, default=None,
+                        help="Maximum size of the pose cache in gigabytes, least recently used entries are deleted "
+                             "when it grows beyond this size. Default: no limit.", required=False)
 
     args = parser.parse_args()
 
+    if args.split_method == "random" and (args.dev_size is None or args.test_size is None):
+        parser.error("--split-method random requires --dev-size and --test-size")
+
+    if args.split_method == "hash" and (args.dev_fraction is None or args.test_fraction is None):
+        parser.error("--split-method hash requires --dev-fraction and --test-fraction")
+
+    if args.split_method == "hash" and (args.dev_fraction < 0 or args.test_fraction < 0 or
+                                        args.dev_fraction + args.test_fraction >= 1):
+        parser.error("--dev-fraction and --test-fraction cannot be negative and must add up to less than 1")
+
+    if len(set(args.pose_type)) != len(args.pose_type):
+        parser.error("--pose-type has duplicate values")
+
+    if len(args.pose_type) > 1 and (args.components is not None or args.points is not None):
+        parser.error("--components and --points require a single --pose-type")
+
     return args
 
 
-def main():
-    args = parse_args()
+def plan_pose_files(download_sub: str, pose_types: List[str]) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Pose files of each video, in the order of the pose files of the first pose type. With several pose types,
+    videos that do not have pose files of all types are left out, so that all pose types have the same examples.
 
-    logging.basicConfig(level=logging.DEBUG)
-    logging.debug(args)
+    :param download_sub:
+    :param pose_types:
+    :return: List of (file ID, pose file path by pose type).
+    """
+    filepaths_by_type = {}  # type: Dict[str, Dict[str, str]]
 
-    np.random.seed(args.seed)
+    for pose_type in pose_types:
+        pose_dir = os.path.join(download_sub, pose_type)
+        filepaths_by_type[pose_type] = {get_file_id(filename): os.path.join(pose_dir, filename)
+                                        for filename in os.listdir(pose_dir)}
+
+    videos = []  # type: List[Tuple[str, Dict[str, str]]]
+
+    num_incomplete = 0
+
+    for filename in os.listdir(os.path.join(download_sub, pose_types[0])):
+        file_id = get_file_id(filename)
+
+        if not all([file_id in filepaths_by_type[pose_type] for pose_type in pose_types]):
+            num_incomplete += 1
+            continue
+
+        videos.append((file_id, {pose_type: filepaths_by_type[pose_type][file_id] for pose_type in pose_types}))
+
+    if num_incomplete > 0:
+        logging.warning("Skipping %d videos that do not have pose files of all types: %s" %
+                        (num_incomplete, ", ".join(pose_types)))
+
+    return videos
+
+
+def convert_pose_files_instrumented(tasks: List[Tuple[str, VideoJob]],
+                                    collect_examples: bool = True,
+                                    **kwargs) -> List[Tuple[str, Iterator[Tuple[str, np.array]], Dict[str, Any]]]:
+    """
+    Convert the pose files of one video for several pose types, see `convert_pose_file_instrumented`.
+
+    :param tasks: List of (pose type, job).
+    :param collect_examples: Whether to convert all examples before returning (as a worker process must). If
+                             False, examples are converted while the caller consumes them, one pose type after
+                             the other.
+    :param kwargs: See `convert_pose_file`.
+    :return: List of (pose type, examples, statistics).
+    """
+    results = []  # type: List[Tuple[str, Iterator[Tuple[str, np.array]], Dict[str, Any]]]
+
+    for pose_type, job in tasks:
+        examples, statistics = convert_pose_file_instrumented(job, pose_type=pose_type, **kwargs)
+
+        if collect_examples:
+            examples = list(examples)
+
+        results.append((pose_type, examples, statistics))
+
+    return results
+
+
+class PoseTypeOutput:
+    """
+    Journal and writers of one pose type.
+    """
+
+    def __init__(self, pose_type: str, jobs: List[VideoJob], journal: ConversionJournal,
+                 writers: Dict[str, ParallelWriter], first_job_index: int, num_features: int):
+        self.pose_type = pose_type
+        self.jobs = jobs
+        self.journal = journal
+        self.writers = writers
+        self.first_job_index = first_job_index
+        self.num_features = num_features
+
+        self.video_statistics = []  # type: List[Dict[str, Any]]
+
+
+def open_pose_type_output(args: argparse.Namespace,
+                          pose_type: str,
+                          jobs: List[VideoJob],
+                          split_assignment: np.array,
+                          point_selection: Optional[PointSelection],
+                          write_text: bool) -> Optional[PoseTypeOutput]:
+    """
+    Start or resume the journal and writers of a pose type.
+
+    :param args:
+    :param pose_type:
+    :param jobs:
+    :param split_assignment:
+    :param point_selection:
+    :param write_text: See `ParallelWriter`.
+    :return: None if the journal says that this pose type is already complete.
+    """
+    num_features = get_num_features(select_points(poses=get_template_pose(pose_type),
+                                                  point_selection=point_selection).header)
+
+    logging.debug("Number of features per frame for %s: %d" % (pose_type, num_features))
+
+    # downstream steps (sockeye.prepare_data and sockeye.train) need the number of features
+
+    num_features_path = os.path.join(args.output_dir, ".".join([args.output_prefix, pose_type, "num_features"]))
+
+    with open(num_features_path, "w") as handle:
+        handle.write("%d\n" % num_features)
+
+    # journal of completely written videos, to resume an interrupted run
+
+    journal_path = os.path.join(args.output_dir, ".".join([args.output_prefix, pose_type, "journal", "jsonl"]))
+    journal = ConversionJournal(path=journal_path)
+    journal_options = get_journal_options(args=args, pose_type=pose_type, jobs=jobs,
+                                          split_assignment=split_assignment)
 
-    writer_train = ParallelWriter(output_dir=args.output_dir,
-                                  pose_type=args.pose_type,
-                                  subset="train",
-                                  output_prefix=args.output_prefix,
-                                  max_size=args.train_size)
+    resume_entry = None
 
-    writer_dev = ParallelWriter(output_dir=args.output_dir,
-                                pose_type=args.pose_type,
-                                subset="dev",
-                                output_prefix=args.output_prefix,
-                                max_size=args.dev_size)
+    if args.resume and os.path.exists(journal_path):
+        journal.read()
 
-    writer_test = ParallelWriter(output_dir=args.output_dir,
-                                 pose_type=args.pose_type,
-                                 subset="test",
-                                 output_prefix=args.output_prefix,
-                                 max_size=args.test_size)
+        if journal.options != journal_options:
+            raise ValueError("Cannot resume: journal '%s' was written with different options or input data." %
+                             journal_path)
 
-    writers = {"train": writer_train, "dev": writer_dev, "test": writer_test}
+        if journal.complete:
+            logging.debug("Conversion is already complete according to journal: %s", journal_path)
+            return None
+
+        resume_entry = journal.last_entry
+
+    if resume_entry is None:
+        journal.start(options=journal_options)
+        first_job_index = 0
+    else:
+        journal.resume()
+        first_job_index = resume_entry["job"] + 1
+        logging.debug("Resuming %s after video %d/%d: %s" % (pose_type, first_job_index, len(jobs),
+                                                              resume_entry["video"]))
+
+    writer_options = {"chunk_frames": args.h5_chunk_frames,
+                      "compression": args.h5_compression,
+                      "compression_level": args.h5_compression_level,
+                      "shuffle": args.h5_shuffle,
+                      "shard_max_examples": args.shard_max_examples,
+                      "shard_max_bytes": None if args.shard_max_mb is None else int(args.shard_max_mb * 1024 ** 2)}
+
+    writers = {}  # type: Dict[str, ParallelWriter]
+
+    for subset, max_size in zip(SUBSETS, [args.train_size, args.dev_size, args.test_size]):
+        if resume_entry is None:
+            resume_state = None
+        else:
+            resume_state = resume_entry["writers"][subset]
+
+        writers[subset] = ParallelWriter(output_dir=args.output_dir,
+                                         pose_type=pose_type,
+                                         subset=subset,
+                                         output_prefix=args.output_prefix,
+                                         max_size=max_size,
+                                         resume_state=resume_state,
+                                         write_text=write_text,
+                                         **writer_options)
+
+    return PoseTypeOutput(pose_type=pose_type,
+                          jobs=jobs,
+                          journal=journal,
+                          writers=writers,
+                          first_job_index=first_job_index,
+                          num_features=num_features)
+
+
+def write_report(report_path: str, report: Dict[str, Any]):
+    """
+
+    :param report_path:
+    :param report:
+    :return:
+    """
+    with open(report_path, "w") as handle:
+        json.dump(report, handle, indent=2)
+
+
+def convert_and_split(args: argparse.Namespace):
+    """
+
+    :param args:
+    :return:
+    """
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+
+    np.random.seed(args.seed)
+
+    pose_types = args.pose_type
+
+    point_selection = parse_point_selection(pose_type=pose_types[0],
+                                            components=args.components,
+                                            points=args.points,
+                                            normalize_poses=args.normalize_poses)
+
+    if args.split_method == "hash":
+        # sizes of dev and test only depend on --dev-fraction and --test-fraction
+        args.dev_size, args.test_size = None, None
 
     # load framerates of all videos (could be different for each one)
 
     video_dir = os.path.join(args.download_sub, "videos")
-    framerate_by_id = read_video_framerates(video_dir=video_dir)
+
+    with timed_stage("read_video_framerates"):
+        framerate_by_id = read_video_framerates(video_dir=video_dir, num_workers=args.num_workers,
+                                                target_fps=args.target_fps)
 
     framerate_counter = Counter(framerate_by_id.values())
     logging.debug("Distribution of framerates: %s", str(framerate_counter))
@@ -643,79 +2148,310 @@ def main():
     # load all subtitles (since they don't use a lot of memory)
 
     subtitle_dir = os.path.join(args.download_sub, "subtitles")
-    subtitles_by_id, num_subtitles_skipped = read_subtitles(subtitle_dir=subtitle_dir,
-                                                            framerate_by_id=framerate_by_id,
-                                                            target_fps=args.target_fps)
 
-    num_examples = sum([len(subtitles) for subtitles in subtitles_by_id.values()])
+    with timed_stage("read_subtitles"):
+        subtitles_by_id, num_subtitles_skipped = read_subtitles(subtitle_dir=subtitle_dir,
+                                                                framerate_by_id=framerate_by_id,
+                                                                target_fps=args.target_fps)
+
+    num_subtitles = sum([len(subtitles) for subtitles in subtitles_by_id.values()])
+
+    logging.debug("Subtitles kept/skipped/total: %d/%d/%d" %
+                  (num_subtitles, num_subtitles_skipped, num_subtitles + num_subtitles_skipped))
+
+    # example IDs are assigned in the order of pose files (of the first pose type)
+
+    videos = plan_pose_files(download_sub=args.download_sub, pose_types=pose_types)
+
+    num_planned_examples = sum([len(subtitles_by_id[file_id]) for file_id, _ in videos])
+
+    # With a single pose type, the split is drawn over all subtitles as before, so that a seed selects the same
+    # examples as in earlier runs (examples of videos without pose files are dropped, even if they are assigned to
+    # dev or test). Several pose types must agree, so their split only includes videos that have all pose files.
+
+    if len(pose_types) == 1:
+        num_examples = num_subtitles
+    else:
+        num_examples = num_planned_examples
+
+    if num_planned_examples < num_subtitles:
+        if len(pose_types) == 1:
+            logging.warning("%d subtitles belong to videos without pose files. They are included in the split, "
+                            "but not converted: dev and test can be smaller than requested." %
+                            (num_subtitles - num_planned_examples))
+        else:
+            logging.warning("Leaving out %d subtitles of videos without pose files of all types, splitting the "
+                            "remaining %d." % (num_subtitles - num_planned_examples, num_planned_examples))
 
     if args.train_size is not None:
         assert num_examples >= args.train_size, \
            "--train-size cannot be more than the total number of examples (%d)" % num_examples
 
-    logging.debug("Subtitles kept/skipped/total: %d/%d/%d" %
-                  (num_examples, num_subtitles_skipped, num_examples + num_subtitles_skipped))
+    if args.split_method == "hash":
+        example_keys = []  # type: List[str]
 
-    writers_by_id = decide_on_split(num_examples=num_examples,
-                                    train_size=args.train_size,
-                                    dev_size=args.dev_size,
-                                    test_size=args.test_size,
-                                    writers=writers,
-                                    dry_run=args.dry_run)
+        for file_id, _ in videos:
+            example_keys.extend([get_example_key(file_id, subtitle) for subtitle in subtitles_by_id[file_id]])
 
-    # step through poses one by one
-    pose_dir = os.path.join(args.download_sub, args.pose_type)
+        split_assignment = decide_on_split_by_hash(example_keys=example_keys,
+                                                   train_size=args.train_size,
+                                                   dev_fraction=args.dev_fraction,
+                                                   test_fraction=args.test_fraction,
+                                                   seed=args.seed)
+    else:
+        split_assignment = decide_on_split(num_examples=num_examples,
+                                           train_size=args.train_size,
+                                           dev_size=args.dev_size,
+                                           test_size=args.test_size,
+                                           dry_run=args.dry_run)
 
-    filename: str
+    # only the first examples belong to videos that are converted
+    planned_assignment = split_assignment[:num_planned_examples]
 
-    example_id = 0
+    logging.debug("Examples in split (train/dev/test): %d/%d/%d" %
+                  tuple([np.count_nonzero(planned_assignment == subset_index)
+                         for subset_index in [TRAIN, DEV, TEST]]))
 
-    dry_run_break_early = False
+    # step through poses one by one (conversion may happen in parallel, but results are consumed in order),
+    # skipping videos that do not have any selected examples. All pose types have the same jobs, except for
+    # their pose files.
 
-    for filename in tqdm(os.listdir(pose_dir)):
+    jobs_by_pose_type = {pose_type: [] for pose_type in pose_types}  # type: Dict[str, List[VideoJob]]
 
-        if dry_run_break_early:
-            break
+    example_id = 0
 
-        file_id = get_file_id(filename)
+    num_videos_skipped = 0
 
+    for file_id, filepaths in videos:
         video_fps = framerate_by_id[file_id]
 
-        filepath = os.path.join(pose_dir, filename)
+        selected_subtitles = []  # type: List[srt.Subtitle]
+        selected_example_ids = []  # type: List[int]
 
-        if "openpose" in filename:
-            poses = read_openpose_surrey_format(filepath=filepath, fps=video_fps)
-        elif "mediapipe" in filename:
-            poses = read_mediapipe_surrey_format(filepath=filepath, fps=video_fps)
+        for subtitle in subtitles_by_id[file_id]:
+            if split_assignment[example_id] != NOT_SELECTED:
+                selected_subtitles.append(subtitle)
+                selected_example_ids.append(example_id)
+
+            example_id += 1
+
+        if len(selected_subtitles) == 0:
+            num_videos_skipped += 1
+            continue
+
+        for pose_type in pose_types:
+            jobs_by_pose_type[pose_type].append(VideoJob(filepath=filepaths[pose_type],
+                                                         video_fps=video_fps,
+                                                         subtitles=selected_subtitles,
+                                                         example_ids=selected_example_ids))
+
+    num_jobs = len(jobs_by_pose_type[pose_types[0]])
+
+    logging.debug("Videos converted/skipped because they have no selected examples: %d/%d" %
+                  (num_jobs, num_videos_skipped))
+
+    if args.pose_cache_dir is not None:
+        if args.pose_cache_max_gb is not None:
+            pose_cache_max_size = int(args.pose_cache_max_gb * 1024 ** 3)
         else:
-            raise ValueError("Cannot make sense of pose file: '%s'." % filename)
+            pose_cache_max_size = None
+        pose_cache = PoseCache(cache_dir=args.pose_cache_dir, max_size=pose_cache_max_size)
+    else:
+        pose_cache = None
 
-        matching_subtitles = subtitles_by_id[file_id]
+    # the first pose type writes the texts, which are the same for all pose types
 
-        for text, pose_slice in extract_parallel_examples(poses=poses,
-                                                          subtitles=matching_subtitles,
-                                                          video_fps=video_fps,
-                                                          target_fps=args.target_fps,
-                                                          normalize_poses=args.normalize_poses,
-                                                          pose_type=args.pose_type):
+    outputs = {}  # type: Dict[str, PoseTypeOutput]
 
-            if example_id not in writers_by_id.keys():
-                # if dry run, we can end the loops now
-                if args.dry_run:
-                    dry_run_break_early = True
-                    break
+    for pose_type in pose_types:
+        output = open_pose_type_output(args=args,
+                                       pose_type=pose_type,
+                                       jobs=jobs_by_pose_type[pose_type],
+                                       split_assignment=split_assignment,
+                                       point_selection=point_selection,
+                                       write_text=pose_type == pose_types[0])
+        if output is not None:
+            outputs[pose_type] = output
 
-                # train size has a limit and this example ID is not in the random sample
-                example_id += 1
-                continue
+    if len(outputs) == 0:
+        return
 
-            writer = writers_by_id[example_id]
-            writer.add(text=text, pose_slice=pose_slice)
+    # the pose files of each video are converted together, for all pose types that are not written yet
 
-            example_id += 1
+    first_job_index = min([output.first_job_index for output in outputs.values()])
+
+    tasks_by_video = [[(pose_type, output.jobs[job_index]) for pose_type, output in outputs.items()
+                       if job_index >= output.first_job_index]
+                      for job_index in range(first_job_index, num_jobs)]
+
+    # in bounded memory, examples go straight from conversion to the writers in the main process, since a worker
+    # process would have to collect all examples of a video to send them back
+
+    stream_examples = args.max_resident_frames is not None
+
+    if stream_examples and args.num_workers > 1:
+        logging.warning("With --max-resident-frames, videos are converted in the main process, --num-workers is "
+                        "only used to read framerates.")
+
+    convert_function = functools.partial(convert_pose_files_instrumented,
+                                         collect_examples=not stream_examples,
+                                         target_fps=args.target_fps,
+                                         normalize_poses=args.normalize_poses,
+                                         pose_cache=pose_cache,
+                                         resampling_method=args.resampling_method,
+                                         resample_slices_only=args.resample_slices_only,
+                                         dtype=np.dtype(args.dtype),
+                                         max_resident_frames=args.max_resident_frames,
+                                         point_selection=point_selection)
+
+    pool = None
 
-    for writer in writers.values():
-        writer.close()
+    if args.num_workers > 1 and not stream_examples:
+        pool = multiprocessing.Pool(processes=args.num_workers)
+        results_by_video = pool.imap(convert_function, tasks_by_video)
+    else:
+        results_by_video = map(convert_function, tasks_by_video)
+
+    # in the main process, the "convert" stage is the time spent waiting for worker processes (or the time of
+    # conversion that is not part of any other stage, without workers)
+
+    results_by_video = timed_iterator(results_by_video, "convert")
+
+    for job_index, results in tqdm(zip(range(first_job_index, num_jobs), results_by_video),
+                                   total=len(tasks_by_video)):
+
+        for pose_type, examples, statistics in results:
+            output = outputs[pose_type]
+            job = output.jobs[job_index]
+
+            if stream_examples:
+                examples = timed_iterator(examples, "convert")
+
+            # examples come first, so that zip exhausts them and their statistics are complete
+            for (text, pose_slice), example_id in zip(examples, job.example_ids):
+                writer = output.writers[SUBSETS[split_assignment[example_id]]]
+                writer.add(text=text, pose_slice=pose_slice)
+
+            assert statistics["num_examples"] == len(job.example_ids), \
+                "Expected %d examples of '%s', got %d" % (len(job.example_ids), job.filepath,
+                                                          statistics["num_examples"])
+
+            # stages of conversions in the main process are already counted
+            if statistics["pid"] != os.getpid():
+                STAGE_TIMER.merge(statistics["stages"])
+
+            statistics["stages"] = round_stages(statistics["stages"])
+            output.video_statistics.append(statistics)
+
+            writer_states = {subset: writer.commit() for subset, writer in output.writers.items()}
+
+            output.journal.commit({"job": job_index, "video": os.path.basename(job.filepath),
+                                   "writers": writer_states})
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    for output in outputs.values():
+        for writer in output.writers.values():
+            writer.close()
+
+        output.journal.close()
+
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    if pool is not None:
+        max_worker_peak_rss_mb = round(children_usage.ru_maxrss / 1024, 4)
+    else:
+        max_worker_peak_rss_mb = None
+
+    # time, memory and stages are for the entire run, even if several pose types are converted
+
+    for pose_type, output in outputs.items():
+        video_statistics = output.video_statistics
+
+        report = {"command": sys.argv,
+                  "pose_types": pose_types,
+                  "num_workers": args.num_workers,
+                  "num_features": output.num_features,
+                  "num_videos": len(video_statistics),
+                  "num_examples": sum([statistics["num_examples"] for statistics in video_statistics]),
+                  "num_frames": sum([statistics["num_frames"] for statistics in video_statistics]),
+                  "wall_seconds": round(time.perf_counter() - start_wall, 4),
+                  "cpu_seconds": round(time.process_time() - start_cpu + children_usage.ru_utime +
+                                       children_usage.ru_stime, 4),
+                  "peak_rss_mb": round(get_peak_rss_mb(), 4),
+                  "max_worker_peak_rss_mb": max_worker_peak_rss_mb,
+                  "stages": round_stages(STAGE_TIMER.stages),
+                  "videos": round_stages({statistics["video"]: statistics for statistics in video_statistics})}
+
+        report_path = os.path.join(args.output_dir, ".".join([args.output_prefix, pose_type, "report", "json"]))
+        write_report(report_path=report_path, report=report)
+
+        logging.debug("Converted %d %s examples of %d videos in %.1f seconds, report: %s" %
+                      (report["num_examples"], pose_type, report["num_videos"], report["wall_seconds"],
+                       report_path))
+
+
+def convert_and_split_stored(args: argparse.Namespace):
+    """
+    Convert into an entry of the conversion store (unless it is complete already) and link its files into the
+    output folder. Runs that need the same entry at the same time wait for each other, an interrupted entry is
+    resumed with --resume.
+
+    :param args:
+    :return:
+    """
+    store_options = get_store_options(args)
+
+    entry_dir = get_entry_dir(args.store_dir, name=args.output_prefix, key_options=store_options)
+
+    with locked_entry(entry_dir):
+        if entry_is_complete(entry_dir):
+            logging.debug("Using converted data from store: %s" % entry_dir)
+        else:
+            logging.debug("Converting into store: %s" % entry_dir)
+
+            os.makedirs(entry_dir, exist_ok=True)
+
+            entry_args = argparse.Namespace(**vars(args))
+            entry_args.output_dir = entry_dir
+
+            run_conversion(entry_args)
+
+            mark_entry_complete(entry_dir, key_options=store_options)
+
+    link_entry(entry_dir, output_dir=args.output_dir)
+
+
+def run_conversion(args: argparse.Namespace):
+    """
+
+    :param args:
+    :return:
+    """
+    if args.profile:
+        profile_path = os.path.join(args.output_dir, ".".join([args.output_prefix] + args.pose_type + ["prof"]))
+
+        profiler = cProfile.Profile()
+        profiler.runcall(convert_and_split, args)
+        profiler.dump_stats(profile_path)
+
+        logging.debug("Profile written to: %s", profile_path)
+    else:
+        convert_and_split(args)
+
+
+def main():
+    args = parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    logging.debug(args)
+
+    if args.store_dir is not None:
+        convert_and_split_stored(args)
+    else:
+        run_conversion(args)
 
 
 if __name__ == '__main__':
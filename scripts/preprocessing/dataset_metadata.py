@@ -0,0 +1,114 @@
+import os
+import json
+import h5py
+
+import numpy as np
+
+from typing import List, Dict, Any, Optional
+
+
+METADATA_SUFFIX = ".meta.json"
+
+FRAME_PERCENTILES = [50, 90, 95, 99]
+
+NUM_HISTOGRAM_BINS = 20
+
+
+def get_metadata_path(filename: str) -> str:
+    """
+    Metadata of a dataset is stored next to it, for instance "train.src.meta.json" for "train.src".
+
+    :param filename:
+    :return:
+    """
+    return filename + METADATA_SUFFIX
+
+
+def compute_metadata(num_frames: List[int], num_features: Optional[int], dtype: Optional[str]) -> Dict[str, Any]:
+    """
+
+    :param num_frames: Number of frames of each example.
+    :param num_features: Number of values per frame.
+    :param dtype: Data type of the examples, for instance "float32".
+    :return:
+    """
+    metadata = {"num_examples": len(num_frames),
+                "num_features": num_features,
+                "dtype": dtype}  # type: Dict[str, Any]
+
+    if len(num_frames) == 0:
+        metadata["frames"] = None
+        return metadata
+
+    num_frames = np.array(num_frames, dtype=np.int64)
+
+    counts, edges = np.histogram(num_frames, bins=NUM_HISTOGRAM_BINS)
+
+    metadata["frames"] = {"total": int(num_frames.sum()),
+                          "min": int(num_frames.min()),
+                          "max": int(num_frames.max()),
+                          "mean": round(float(num_frames.mean()), 4),
+                          "percentiles": {str(percentile): round(float(np.percentile(num_frames, percentile)), 4)
+                                          for percentile in FRAME_PERCENTILES},
+                          "histogram": {"edges": [round(float(edge), 4) for edge in edges],
+                                        "counts": counts.tolist()}}
+
+    return metadata
+
+
+def compute_metadata_from_h5(filename: str) -> Dict[str, Any]:
+    """
+    Metadata of an H5 file with one dataset per example. Only dataset headers are read, not the data.
+
+    :param filename:
+    :return:
+    """
+    with h5py.File(filename, "r") as h5_file:
+        size = len(h5_file.keys())
+
+        shapes = [h5_file[str(index)].shape for index in range(size)]
+
+        if size > 0:
+            dtype = str(h5_file["0"].dtype)
+        else:
+            dtype = None
+
+    num_features = shapes[0][1] if len(shapes) > 0 else None
+
+    return compute_metadata(num_frames=[shape[0] for shape in shapes], num_features=num_features, dtype=dtype)
+
+
+def write_metadata(filename: str, metadata: Dict[str, Any]):
+    """
+    Written to a temporary file first, so that there is never an incomplete metadata file.
+
+    :param filename: Dataset that the metadata belongs to.
+    :param metadata:
+    :return:
+    """
+    metadata_path = get_metadata_path(filename)
+    temp_path = metadata_path + ".tmp"
+
+    with open(temp_path, "w") as handle:
+        json.dump(metadata, handle, indent=2)
+
+    os.replace(temp_path, metadata_path)
+
+
+def read_metadata(filename: str) -> Optional[Dict[str, Any]]:
+    """
+    Metadata is only used if it is at least as recent as the dataset, otherwise it may be out of date.
+
+    :param filename: Dataset that the metadata belongs to.
+    :return: None if there is no usable metadata.
+    """
+    metadata_path = get_metadata_path(filename)
+
+    if not os.path.exists(metadata_path):
+        return None
+
+    if os.path.getmtime(metadata_path) < os.path.getmtime(filename):
+        return None
+
+    with open(metadata_path, "r") as handle:
+        return json.load(handle)
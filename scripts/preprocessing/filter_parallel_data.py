@@ -0,0 +1,208 @@
+#! /usr/bin/python3
+
+import json
+import h5py
+import argparse
+import logging
+import collections
+
+import numpy as np
+
+from typing import List, Optional, NamedTuple, Dict, Any
+
+from dataset_metadata import compute_metadata, write_metadata
+
+
+FILTER_RULES = ["min_frames", "max_frames", "empty_target", "min_frames_per_token", "max_frames_per_token",
+                "non_finite"]
+
+
+class FilterConfig(NamedTuple):
+    """
+    Rules are disabled with None (or False for boolean rules).
+    """
+    min_frames: Optional[int]
+    max_frames: Optional[int]
+    remove_empty_targets: bool
+    min_frames_per_token: Optional[float]
+    max_frames_per_token: Optional[float]
+    remove_non_finite: bool
+
+
+def get_rejection_reasons(dataset: h5py.Dataset, target: str, config: FilterConfig) -> List[str]:
+    """
+    All rules that reject an example, not only the first one. Only the shape of the example is read, unless
+    non-finite values are checked.
+
+    :param dataset: Poses of one example, with frames as the first dimension.
+    :param target: Target text of the example.
+    :param config:
+    :return: Names of rules (see FILTER_RULES), empty if the example is kept.
+    """
+    reasons = []  # type: List[str]
+
+    num_frames = dataset.shape[0]
+    num_tokens = len(target.split())
+
+    if config.min_frames is not None and num_frames < config.min_frames:
+        reasons.append("min_frames")
+
+    if config.max_frames is not None and num_frames > config.max_frames:
+        reasons.append("max_frames")
+
+    if config.remove_empty_targets and num_tokens == 0:
+        reasons.append("empty_target")
+
+    # the ratio is undefined for empty targets
+    if num_tokens > 0:
+        frames_per_token = num_frames / num_tokens
+
+        if config.min_frames_per_token is not None and frames_per_token < config.min_frames_per_token:
+            reasons.append("min_frames_per_token")
+
+        if config.max_frames_per_token is not None and frames_per_token > config.max_frames_per_token:
+            reasons.append("max_frames_per_token")
+
+    if config.remove_non_finite and num_frames > 0 and not np.isfinite(dataset[()]).all():
+        reasons.append("non_finite")
+
+    return reasons
+
+
+def filter_parallel_data(input_src: str,
+                         input_trg: str,
+                         output_src: str,
+                         output_trg: str,
+                         config: FilterConfig) -> Dict[str, Any]:
+    """
+    Walks through the examples of the H5 source and the lines of the target together, one example at a time.
+    Kept examples are copied with their stored bytes (compressed examples stay compressed) and numbered again
+    from 0.
+
+    :param input_src: H5 file with one dataset per example.
+    :param input_trg: Text file with one line per example. Only "\n" ends a line, as in the H5 conversion, other
+                      line breaks (such as "\r") are part of the text and are kept as they are.
+    :param output_src:
+    :param output_trg:
+    :param config:
+    :return: Report with the number of examples, kept examples and rejections per rule.
+    """
+    rejections = collections.Counter()  # type: collections.Counter
+
+    num_rejected = 0
+    num_frames_kept = []  # type: List[int]
+    num_features = None  # type: Optional[int]
+    dtype = None  # type: Optional[str]
+
+    with h5py.File(input_src, "r") as input_file, \
+            h5py.File(output_src, "w") as output_file, \
+            open(input_trg, "r", newline="\n") as input_handle, \
+            open(output_trg, "w", newline="\n") as output_handle:
+
+        size = len(input_file.keys())
+
+        for index in range(size):
+            target = input_handle.readline()
+
+            if target == "":
+                raise ValueError("Target '%s' has fewer lines than source '%s' has examples (%d)." %
+                                 (input_trg, input_src, size))
+
+            dataset = input_file[str(index)]
+
+            reasons = get_rejection_reasons(dataset, target=target, config=config)
+
+            if len(reasons) > 0:
+                rejections.update(reasons)
+                num_rejected += 1
+                continue
+
+            h5py.h5o.copy(input_file.id, str(index).encode("ascii"),
+                          output_file.id, str(len(num_frames_kept)).encode("ascii"))
+
+            output_handle.write(target if target.endswith("\n") else target + "\n")
+
+            num_frames_kept.append(dataset.shape[0])
+
+            if num_features is None and len(dataset.shape) > 1:
+                num_features = dataset.shape[1]
+                dtype = str(dataset.dtype)
+
+        if input_handle.readline() != "":
+            raise ValueError("Target '%s' has more lines than source '%s' has examples (%d)." %
+                             (input_trg, input_src, size))
+
+    write_metadata(output_src, compute_metadata(num_frames=num_frames_kept, num_features=num_features, dtype=dtype))
+
+    return {"num_examples": size,
+            "num_kept": len(num_frames_kept),
+            "num_rejected": num_rejected,
+            "rejected_by_rule": {rule: rejections[rule] for rule in FILTER_RULES},
+            "config": config._asdict()}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--input-src", type=str, help="Source input file (H5 poses).", required=True)
+    parser.add_argument("--input-trg", type=str, help="Target input file (text).", required=True)
+
+    parser.add_argument("--output-src", type=str, help="Source output file (H5 poses).", required=True)
+    parser.add_argument("--output-trg", type=str, help="Target output file (text).", required=True)
+
+    parser.add_argument("--min-frames", type=int, default=1,
+                        help="Remove examples with fewer frames (default: 1).", required=False)
+    parser.add_argument("--max-frames", type=int, default=None,
+                        help="Remove examples with more frames (default: no maximum).", required=False)
+    parser.add_argument("--keep-empty-targets", action="store_true",
+                        help="Do not remove examples with empty (or whitespace-only) targets.", required=False)
+    parser.add_argument("--min-frames-per-token", type=float, default=None,
+                        help="Remove examples with fewer frames per target token (tokens separated by "
+                             "whitespace). Default: no minimum.", required=False)
+    parser.add_argument("--max-frames-per-token", type=float, default=None,
+                        help="Remove examples with more frames per target token (default: no maximum).",
+                        required=False)
+    parser.add_argument("--remove-non-finite", action="store_true",
+                        help="Remove examples with NaN or infinite values (reads all poses, otherwise only their "
+                             "shapes are read).", required=False)
+
+    parser.add_argument("--report", type=str, default=None,
+                        help="Write the number of rejected examples per rule to this JSON file.", required=False)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+
+    args = parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    logging.debug(args)
+
+    config = FilterConfig(min_frames=args.min_frames,
+                          max_frames=args.max_frames,
+                          remove_empty_targets=not args.keep_empty_targets,
+                          min_frames_per_token=args.min_frames_per_token,
+                          max_frames_per_token=args.max_frames_per_token,
+                          remove_non_finite=args.remove_non_finite)
+
+    report = filter_parallel_data(input_src=args.input_src,
+                                  input_trg=args.input_trg,
+                                  output_src=args.output_src,
+                                  output_trg=args.output_trg,
+                                  config=config)
+
+    logging.debug("Kept %d parallel examples out of %d total." % (report["num_kept"], report["num_examples"]))
+
+    for rule, count in report["rejected_by_rule"].items():
+        logging.debug("Rejected by %s: %d" % (rule, count))
+
+    if args.report is not None:
+        with open(args.report, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
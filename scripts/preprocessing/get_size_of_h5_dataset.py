@@ -1,16 +1,23 @@
 #! /usr/bin/python3
 
 import sys
+import h5py
 
-from sockeye import h5_io
+from dataset_metadata import read_metadata
 
 
 assert len(sys.argv) > 1
 
 filename = sys.argv[1]
 
-reader = h5_io.H5Reader(filename=filename)
+# from the metadata file if there is one, otherwise from the H5 file (without reading any examples)
 
-num_examples = len(list(reader.iterate()))
+metadata = read_metadata(filename)
+
+if metadata is not None:
+    num_examples = metadata["num_examples"]
+else:
+    with h5py.File(filename, "r") as h5_file:
+        num_examples = len(h5_file.keys())
 
 print(num_examples)
@@ -0,0 +1,196 @@
+import time
+import h5py
+import logging
+
+import numpy as np
+
+from typing import List, Optional, Dict, Any
+
+from dataset_metadata import compute_metadata, write_metadata
+
+
+H5_COMPRESSION_FILTERS = ["gzip", "lzf"]
+
+
+class H5DatasetWriter:
+    """
+    Writes examples in the same layout as `sockeye.h5_io.H5Writer` (one dataset per example, named by its index),
+    but with optional chunking and compression. Compression filters are standard HDF5 filters that
+    h5py decodes transparently, so readers do not need to change.
+
+    When the file is closed, a metadata file is written next to it (see `dataset_metadata`).
+    """
+
+    def __init__(self,
+                 filename: str,
+                 chunk_frames: Optional[int] = None,
+                 compression: Optional[str] = None,
+                 compression_level: Optional[int] = None,
+                 shuffle: bool = False,
+                 resume_size: Optional[int] = None):
+        """
+
+        :param filename:
+        :param chunk_frames: Number of frames per chunk. Default: no chunking, unless a filter is used (then h5py
+                             guesses a chunk shape).
+        :param compression: "gzip" or "lzf". Default: no compression.
+        :param compression_level: Only for gzip, from 0 to 9.
+        :param shuffle: Whether to apply the shuffle filter, which usually improves compression of floats.
+        :param resume_size: If given, continue writing an existing file after its first `resume_size` examples,
+                            removing all other examples.
+        """
+        assert compression is None or compression in H5_COMPRESSION_FILTERS, \
+            "Unknown compression filter: '%s'" % compression
+
+        self.filename = filename
+        self.chunk_frames = chunk_frames
+        self.compression = compression
+        self.compression_level = compression_level
+        self.shuffle = shuffle
+
+        # frames of each example, and shape and type of frames, for the metadata file
+        self.num_frames = []  # type: List[int]
+        self.num_features = None  # type: Optional[int]
+        self.dtype = None  # type: Optional[str]
+
+        # size of all examples in the file before compression, including examples kept when resuming
+        self.data_bytes = 0
+
+        if resume_size is None:
+            self.h5_file = h5py.File(filename, "w")
+            self.size = 0
+        else:
+            self.h5_file = h5py.File(filename, "a")
+            self.truncate(resume_size)
+
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.write_seconds = 0.0
+
+    def get_dataset_options(self, array: np.array) -> Dict[str, Any]:
+        """
+
+        :param array:
+        :return: Keyword arguments for `create_dataset`.
+        """
+        options = {}  # type: Dict[str, Any]
+
+        # chunks cannot be larger than an example without frames, h5py chooses them if a filter is used
+        if self.chunk_frames is not None and array.shape[0] > 0:
+            options["chunks"] = (min(self.chunk_frames, array.shape[0]),) + array.shape[1:]
+
+        if self.compression is not None:
+            options["compression"] = self.compression
+            if self.compression_level is not None:
+                options["compression_opts"] = self.compression_level
+
+        if self.shuffle:
+            options["shuffle"] = True
+
+        return options
+
+    def add(self, array: np.array):
+        """
+
+        :param array:
+        :return:
+        """
+        start = time.perf_counter()
+
+        dataset = self.h5_file.create_dataset(str(self.size), data=array, **self.get_dataset_options(array))
+
+        self.raw_bytes += array.nbytes
+        self.stored_bytes += dataset.id.get_storage_size()
+        self.size += 1
+
+        self.add_to_metadata(array.shape, array.dtype)
+
+        self.write_seconds += time.perf_counter() - start
+
+    def truncate(self, size: int):
+        """
+        Remove all examples from index `size` onwards. HDF5 does not give the space of removed datasets back to
+        the file system, so the file can be larger than a file written without interruption.
+
+        :param size:
+        :return:
+        """
+        for name in list(self.h5_file.keys()):
+            if int(name) >= size:
+                del self.h5_file[name]
+
+        assert len(self.h5_file.keys()) == size, "Cannot resume '%s': expected at least %d examples, found %d." % \
+                                                  (self.filename, size, len(self.h5_file.keys()))
+
+        self.size = size
+
+        for index in range(size):
+            dataset = self.h5_file[str(index)]
+            self.add_to_metadata(dataset.shape, dataset.dtype)
+
+    def add_to_metadata(self, shape: tuple, dtype: np.dtype):
+        """
+
+        :param shape: Shape of an example.
+        :param dtype:
+        :return:
+        """
+        self.num_frames.append(shape[0])
+        self.data_bytes += int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+        if self.num_features is None and len(shape) > 1:
+            self.num_features = shape[1]
+            self.dtype = str(dtype)
+
+    def get_data_size(self) -> int:
+        """
+        Size of all examples in the file before compression, counted while they are added (without reading the
+        file).
+
+        :return: Size in bytes.
+        """
+        return self.data_bytes
+
+    def flush(self):
+        self.h5_file.flush()
+
+    def close(self):
+        self.h5_file.close()
+
+        write_metadata(self.filename, compute_metadata(num_frames=self.num_frames,
+                                                       num_features=self.num_features,
+                                                       dtype=self.dtype))
+
+    def log_statistics(self):
+        """
+        Report write throughput and compression ratio.
+
+        :return:
+        """
+        megabytes = 1024 ** 2
+
+        if self.write_seconds > 0:
+            throughput = self.raw_bytes / megabytes / self.write_seconds
+        else:
+            throughput = 0.0
+
+        if self.stored_bytes > 0:
+            compression_ratio = self.raw_bytes / self.stored_bytes
+        else:
+            compression_ratio = 1.0
+
+        logging.debug("Wrote %d examples to '%s' in %.2f seconds (%.1f MB/s): %.1f MB raw, %.1f MB stored, "
+                      "compression ratio %.2f" % (self.size, self.filename, self.write_seconds, throughput,
+                                                  self.raw_bytes / megabytes, self.stored_bytes / megabytes,
+                                                  compression_ratio))
+
+
+def count_h5_examples(filename: str) -> int:
+    """
+    Number of examples in an H5 file with one dataset per example, without reading any of them.
+
+    :param filename:
+    :return:
+    """
+    with h5py.File(filename, "r") as h5_file:
+        return len(h5_file.keys())
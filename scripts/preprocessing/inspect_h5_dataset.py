@@ -0,0 +1,97 @@
+#! /usr/bin/python3
+
+import json
+import h5py
+import argparse
+import logging
+
+from typing import Dict, Any
+
+from dataset_metadata import read_metadata, write_metadata, compute_metadata_from_h5
+
+
+QUERIES = ["count", "shape", "stats"]
+
+
+def get_metadata(filename: str, write: bool) -> Dict[str, Any]:
+    """
+    Metadata from the metadata file, or computed from the shapes of all examples if there is no usable
+    metadata file.
+
+    :param filename:
+    :param write: Whether to write computed metadata to a metadata file.
+    :return:
+    """
+    metadata = read_metadata(filename)
+
+    if metadata is not None:
+        return metadata
+
+    logging.debug("No metadata file for '%s', reading shapes of all examples" % filename)
+
+    metadata = compute_metadata_from_h5(filename)
+
+    if write:
+        write_metadata(filename, metadata)
+
+    return metadata
+
+
+def get_shape(filename: str) -> Dict[str, Any]:
+    """
+    Answered from the metadata file if possible, otherwise from the first example in the H5 file.
+
+    :param filename:
+    :return:
+    """
+    metadata = read_metadata(filename)
+
+    if metadata is not None:
+        return {key: metadata[key] for key in ["num_examples", "num_features", "dtype"]}
+
+    with h5py.File(filename, "r") as h5_file:
+        num_examples = len(h5_file.keys())
+
+        if num_examples == 0:
+            return {"num_examples": 0, "num_features": None, "dtype": None}
+
+        first_example = h5_file["0"]
+
+        return {"num_examples": num_examples,
+                "num_features": first_example.shape[1],
+                "dtype": str(first_example.dtype)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("filename", type=str,
+                        help="H5 dataset with one dataset per example (for instance train.h5 or train.src).")
+    parser.add_argument("--query", type=str, default="count", choices=QUERIES,
+                        help="'count': number of examples. 'shape': number of examples, features per frame and "
+                             "data type. 'stats': all metadata, including frame statistics (default: count).",
+                        required=False)
+    parser.add_argument("--write-metadata", action="store_true",
+                        help="If there is no metadata file for the dataset, write one (for instance for datasets "
+                             "created before metadata files existed).", required=False)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.query == "count":
+        print(get_shape(args.filename)["num_examples"])
+    elif args.query == "shape":
+        print(json.dumps(get_shape(args.filename)))
+    else:
+        print(json.dumps(get_metadata(args.filename, write=args.write_metadata), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import time
+import resource
+import functools
+import contextlib
+
+from typing import Dict, List, Iterator, Any, Callable
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Peak resident set size of the current process so far (ru_maxrss is in kilobytes on Linux).
+
+    :return:
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageTimer:
+    """
+    Accumulates wall time and CPU time of named stages. Stages can be nested, the time of a nested stage is not
+    counted for the enclosing stage, so that the times of all stages add up to the total time.
+
+    For each stage, peak RSS is the peak resident set size of the process at the end of the stage (the highest
+    value seen so far, not the memory that the stage itself needs).
+    """
+
+    def __init__(self):
+        self.stages = {}  # type: Dict[str, Dict[str, float]]
+        self.stack = []  # type: List[List[float]]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+
+        :return: Copy of the current statistics.
+        """
+        return {name: dict(statistics) for name, statistics in self.stages.items()}
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+
+        :param name:
+        :return:
+        """
+        # wall and CPU time of nested stages, subtracted when this stage ends
+        nested = [0.0, 0.0]
+        self.stack.append(nested)
+
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+
+            self.stack.pop()
+
+            if len(self.stack) > 0:
+                self.stack[-1][0] += wall
+                self.stack[-1][1] += cpu
+
+            statistics = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0,
+                                                       "peak_rss_mb": 0.0})
+
+            statistics["wall_seconds"] += wall - nested[0]
+            statistics["cpu_seconds"] += cpu - nested[1]
+            statistics["calls"] += 1
+            statistics["peak_rss_mb"] = max(statistics["peak_rss_mb"], get_peak_rss_mb())
+
+    def merge(self, stages: Dict[str, Dict[str, float]]):
+        """
+        Add the stages of another timer, for instance from a worker process.
+
+        :param stages:
+        :return:
+        """
+        for name, other in stages.items():
+            statistics = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0,
+                                                       "peak_rss_mb": 0.0})
+
+            statistics["wall_seconds"] += other["wall_seconds"]
+            statistics["cpu_seconds"] += other["cpu_seconds"]
+            statistics["calls"] += other["calls"]
+            statistics["peak_rss_mb"] = max(statistics["peak_rss_mb"], other["peak_rss_mb"])
+
+
+# timer of the current process, each worker process has its own
+STAGE_TIMER = StageTimer()
+
+
+def round_stages(stages: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, Any]]:
+    """
+
+    :param stages: Statistics by stage name, see `StageTimer`.
+    :return: Same statistics, rounded for reports.
+    """
+    return {name: {key: round(value, 4) if isinstance(value, float) else value
+                   for key, value in statistics.items()}
+            for name, statistics in stages.items()}
+
+
+def timed_stage(name: str):
+    """
+    Example: `with timed_stage("parse_json"): ...`
+
+    :param name:
+    :return:
+    """
+    return STAGE_TIMER.stage(name)
+
+
+def timed_iterator(iterator: Iterator, name: str) -> Iterator:
+    """
+    Counts the time spent to produce each item of an iterator for a stage, but not the time the caller spends
+    with the items.
+
+    :param iterator:
+    :param name:
+    :return:
+    """
+    iterator = iter(iterator)
+
+    while True:
+        with timed_stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+
+        yield item
+
+
+def subtract_stages(after: Dict[str, Dict[str, float]],
+                    before: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """
+    Statistics of the stages between two snapshots of a timer.
+
+    :param after:
+    :param before:
+    :return:
+    """
+    difference = {}  # type: Dict[str, Dict[str, float]]
+
+    for name, statistics in after.items():
+        previous = before.get(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+
+        if statistics["calls"] == previous["calls"]:
+            continue
+
+        difference[name] = {"wall_seconds": statistics["wall_seconds"] - previous["wall_seconds"],
+                            "cpu_seconds": statistics["cpu_seconds"] - previous["cpu_seconds"],
+                            "calls": statistics["calls"] - previous["calls"],
+                            "peak_rss_mb": statistics["peak_rss_mb"]}
+
+    return difference
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorator that counts all calls of a function for a stage.
+
+    :param name:
+    :return:
+    """
+    def decorator(function: Callable) -> Callable:
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed_stage(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
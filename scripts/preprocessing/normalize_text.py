@@ -0,0 +1,290 @@
+#! /usr/bin/python3
+
+import re
+import sys
+import json
+import argparse
+import logging
+import unicodedata
+import collections
+import multiprocessing
+
+from typing import List, Tuple, Iterator, Optional, IO
+
+
+# Normalization of target texts, in a single pass and in the same order as the chain of filters it replaces:
+#
+# perl -CS -pe 'tr[\x{9}\x{A}\x{D}\x{20}-\x{D7FF}\x{E000}-\x{FFFD}\x{10000}-\x{10FFFF}][]cd;' |
+# perl -CS -pe 's/\&\s*\#\s*160\s*\;/ /g' |
+# replace-unicode-punctuation.perl | remove-non-printing-char.perl | deescape-special-chars.perl |
+# sed 's/  */ /g;s/^ *//g;s/ *$//g'
+#
+# (the perl scripts are from the Moses tokenizer folder)
+
+# characters that are not allowed in XML are deleted
+
+DISALLOWED_CHARACTERS = re.compile("[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]")
+
+# Perl's \s, which does not match the separators \x1c-\x1f (unlike \s in Python)
+
+PERL_WHITESPACE = "[\t\n\x0b\x0c\r \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]"
+
+NBSP_ENTITY = re.compile("&{ws}*#{ws}*160{ws}*;".format(ws=PERL_WHITESPACE))
+
+# replace-unicode-punctuation.perl, in the order of the script
+
+UNICODE_PUNCTUATION = [("，", ","),
+                       (re.compile("。 *"), ". "),
+                       ("、", ","),
+                       ("”", '"'),
+                       ("“", '"'),
+                       ("∶", ":"),
+                       ("：", ":"),
+                       ("？", "?"),
+                       ("《", '"'),
+                       ("》", '"'),
+                       ("）", ")"),
+                       ("！", "!"),
+                       ("（", "("),
+                       ("；", ";"),
+                       ("１", "1"),
+                       ("」", '"'),
+                       ("「", '"'),
+                       ("０", "0"),
+                       ("３", "3"),
+                       ("２", "2"),
+                       ("５", "5"),
+                       ("６", "6"),
+                       ("９", "9"),
+                       ("７", "7"),
+                       ("８", "8"),
+                       ("４", "4"),
+                       (re.compile("． *"), ". "),
+                       ("～", "~"),
+                       ("’", "'"),
+                       ("…", "..."),
+                       ("━", "-"),
+                       ("〈", "<"),
+                       ("〉", ">"),
+                       ("【", "["),
+                       ("】", "]"),
+                       ("％", "%")]
+
+# deescape-special-chars.perl, "&amp;" must come last
+
+SPECIAL_CHARACTER_ESCAPES = [("&bar;", "|"),
+                             ("&#124;", "|"),
+                             ("&lt;", "<"),
+                             ("&gt;", ">"),
+                             ("&bra;", "["),
+                             ("&ket;", "]"),
+                             ("&quot;", '"'),
+                             ("&apos;", "'"),
+                             ("&#91;", "["),
+                             ("&#93;", "]"),
+                             ("&amp;", "&")]
+
+MULTIPLE_SPACES = re.compile(" +")
+
+# compiled on first use in each process, see get_non_printing_characters
+
+NON_PRINTING_CHARACTERS = None  # type: Optional[re.Pattern]
+
+
+def get_non_printing_characters() -> re.Pattern:
+    """
+    Pattern for Perl's \\p{C} (all "Other" categories: control, format, surrogate, private use and unassigned),
+    which remove-non-printing-char.perl replaces with spaces. Python has no such character class, it is built
+    from the Unicode database.
+
+    :return:
+    """
+    global NON_PRINTING_CHARACTERS
+
+    if NON_PRINTING_CHARACTERS is not None:
+        return NON_PRINTING_CHARACTERS
+
+    ranges = []  # type: List[Tuple[int, int]]
+
+    for code_point in range(sys.maxunicode + 1):
+        if unicodedata.category(chr(code_point))[0] != "C":
+            continue
+
+        if len(ranges) > 0 and ranges[-1][1] == code_point - 1:
+            ranges[-1] = (ranges[-1][0], code_point)
+        else:
+            ranges.append((code_point, code_point))
+
+    character_class = "".join(["%s-%s" % (re.escape(chr(start)), re.escape(chr(end))) for start, end in ranges])
+
+    NON_PRINTING_CHARACTERS = re.compile("[%s]" % character_class)
+
+    return NON_PRINTING_CHARACTERS
+
+
+def normalize_line(line: str) -> str:
+    """
+
+    :param line: Without line break.
+    :return: Without line break.
+    """
+    line = DISALLOWED_CHARACTERS.sub("", line)
+    line = NBSP_ENTITY.sub(" ", line)
+
+    for original, replacement in UNICODE_PUNCTUATION:
+        if isinstance(original, str):
+            line = line.replace(original, replacement)
+        else:
+            line = original.sub(replacement, line)
+
+    line = get_non_printing_characters().sub(" ", line)
+
+    for original, replacement in SPECIAL_CHARACTER_ESCAPES:
+        line = line.replace(original, replacement)
+
+    line = MULTIPLE_SPACES.sub(" ", line)
+
+    return line.strip(" ")
+
+
+def normalize_chunk(chunk: Tuple[int, List[bytes], int]) -> Tuple[str, collections.Counter]:
+    """
+
+    :param chunk: Index of the first line, lines (as bytes, with line breaks) and the number of lines for which
+                  characters are counted (counting lines from the start of the input, not the chunk).
+    :return: Normalized lines (every line ends with a line break) and counts of their characters.
+    """
+    first_line_index, lines, max_inventory_lines = chunk
+
+    # Lines are only split at "\n" (like Perl). Invalid UTF-8 is replaced instead of failing in the
+    # middle of preprocessing.
+    normalized_lines = [normalize_line(line.decode("utf-8", errors="replace").rstrip("\n")) + "\n"
+                        for line in lines]
+
+    num_inventory_lines = max(0, min(len(lines), max_inventory_lines - first_line_index))
+
+    inventory = collections.Counter("".join(normalized_lines[:num_inventory_lines]))
+
+    return "".join(normalized_lines), inventory
+
+
+def read_chunks(handle: IO[bytes], chunk_size: int, max_inventory_lines: int) \
+        -> Iterator[Tuple[int, List[bytes], int]]:
+    """
+
+    :param handle: Opened in binary mode, so that lines are split at "\n" only.
+    :param chunk_size: Number of lines per chunk.
+    :param max_inventory_lines:
+    :return:
+    """
+    chunk = []  # type: List[bytes]
+    first_line_index = 0
+
+    for line in handle:
+        chunk.append(line)
+
+        if len(chunk) >= chunk_size:
+            yield first_line_index, chunk, max_inventory_lines
+            first_line_index += len(chunk)
+            chunk = []
+
+    if len(chunk) > 0:
+        yield first_line_index, chunk, max_inventory_lines
+
+
+def normalize_file(input_handle: IO[bytes],
+                   output_handle: IO[str],
+                   pool: Optional[multiprocessing.Pool],
+                   chunk_size: int,
+                   max_inventory_lines: int) -> Tuple[int, collections.Counter]:
+    """
+    Chunks are normalized by several processes, and written in their original order.
+
+    :param input_handle:
+    :param output_handle:
+    :param pool: None to normalize in this process.
+    :param chunk_size:
+    :param max_inventory_lines: Characters are counted for this many lines from the start of the input.
+    :return: Number of lines and counts of characters.
+    """
+    chunks = read_chunks(input_handle, chunk_size=chunk_size, max_inventory_lines=max_inventory_lines)
+
+    if pool is None:
+        results = map(normalize_chunk, chunks)
+    else:
+        results = pool.imap(normalize_chunk, chunks)
+
+    num_lines = 0
+    inventory = collections.Counter()  # type: collections.Counter
+
+    for normalized_text, chunk_inventory in results:
+        output_handle.write(normalized_text)
+
+        num_lines += normalized_text.count("\n")
+        inventory.update(chunk_inventory)
+
+    return num_lines, inventory
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--inputs", type=str, nargs="+", help="Input files.", required=True)
+    parser.add_argument("--outputs", type=str, nargs="+", help="One output file for each input file.",
+                        required=True)
+    parser.add_argument("--num-workers", type=int, default=1,
+                        help="Number of processes that normalize chunks of lines (default: 1).", required=False)
+    parser.add_argument("--chunk-size", type=int, default=10000,
+                        help="Number of lines per chunk (default: 10000).", required=False)
+    parser.add_argument("--char-inventory", type=str, default=None,
+                        help="Write counts of the characters in the normalized lines to this JSON file (counting "
+                             "the first --char-inventory-max-lines lines of each input).", required=False)
+    parser.add_argument("--char-inventory-max-lines", type=int, default=1000000,
+                        help="Number of lines of each input for which characters are counted "
+                             "(default: 1000000).", required=False)
+
+    args = parser.parse_args()
+
+    if len(args.inputs) != len(args.outputs):
+        parser.error("--inputs and --outputs must have the same number of files")
+
+    return args
+
+
+def main():
+
+    args = parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    logging.debug(args)
+
+    if args.num_workers > 1:
+        pool = multiprocessing.Pool(processes=args.num_workers)
+    else:
+        pool = None
+
+    inventory = collections.Counter()  # type: collections.Counter
+
+    for input_path, output_path in zip(args.inputs, args.outputs):
+        with open(input_path, "rb") as input_handle, open(output_path, "w", encoding="utf-8") as output_handle:
+            num_lines, file_inventory = normalize_file(input_handle, output_handle, pool=pool,
+                                                       chunk_size=args.chunk_size,
+                                                       max_inventory_lines=args.char_inventory_max_lines)
+
+        inventory.update(file_inventory)
+
+        logging.debug("Normalized %d lines: %s -> %s" % (num_lines, input_path, output_path))
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    if args.char_inventory is not None:
+        with open(args.char_inventory, "w", encoding="utf-8") as handle:
+            json.dump(dict(inventory.most_common()), handle, indent=2, ensure_ascii=False)
+
+        logging.debug("Number of distinct characters: %d" % len(inventory))
+
+
+if __name__ == '__main__':
+    main()
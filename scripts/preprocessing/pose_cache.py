@@ -0,0 +1,213 @@
+import io
+import os
+import hashlib
+import logging
+
+import numpy as np
+import numpy.ma as ma
+
+from typing import Optional, List, Tuple
+
+from pose_format import Pose, PoseHeader
+from pose_format.numpy import NumPyPoseBody
+from pose_format.utils.reader import BufferReader
+
+from atomic_files import write_atomically
+
+
+CACHE_FILE_EXTENSION = ".npz"
+
+
+class PoseCache:
+    """
+    Stores decoded poses of entire videos on disk, so that pose archives only need to be decompressed and parsed
+    once. Entries are keyed by the path, size and modification time of the archive, the framerate and the data
+    type, and the least recently used entries are deleted if the cache grows beyond a maximum size.
+
+    Poses are cached as they are read from the archive, before any framerate conversion or normalization.
+    """
+
+    def __init__(self, cache_dir: str, max_size: Optional[int] = None):
+        """
+
+        :param cache_dir:
+        :param max_size: Maximum size of all cache entries in bytes. Default: no limit.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(self, filepath: str, fps: float, dtype: np.dtype) -> str:
+        """
+        The data type is part of the key, poses decoded with less precision cannot be converted to poses decoded
+        with more precision.
+
+        :param filepath:
+        :param fps:
+        :param dtype: Data type of pose data and confidence.
+        :return:
+        """
+        stat = os.stat(filepath)
+
+        key_parts = [os.path.abspath(filepath), str(stat.st_size), str(stat.st_mtime_ns), str(fps),
+                     str(np.dtype(dtype))]
+
+        return hashlib.sha1("\t".join(key_parts).encode("utf-8")).hexdigest()
+
+    def get_entry_path(self, key: str) -> str:
+        """
+
+        :param key:
+        :return:
+        """
+        return os.path.join(self.cache_dir, key + CACHE_FILE_EXTENSION)
+
+    def get(self, filepath: str, fps: float, dtype: np.dtype) -> Optional[Pose]:
+        """
+        Returns None if there is no usable entry for this archive.
+
+        :param filepath:
+        :param fps:
+        :param dtype:
+        :return:
+        """
+        entry_path = self.get_entry_path(self.get_key(filepath=filepath, fps=fps, dtype=dtype))
+
+        try:
+            pose = read_pose_entry(entry_path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning("Removing unreadable cache entry '%s': %s", entry_path, str(e))
+            remove_if_exists(entry_path)
+            return None
+
+        # mark entry as recently used
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            # entry was evicted by another process in the meantime
+            pass
+
+        return pose
+
+    def put(self, filepath: str, fps: float, dtype: np.dtype, pose: Pose):
+        """
+
+        :param filepath:
+        :param fps:
+        :param dtype: Data type that `pose` was decoded with.
+        :param pose:
+        :return:
+        """
+        entry_path = self.get_entry_path(self.get_key(filepath=filepath, fps=fps, dtype=dtype))
+
+        write_pose_entry(entry_path=entry_path, pose=pose)
+
+        if self.max_size is not None:
+            self.evict(keep=entry_path)
+
+    def list_entries(self) -> List[Tuple[float, int, str]]:
+        """
+
+        :return: Tuples of (last access time, size in bytes, path), least recently used first.
+        """
+        entries = []
+
+        with os.scandir(self.cache_dir) as entry_iterator:
+            for entry in entry_iterator:  # type: os.DirEntry
+                if not entry.name.endswith(CACHE_FILE_EXTENSION):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort()
+
+        return entries
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Delete least recently used entries until the cache is not bigger than its maximum size.
+
+        :param keep: Path of an entry that should not be deleted, even if the maximum size is exceeded.
+        :return:
+        """
+        entries = self.list_entries()
+
+        total_size = sum([size for _, size, _ in entries])
+
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            if path == keep:
+                continue
+
+            logging.debug("Evicting cache entry: %s", path)
+            remove_if_exists(path)
+
+            total_size -= size
+
+
+def remove_if_exists(path: str):
+    """
+
+    :param path:
+    :return:
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_pose_entry(entry_path: str, pose: Pose):
+    """
+    Several conversions can share a cache, see `write_atomically`.
+
+    :param entry_path:
+    :param pose:
+    :return:
+    """
+    header_buffer = io.BytesIO()
+    pose.header.write(header_buffer)
+
+    data = pose.body.data
+
+    if isinstance(data, ma.MaskedArray):
+        mask = ma.getmaskarray(data)
+        data = ma.getdata(data)
+    else:
+        mask = np.zeros(shape=(0,), dtype=bool)
+
+    with write_atomically(entry_path, mode="wb") as handle:
+        np.savez(handle,
+                 header=np.frombuffer(header_buffer.getvalue(), dtype=np.uint8),
+                 fps=np.array(pose.body.fps),
+                 data=data,
+                 mask=mask,
+                 confidence=pose.body.confidence)
+
+
+def read_pose_entry(entry_path: str) -> Pose:
+    """
+
+    :param entry_path:
+    :return:
+    """
+    with np.load(entry_path, allow_pickle=False) as arrays:
+        header = PoseHeader.read(BufferReader(arrays["header"].tobytes()))
+        fps = arrays["fps"].item()
+        data = arrays["data"]
+        mask = arrays["mask"]
+        confidence = arrays["confidence"]
+
+    if mask.size > 0:
+        data = ma.masked_array(data, mask=mask)
+
+    body = NumPyPoseBody(fps=fps, data=data, confidence=confidence)
+
+    return Pose(header=header, body=body)
@@ -13,6 +13,9 @@
 # $force_target_fps
 # $normalize_poses
 # $testing_corpora
+#
+# optional:
+# $keypoint_selection (arguments for convert_and_split_data.py, for instance "--components POSE_LANDMARKS")
 
 
 base=$1
@@ -27,12 +30,16 @@ sentencepiece_vocab_size=$9
 force_target_fps=${10}
 normalize_poses=${11}
 testing_corpora=${12}
+keypoint_selection=${13:-}
 
 download=$base/download
 data=$base/data
 venvs=$base/venvs
 scripts=$base/scripts
 shared_models=$base/shared_models
+pose_cache=$base/pose_cache
+sentencepiece_cache=$base/sentencepiece_cache
+conversion_store=$base/conversion_store
 
 mkdir -p $shared_models
 
@@ -55,9 +62,6 @@ source activate $venvs/sockeye3
 
 set -u
 
-MOSES=$base/tools/moses-scripts/scripts
-TOKENIZER=$MOSES/tokenizer
-
 DEVTEST_SIZE=100
 
 DRY_RUN_TRAIN_SIZE=100
@@ -70,6 +74,21 @@ SENTENCEPIECE_MAX_LINES=1000000
 SUBSETS_EXCEPT_TRAIN="dev test"
 ALL_SUBSETS="$SUBSETS_EXCEPT_TRAIN train"
 
+# convert videos in parallel with as many processes as CPUs are allocated to this job
+
+NUM_WORKERS=${SLURM_CPUS_PER_TASK:-1}
+
+# decoded poses can be cached and shared between all models, since they do not depend on preprocessing options.
+# Off by default: the cache needs entire videos (so all frames are decoded, even for dry runs) and can take up
+# to POSE_CACHE_MAX_GB of disk space. Set USE_POSE_CACHE=true in the environment to use it.
+
+USE_POSE_CACHE=${USE_POSE_CACHE:-false}
+POSE_CACHE_MAX_GB=100
+
+# lossless compression of converted pose files (h5py decompresses transparently when reading)
+
+H5_COMPRESSION_ARGS="--h5-compression gzip --h5-compression-level 4 --h5-shuffle"
+
 echo "data_sub: $data_sub"
 
 # measure time
@@ -78,12 +97,20 @@ SECONDS=0
 
 #################
 
-if [[ -d $data_sub ]]; then
+# a folder without this file is left over from an interrupted run, which is resumed
+
+done_file=$data_sub/PREPROCESSING_DONE
+
+if [[ -f $done_file ]]; then
     echo "Folder already exists: $data_sub"
     echo "Skipping. Delete files to repeat step."
     exit 0
 fi
 
+if [[ -d $data_sub ]]; then
+    echo "Resuming interrupted preprocessing in: $data_sub"
+fi
+
 mkdir -p $data_sub
 
 # truncate all data if dry run
@@ -110,6 +137,15 @@ else
     normalize_poses_arg=""
 fi
 
+if [[ $USE_POSE_CACHE == "true" ]]; then
+    pose_cache_args="--pose-cache-dir $pose_cache --pose-cache-max-gb $POSE_CACHE_MAX_GB"
+else
+    pose_cache_args=""
+fi
+
+# converted data is stored in $conversion_store and linked into $data_sub, models with the same conversion options
+# (for instance models that only differ in sentencepiece_vocab_size or bucket_scaling) share converted data
+
 for training_corpus in $training_corpora; do
 
     download_sub=$download/$training_corpus
@@ -125,15 +161,33 @@ for training_corpus in $training_corpora; do
         --seed $seed \
         --dev-size $devtest_size \
         --test-size $devtest_size \
-        --pose-type $pose_type $train_size_arg $dry_run_arg $target_fps_arg $normalize_poses_arg
+        --num-workers $NUM_WORKERS \
+        --store-dir $conversion_store \
+        $H5_COMPRESSION_ARGS \
+        --resume \
+        --pose-type $pose_type $train_size_arg $dry_run_arg $target_fps_arg $normalize_poses_arg $pose_cache_args \
+        $keypoint_selection
 
 done
 
+# number of features per frame (the same for all corpora), read by prepare and train steps
+
+for training_corpus in $training_corpora; do
+    num_features_file=$data_sub/$training_corpus.$pose_type.num_features
+
+    if [[ -f $data_sub/num_features ]] && ! cmp -s $num_features_file $data_sub/num_features; then
+        echo "Number of features is different for $training_corpus: $num_features_file"
+        exit 1
+    fi
+
+    cp $num_features_file $data_sub/num_features
+done
+
 # combine training corpora (poses and text separately)
 
 for subset in $ALL_SUBSETS; do
 
-    touch $data_sub/$subset.trg
+    > $data_sub/$subset.trg
 
     # combine texts
 
@@ -178,53 +232,73 @@ for testing_corpus in $testing_corpora; do
             --seed $seed \
             --dev-size 0 \
             --test-size 0 \
-            --pose-type $pose_type $train_size_arg $dry_run_arg $target_fps_arg $normalize_poses_arg
+            --num-workers $NUM_WORKERS \
+            --store-dir $conversion_store \
+            $H5_COMPRESSION_ARGS \
+            --resume \
+            --pose-type $pose_type $train_size_arg $dry_run_arg $target_fps_arg $normalize_poses_arg $pose_cache_args \
+            $keypoint_selection
+
+    # delete unused files and move to correct file extensions (already done if this corpus was converted before
+    # an interruption)
+
+    rm -f $data_sub/$testing_corpus.*{dev,test}.{h5,txt,h5.meta.json}
+
+    if [[ -f $data_sub/$testing_corpus.$pose_type.train.h5 ]]; then
+        mv $data_sub/$testing_corpus.$pose_type.train.h5 $data_sub/$testing_corpus.src
+        mv $data_sub/$testing_corpus.$pose_type.train.h5.meta.json $data_sub/$testing_corpus.src.meta.json
+        mv $data_sub/$testing_corpus.train.txt $data_sub/$testing_corpus.trg
+    fi
 
-    # delete unused files and move to correct file extensions
+done
 
-    rm $data_sub/$testing_corpus.*{dev,test}.{h5,txt}
+# normalize all subsets (targets only from here on), in one pass over each file with several processes
 
-    mv $data_sub/$testing_corpus.$pose_type.train.h5 $data_sub/$testing_corpus.src
-    mv $data_sub/$testing_corpus.train.txt $data_sub/$testing_corpus.trg
+normalize_inputs=""
+normalize_outputs=""
 
+for subset in $SUBSETS_EXCEPT_TRAIN; do
+    normalize_inputs="$normalize_inputs $data_sub/$subset.trg"
+    normalize_outputs="$normalize_outputs $data_sub/$subset.normalized.trg"
 done
 
-# prenormalization for all subsets (targets only from here on)
+python $scripts/preprocessing/normalize_text.py \
+    --inputs $normalize_inputs \
+    --outputs $normalize_outputs \
+    --num-workers $NUM_WORKERS
 
-for subset in $ALL_SUBSETS; do
-      cat $data_sub/$subset.trg | \
-      perl -CS -pe 'tr[\x{9}\x{A}\x{D}\x{20}-\x{D7FF}\x{E000}-\x{FFFD}\x{10000}-\x{10FFFF}][]cd;' | \
-      perl -CS -pe 's/\&\s*\#\s*160\s*\;/ /g' \
-      > $data_sub/$subset.prenorm.trg
-done
+# characters of normalized train data are counted while normalizing
 
-# normalize train data
+python $scripts/preprocessing/normalize_text.py \
+    --inputs $data_sub/train.trg \
+    --outputs $data_sub/train.normalized.trg \
+    --num-workers $NUM_WORKERS \
+    --char-inventory $data_sub/train.chars.json \
+    --char-inventory-max-lines $SENTENCEPIECE_MAX_LINES
 
-cat $data_sub/train.prenorm.trg | \
-    ${TOKENIZER}/replace-unicode-punctuation.perl | \
-    ${TOKENIZER}/remove-non-printing-char.perl | \
-    ${TOKENIZER}/deescape-special-chars.perl | \
-    sed 's/  */ /g;s/^ *//g;s/ *$//g' > \
-        $data_sub/train.normalized.trg
+# remove train examples without frames, with empty targets (after normalization) or with NaN values, before they
+# reach sentencepiece and sockeye (dev and test data are not filtered)
 
-# normalize dev / test data + other test corpora
+python $scripts/preprocessing/filter_parallel_data.py \
+    --input-src $data_sub/train.src \
+    --input-trg $data_sub/train.normalized.trg \
+    --output-src $data_sub/train.filtered.src \
+    --output-trg $data_sub/train.filtered.normalized.trg \
+    --remove-non-finite \
+    --report $data_sub/train.filter_report.json
 
-for subset in $SUBSETS_EXCEPT_TRAIN; do
-    cat $data_sub/$subset.prenorm.trg | \
-    ${TOKENIZER}/replace-unicode-punctuation.perl | \
-    ${TOKENIZER}/remove-non-printing-char.perl | \
-    ${TOKENIZER}/deescape-special-chars.perl | \
-    sed 's/  */ /g;s/^ *//g;s/ *$//g' > \
-        $data_sub/$subset.normalized.trg
-done
+mv $data_sub/train.filtered.src $data_sub/train.src
+mv $data_sub/train.filtered.src.meta.json $data_sub/train.src.meta.json
+mv $data_sub/train.filtered.normalized.trg $data_sub/train.normalized.trg
 
 echo "sentencepiece_vocab_size=$sentencepiece_vocab_size"
 
-# learn sentencepiece model on train target
+# learn sentencepiece model on train target (or reuse a model that was trained on the same text with the same
+# options, for instance by a model that only differs in pose options)
 
 # determine character coverage
 
-num_characters=$(head -n 1000000 $data_sub/train.normalized.trg | python $scripts/preprocessing/num_chars.py | wc -l)
+num_characters=$(python -c "import json, sys; print(len(json.load(open(sys.argv[1]))))" $data_sub/train.chars.json)
 
 if [[ $num_characters -gt 1000 ]]; then
     character_coverage=0.9995
@@ -237,17 +311,25 @@ python $scripts/preprocessing/train_sentencepiece.py \
   --input $data_sub/train.normalized.trg \
   --vocab-size $sentencepiece_vocab_size \
   --character-coverage $character_coverage \
-  --input-sentence-size=$SENTENCEPIECE_MAX_LINES
+  --input-sentence-size=$SENTENCEPIECE_MAX_LINES \
+  --cache-dir $sentencepiece_cache
+
+# apply SP model to train, test and dev (loading the model once, and encoding batches of lines with several threads)
 
-# apply SP model to train, test and dev
+sentencepiece_inputs=""
+sentencepiece_outputs=""
 
 for subset in $ALL_SUBSETS; do
-    cat $data_sub/$subset.normalized.trg | \
-        python $scripts/preprocessing/apply_sentencepiece.py \
-            --model $shared_models_sub/trg.sentencepiece.model \
-                > $data_sub/$subset.pieces.trg
+    sentencepiece_inputs="$sentencepiece_inputs $data_sub/$subset.normalized.trg"
+    sentencepiece_outputs="$sentencepiece_outputs $data_sub/$subset.pieces.trg"
 done
 
+python $scripts/preprocessing/apply_sentencepiece.py \
+    --model $shared_models_sub/trg.sentencepiece.model \
+    --inputs $sentencepiece_inputs \
+    --outputs $sentencepiece_outputs \
+    --num-threads $NUM_WORKERS
+
 # sizes
 echo "Sizes of all files:"
 
@@ -262,5 +344,7 @@ wc -l $data_sub/*.txt
 wc -l $data_sub/*.trg
 wc -l $shared_models_sub/*
 
+touch $done_file
+
 echo "time taken:"
 echo "$SECONDS seconds"
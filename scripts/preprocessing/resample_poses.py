@@ -0,0 +1,192 @@
+import numpy as np
+import numpy.ma as ma
+
+from fractions import Fraction
+from typing import Tuple, Optional
+
+from instrumentation import timed
+
+
+RESAMPLING_METHODS = ["drop", "nearest", "linear"]
+
+
+def round_framerate(fps: float) -> float:
+    """
+    Video metadata often has framerates such as 29.97002997 or 24.999. Framerates are rounded to two decimals, and
+    whole framerates are returned as int.
+
+    :param fps:
+    :return:
+    """
+    fps = round(fps, 2)
+
+    if fps.is_integer():
+        return int(fps)
+
+    return fps
+
+
+def get_resampling_ratio(video_fps: float, target_fps: float) -> Tuple[int, int]:
+    """
+    Ratio of source frames per target frame as an exact fraction, so that indexes do not suffer from floating point
+    errors (for instance with 29.97 fps).
+
+    :param video_fps:
+    :param target_fps:
+    :return: Tuple of (numerator, denominator).
+    """
+    ratio = Fraction(str(video_fps)) / Fraction(str(target_fps))
+
+    return ratio.numerator, ratio.denominator
+
+
+def get_source_offset(numerator: int, denominator: int, method: str) -> int:
+    """
+    With "drop", downsampling by a ratio that is not a whole number takes the source frame after the position of
+    a target frame, as the original conversion from 30 to 25 fps did (it deleted every sixth frame, starting with
+    the first one).
+
+    :param numerator:
+    :param denominator:
+    :param method:
+    :return: Number of frames added to the source frame at or before the position of a target frame.
+    """
+    if method == "drop" and denominator != 1 and numerator > denominator:
+        return 1
+
+    return 0
+
+
+def get_num_target_frames(num_frames: int, video_fps: float, target_fps: float, method: str = "drop") -> int:
+    """
+    Number of target frames whose source frame is within the video.
+
+    :param num_frames:
+    :param video_fps:
+    :param target_fps:
+    :param method:
+    :return:
+    """
+    numerator, denominator = get_resampling_ratio(video_fps=video_fps, target_fps=target_fps)
+
+    num_frames -= get_source_offset(numerator=numerator, denominator=denominator, method=method)
+
+    # ceil(num_frames * denominator / numerator)
+    return max(-(-num_frames * denominator // numerator), 0)
+
+
+def get_source_frame_range(start_frame: int,
+                           end_frame: int,
+                           video_fps: float,
+                           target_fps: float) -> Tuple[int, int]:
+    """
+    Source frames needed to resample the target frames [start_frame, end_frame), including the following frame
+    that linear interpolation (or "drop") may need.
+
+    :param start_frame:
+    :param end_frame:
+    :param video_fps:
+    :param target_fps:
+    :return: Tuple of (first source frame, end of source frames).
+    """
+    numerator, denominator = get_resampling_ratio(video_fps=video_fps, target_fps=target_fps)
+
+    first_frame = start_frame * numerator // denominator
+    last_frame = (end_frame - 1) * numerator // denominator
+
+    return first_frame, last_frame + 2
+
+
+@timed("resample")
+def resample_pose_arrays(data: np.array,
+                         confidence: np.array,
+                         video_fps: float,
+                         target_fps: float,
+                         method: str = "drop",
+                         start_frame: int = 0,
+                         end_frame: Optional[int] = None,
+                         source_offset: int = 0) -> Tuple[np.array, np.array]:
+    """
+    Resample pose data and confidence in a single pass, for any pair of framerates. Target frame t corresponds to
+    the position t * video_fps / target_fps in the source frames.
+
+    - "drop": the same frames as the original conversion. For whole-number ratios (e.g. 50 -> 25) the first of
+      every k frames, otherwise the source frame after this position (for 30 -> 25, frames 1, 2, 3, 4, 5, 7, ...).
+      Upsampling repeats frames as "nearest" does.
+    - "nearest": take the source frame at or before this position (for 30 -> 25, frames 0, 1, 2, 3, 4, 6, ...).
+    - For both, if the ratio is a whole number, the results are strided views and nothing is copied.
+    - "linear": interpolate between the source frames before and after this position. Points that are missing
+      (zero confidence) in one of the two frames are taken from the frame where they are visible instead. At
+      positions that fall exactly on a source frame, that frame is taken as it is.
+
+    :param data: Array dimensions: (frames, person, points, dimensions), can be a masked array.
+    :param confidence: Array dimensions: (frames, person, points).
+    :param video_fps:
+    :param target_fps:
+    :param method:
+    :param start_frame: First target frame, to resample only part of a video.
+    :param end_frame: End of target frames. Default: end of video.
+    :param source_offset: Index of the first source frame in `data`, if it does not start at the beginning of the
+                          video (see `get_source_frame_range`).
+    :return: Tuple of resampled (data, confidence).
+    """
+    assert method in RESAMPLING_METHODS, "Unknown resampling method: '%s'" % method
+
+    num_frames = data.shape[0]
+
+    if end_frame is None:
+        end_frame = get_num_target_frames(num_frames=num_frames + source_offset,
+                                          video_fps=video_fps,
+                                          target_fps=target_fps,
+                                          method=method)
+
+    numerator, denominator = get_resampling_ratio(video_fps=video_fps, target_fps=target_fps)
+
+    if method != "linear" and denominator == 1:
+        source_slice = slice(start_frame * numerator - source_offset,
+                             (end_frame - 1) * numerator - source_offset + 1,
+                             numerator)
+        return data[source_slice], confidence[source_slice]
+
+    positions = np.arange(start_frame, end_frame, dtype=np.int64) * numerator
+    source_indexes = positions // denominator - source_offset
+
+    if method != "linear":
+        source_indexes += get_source_offset(numerator=numerator, denominator=denominator, method=method)
+        return data[source_indexes], confidence[source_indexes]
+
+    weights = (positions % denominator) / denominator
+    next_indexes = np.minimum(source_indexes + 1, num_frames - 1)
+
+    raw_data = ma.getdata(data)
+
+    data_before, data_after = raw_data[source_indexes], raw_data[next_indexes]
+    confidence_before, confidence_after = confidence[source_indexes], confidence[next_indexes]
+
+    confidence_weights = weights[:, None, None]
+    data_weights = weights[:, None, None, None]
+
+    exact = np.broadcast_to(confidence_weights == 0, confidence_before.shape)
+
+    visible_before = (confidence_before > 0) | exact
+    visible_after = (confidence_after > 0) & ~exact
+
+    # if a point is missing in both frames, the nearer frame is taken (with zero confidence)
+    both_visible = visible_before & visible_after
+    use_after = np.where(visible_before == visible_after, confidence_weights >= 0.5, visible_after)
+
+    new_confidence = np.where(both_visible,
+                              confidence_before + (confidence_after - confidence_before) * confidence_weights,
+                              np.where(use_after, confidence_after, confidence_before))
+    new_data = np.where(both_visible[..., None],
+                        data_before + (data_after - data_before) * data_weights,
+                        np.where(use_after[..., None], data_after, data_before))
+
+    new_confidence = new_confidence.astype(confidence.dtype, copy=False)
+    new_data = new_data.astype(raw_data.dtype, copy=False)
+
+    if isinstance(data, ma.MaskedArray):
+        mask = np.broadcast_to((new_confidence == 0)[..., None], new_data.shape)
+        new_data = ma.masked_array(new_data, mask=mask)
+
+    return new_data, new_confidence
@@ -1,16 +1,126 @@
 #! /usr/bin/python3
 
+import os
+import json
+import shutil
+import hashlib
 import argparse
 import logging
+import tempfile
 
 import sentencepiece as spm
 
+from typing import Dict, Any, Optional
+
+from atomic_files import copy_atomically
+
 # assuming standard Sockeye vocab files
 PAD_ID = 0
 UNK_ID = 1
 BOS_ID = 2
 EOS_ID = 3
 
+MODEL_FILE_EXTENSIONS = [".vocab", ".model"]
+
+HASH_BLOCK_SIZE = 1024 ** 2
+
+
+def get_trainer_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+
+    :param args:
+    :return: Keyword arguments for `spm.SentencePieceTrainer.train`, except input and model prefix.
+    """
+    return {"vocab_size": args.vocab_size,
+            "character_coverage": args.character_coverage,
+            "model_type": "unigram",
+            "pad_id": PAD_ID,
+            "unk_id": UNK_ID,
+            "bos_id": BOS_ID,
+            "eos_id": EOS_ID,
+            "hard_vocab_limit": False,
+            "input_sentence_size": args.input_sentence_size,
+            "shuffle_input_sentence": True}
+
+
+def get_cache_key(input_path: str, trainer_options: Dict[str, Any]) -> str:
+    """
+    Hash of the training text and all trainer options (and the sentencepiece version), so that a cached model is
+    only reused if training would produce the same model.
+
+    :param input_path:
+    :param trainer_options:
+    :return:
+    """
+    content_hash = hashlib.sha256()
+
+    with open(input_path, "rb") as handle:
+        for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b""):
+            content_hash.update(block)
+
+    key_parts = [content_hash.hexdigest(),
+                 json.dumps(trainer_options, sort_keys=True),
+                 spm.__version__]
+
+    return hashlib.sha256("\t".join(key_parts).encode("utf-8")).hexdigest()
+
+
+def get_cached_model(cache_dir: str, key: str) -> Optional[str]:
+    """
+
+    :param cache_dir:
+    :param key:
+    :return: Prefix of the cached model files, or None if there is no complete entry.
+    """
+    cache_prefix = os.path.join(cache_dir, key)
+
+    for extension in MODEL_FILE_EXTENSIONS:
+        if not os.path.exists(cache_prefix + extension):
+            return None
+
+    return cache_prefix
+
+
+def train_cached(model_prefix: str, input_path: str, cache_dir: str, trainer_options: Dict[str, Any]):
+    """
+    Copies a model from the cache if it was trained before with the same text and options. Otherwise the model
+    is trained in a temporary folder and then moved into the cache. The ".model" file is moved last, an entry
+    is only used if it exists, so several jobs can train and read the same entry at the same time.
+
+    :param model_prefix:
+    :param input_path:
+    :param cache_dir:
+    :param trainer_options:
+    :return:
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    key = get_cache_key(input_path, trainer_options)
+
+    cache_prefix = get_cached_model(cache_dir, key)
+
+    if cache_prefix is not None:
+        logging.debug("Using cached sentencepiece model: %s" % cache_prefix)
+    else:
+        cache_prefix = os.path.join(cache_dir, key)
+
+        temp_dir = tempfile.mkdtemp(dir=cache_dir, suffix=".tmp")
+
+        try:
+            temp_prefix = os.path.join(temp_dir, key)
+
+            spm.SentencePieceTrainer.train(model_prefix=temp_prefix, input=input_path, **trainer_options)
+
+            for extension in MODEL_FILE_EXTENSIONS:
+                os.replace(temp_prefix + extension, cache_prefix + extension)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        logging.debug("Stored sentencepiece model in cache: %s" % cache_prefix)
+
+    for extension in MODEL_FILE_EXTENSIONS:
+        copy_atomically(cache_prefix + extension, model_prefix + extension)
+
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -20,6 +130,10 @@ def parse_args():
     parser.add_argument("--vocab-size", type=int, help="Desired vocabulary size.", required=True)
     parser.add_argument("--input-sentence-size", type=int, help="Max lines of data to learn model from.", required=True)
     parser.add_argument("--character-coverage", type=float, help="Coverage of all unique characters.", required=True)
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Reuse models from this folder if they were trained on the same text with the same "
+                             "options, and store newly trained models there. Default: always train.",
+                        required=False)
 
     args = parser.parse_args()
 
@@ -33,18 +147,13 @@ def main():
     logging.basicConfig(level=logging.DEBUG)
     logging.debug(args)
 
-    spm.SentencePieceTrainer.train(model_prefix=args.model_prefix,
-                                   input=args.input,
-                                   vocab_size=args.vocab_size,
-                                   character_coverage=args.character_coverage,
-                                   model_type="unigram",
-                                   pad_id=PAD_ID,
-                                   unk_id=UNK_ID,
-                                   bos_id=BOS_ID,
-                                   eos_id=EOS_ID,
-                                   hard_vocab_limit=False,
-                                   input_sentence_size=args.input_sentence_size,
-                                   shuffle_input_sentence=True)
+    trainer_options = get_trainer_options(args)
+
+    if args.cache_dir is None:
+        spm.SentencePieceTrainer.train(model_prefix=args.model_prefix, input=args.input, **trainer_options)
+    else:
+        train_cached(model_prefix=args.model_prefix, input_path=args.input, cache_dir=args.cache_dir,
+                     trainer_options=trainer_options)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,188 @@
+#! /usr/bin/python3
+
+import os
+import cv2
+import argparse
+import logging
+
+from multiprocessing.pool import ThreadPool
+from typing import Dict, List, NamedTuple, Optional
+
+from atomic_files import write_atomically
+
+
+MANIFEST_NAME = "videos.manifest.tsv"
+
+MANIFEST_COLUMNS = ["filename", "fps", "num_frames", "duration", "size", "mtime_ns"]
+
+
+class VideoInfo(NamedTuple):
+    filename: str
+    fps: float
+    num_frames: int
+    duration: float
+    size: int
+    mtime_ns: int
+
+
+def probe_video(filepath: str) -> VideoInfo:
+    """
+    Get framerate and number of frames from video metadata. Based on:
+    https://stackoverflow.com/a/60976166/1987598
+
+    :param filepath:
+    :return:
+    """
+    stat = os.stat(filepath)
+
+    cap = cv2.VideoCapture(filepath)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    cap.release()
+
+    if fps > 0:
+        duration = float(num_frames) / float(fps)
+    else:
+        duration = 0.0
+
+    return VideoInfo(filename=os.path.basename(filepath),
+                     fps=fps,
+                     num_frames=num_frames,
+                     duration=duration,
+                     size=stat.st_size,
+                     mtime_ns=stat.st_mtime_ns)
+
+
+def get_manifest_path(video_dir: str) -> str:
+    """
+    The manifest is stored next to the video folder, for instance "download/srf/videos.manifest.tsv".
+
+    :param video_dir:
+    :return:
+    """
+    return os.path.join(os.path.dirname(os.path.normpath(video_dir)), MANIFEST_NAME)
+
+
+def read_manifest(manifest_path: str) -> Dict[str, VideoInfo]:
+    """
+
+    :param manifest_path:
+    :return: Video information by filename.
+    """
+    video_infos = {}  # type: Dict[str, VideoInfo]
+
+    with open(manifest_path, "r") as handle:
+        header = handle.readline().rstrip("\n").split("\t")
+
+        assert header == MANIFEST_COLUMNS, "Unexpected columns in manifest '%s': %s" % (manifest_path, str(header))
+
+        for line in handle:
+            filename, fps, num_frames, duration, size, mtime_ns = line.rstrip("\n").split("\t")
+
+            video_infos[filename] = VideoInfo(filename=filename,
+                                              fps=float(fps),
+                                              num_frames=int(num_frames),
+                                              duration=float(duration),
+                                              size=int(size),
+                                              mtime_ns=int(mtime_ns))
+
+    return video_infos
+
+
+def write_manifest(manifest_path: str, video_infos: Dict[str, VideoInfo]):
+    """
+    Several conversions can update the manifest of the same video folder, see `write_atomically`.
+
+    :param manifest_path:
+    :param video_infos:
+    :return:
+    """
+    with write_atomically(manifest_path) as handle:
+        handle.write("\t".join(MANIFEST_COLUMNS) + "\n")
+
+        for filename in sorted(video_infos.keys()):
+            info = video_infos[filename]
+            handle.write("\t".join([info.filename, repr(info.fps), str(info.num_frames), repr(info.duration),
+                                    str(info.size), str(info.mtime_ns)]) + "\n")
+
+
+def update_manifest(video_dir: str,
+                    manifest_path: Optional[str] = None,
+                    num_workers: int = 1) -> Dict[str, VideoInfo]:
+    """
+    Load the manifest of a video folder and probe only the videos that are new or whose size or modification time
+    changed. Probing is I/O-bound, so it runs in threads.
+
+    :param video_dir:
+    :param manifest_path: Default: see `get_manifest_path`.
+    :param num_workers:
+    :return: Video information by filename, for all videos currently in the folder.
+    """
+    if manifest_path is None:
+        manifest_path = get_manifest_path(video_dir)
+
+    if os.path.exists(manifest_path):
+        cached_infos = read_manifest(manifest_path)
+    else:
+        cached_infos = {}
+
+    video_infos = {}  # type: Dict[str, VideoInfo]
+    filepaths_to_probe = []  # type: List[str]
+
+    for filename in os.listdir(video_dir):
+        filepath = os.path.join(video_dir, filename)
+
+        stat = os.stat(filepath)
+        cached_info = cached_infos.get(filename, None)
+
+        if cached_info is not None and cached_info.size == stat.st_size and cached_info.mtime_ns == stat.st_mtime_ns:
+            video_infos[filename] = cached_info
+        else:
+            filepaths_to_probe.append(filepath)
+
+    logging.debug("Videos in manifest/to probe: %d/%d" % (len(video_infos), len(filepaths_to_probe)))
+
+    if len(filepaths_to_probe) > 0:
+        with ThreadPool(processes=max(num_workers, 1)) as pool:
+            for info in pool.imap_unordered(probe_video, filepaths_to_probe):
+                video_infos[info.filename] = info
+
+    if video_infos != cached_infos:
+        try:
+            write_manifest(manifest_path=manifest_path, video_infos=video_infos)
+        except OSError as e:
+            logging.warning("Could not write manifest '%s': %s", manifest_path, str(e))
+
+    return video_infos
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--video-dir", type=str,
+                        help="Folder with mp4 videos.", required=True)
+    parser.add_argument("--manifest", type=str, default=None,
+                        help="Path of manifest file. Default: '%s' next to the video folder." % MANIFEST_NAME,
+                        required=False)
+    parser.add_argument("--num-workers", type=int, default=8,
+                        help="Number of videos probed in parallel.", required=False)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    logging.debug(args)
+
+    video_infos = update_manifest(video_dir=args.video_dir, manifest_path=args.manifest, num_workers=args.num_workers)
+
+    logging.debug("Manifest has %d videos." % len(video_infos))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,7 @@
 # $bucket_scaling
 # $local_download_data
 # $$max_seq_len_source
+# $keypoint_selection (converter arguments, for instance "--components POSE_LANDMARKS LEFT_HAND_LANDMARKS")
 #
 # optional environment variables to be set when calling a run script (these are private tokens that should not appear
 # in logs or commits):
@@ -86,6 +87,12 @@ if [ -z "$max_seq_len_source" ]; then
     max_seq_len_source=500
 fi
 
+# default: keep all keypoints
+
+if [ -z "$keypoint_selection" ]; then
+    keypoint_selection=""
+fi
+
 # special consideration to Zenodo tokens
 # (these must be set as environment variables before / when calling a run script)
 
@@ -142,6 +149,7 @@ echo "POSE_TYPE: $pose_type" | tee -a $logs_sub_sub/MAIN
 echo "SENTENCEPIECE_VOCAB_SIZE: $sentencepiece_vocab_size" | tee -a $logs_sub_sub/MAIN
 echo "FORCE_TARGET_FPS: $force_target_fps" | tee -a $logs_sub_sub/MAIN
 echo "NORMALIZE_POSES: $normalize_poses" | tee -a $logs_sub_sub/MAIN
+echo "KEYPOINT_SELECTION: $keypoint_selection" | tee -a $logs_sub_sub/MAIN
 echo "BUCKET SCALING: $bucket_scaling" | tee -a $logs_sub_sub/MAIN
 echo "MAX_SEQ_LEN_SOURCE: $max_seq_len_source" | tee -a $logs_sub_sub/MAIN
 echo "DRY RUN: $dry_run" | tee -a $logs_sub_sub/MAIN
@@ -168,7 +176,8 @@ id_preprocess=$(
     $SLURM_LOG_ARGS \
     $scripts/preprocessing/preprocess_generic.sh \
     $base $src $trg $model_name $dry_run $seed "$training_corpora" \
-    $pose_type $sentencepiece_vocab_size $force_target_fps $normalize_poses "$testing_corpora"
+    $pose_type $sentencepiece_vocab_size $force_target_fps $normalize_poses "$testing_corpora" \
+    "$keypoint_selection"
 )
 
 echo "  id_preprocess: $id_preprocess | $logs_sub_sub/slurm-$id_preprocess.out" | tee -a $logs_sub_sub/MAIN
@@ -11,13 +11,13 @@
 # $training_corpora
 # $testing_corpora
 # $seed
-# $fps
 # $pose_type
 # $sentencepiece_vocab_size
 # $force_target_fps
 # $normalize_poses
 # $bucket_scaling
 # $local_download_data
+# $keypoint_selection (converter arguments, for instance "--components POSE_LANDMARKS LEFT_HAND_LANDMARKS")
 #
 # optional environment variables to be set when calling a run script (these are private tokens that should not appear
 # in logs or commits):
@@ -53,10 +53,6 @@ if [ -z "$testing_corpora" ]; then
     testing_corpora="test"
 fi
 
-if [ -z "$fps" ]; then
-    fps="25"
-fi
-
 if [ -z "$pose_type" ]; then
     pose_type="openpose"
 fi
@@ -81,6 +77,12 @@ if [ -z "$bucket_scaling" ]; then
     bucket_scaling="false"
 fi
 
+# default: keep all keypoints
+
+if [ -z "$keypoint_selection" ]; then
+    keypoint_selection=""
+fi
+
 # special consideration to Zenodo tokens
 # (these must be set as environment variables before / when calling a run script)
 
@@ -121,6 +123,7 @@ echo "POSE_TYPE: $pose_type" | tee -a $logs_sub_sub/MAIN
 echo "SENTENCEPIECE_VOCAB_SIZE: $sentencepiece_vocab_size" | tee -a $logs_sub_sub/MAIN
 echo "FORCE_TARGET_FPS: $force_target_fps" | tee -a $logs_sub_sub/MAIN
 echo "NORMALIZE_POSES: $normalize_poses" | tee -a $logs_sub_sub/MAIN
+echo "KEYPOINT_SELECTION: $keypoint_selection" | tee -a $logs_sub_sub/MAIN
 echo "BUCKET SCALING: $bucket_scaling" | tee -a $logs_sub_sub/MAIN
 echo "DRY RUN: $dry_run" | tee -a $logs_sub_sub/MAIN
 
@@ -141,7 +144,8 @@ id_preprocess=$(python  -c 'import uuid; print(uuid.uuid4().hex)')
 
 $scripts/preprocessing/preprocess_generic.sh \
     $base $src $trg $model_name $dry_run $seed "$training_corpora" \
-    $fps $pose_type $sentencepiece_vocab_size $force_target_fps $normalize_poses "$testing_corpora" \
+    $pose_type $sentencepiece_vocab_size $force_target_fps $normalize_poses "$testing_corpora" \
+    "$keypoint_selection" \
     > $logs_sub_sub/slurm-$id_preprocess.out 2> $logs_sub_sub/slurm-$id_preprocess.out
 
 echo "  id_preprocess: $id_preprocess | $logs_sub_sub/slurm-$id_preprocess.out" | tee -a $logs_sub_sub/MAIN
@@ -0,0 +1,852 @@
+#! /usr/bin/python3
+
+import os
+import sys
+import json
+import time
+import shlex
+import hashlib
+import argparse
+import itertools
+import logging
+import subprocess
+
+from typing import List, Dict, Optional, Any, NamedTuple, Tuple, Set
+
+
+# same defaults as run_generic.sh
+
+RUN_DEFAULTS = {"dry_run": "false",
+                "local_download_data": "false",
+                "training_corpora": "focusnews",
+                "testing_corpora": "test",
+                "pose_type": "openpose",
+                "seed": "1",
+                "sentencepiece_vocab_size": "1000",
+                "force_target_fps": "false",
+                "normalize_poses": "true",
+                "bucket_scaling": "true",
+                "max_seq_len_source": "500",
+                "keypoint_selection": ""}
+
+RUN_REQUIRED = ["src", "trg", "model_name"]
+
+# resources of each step, the same as the SLURM arguments in run_generic.sh
+
+SLURM_ARGS_GENERIC = ["--cpus-per-task=2", "--time=24:00:00", "--mem=16G", "--partition=generic"]
+SLURM_ARGS_VOLTA_TRAIN = ["--qos=vesta", "--time=36:00:00", "--gres", "gpu:Tesla-V100-32GB:1", "--cpus-per-task", "1",
+                          "--mem", "16g"]
+SLURM_ARGS_VOLTA_TRANSLATE = ["--qos=vesta", "--time=12:00:00", "--gres", "gpu:Tesla-V100-32GB:1", "--cpus-per-task",
+                              "1", "--mem", "16g"]
+DRY_RUN_SLURM_ARGS = ["--cpus-per-task=2", "--time=02:00:00", "--mem=16G", "--partition=generic"]
+
+# a node runs after its dependencies succeeded ("afterok") or after they finished in any way ("afterany", for
+# instance translation after training, which can be stopped by a time limit but still leave usable checkpoints)
+
+DEPENDENCY_TYPES = ["afterok", "afterany"]
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_UNCHANGED = "unchanged"
+STATUS_CANCELLED = "cancelled"
+
+# statuses after which dependent nodes can run
+
+STATUS_FINISHED = [STATUS_SUCCEEDED, STATUS_FAILED, STATUS_UNCHANGED, STATUS_CANCELLED]
+
+POLL_SECONDS = 0.5
+
+
+class Node(NamedTuple):
+    """
+    One step of the pipeline: a command, the resources it needs, the nodes it depends on and the files or
+    folders it reads and writes (for deciding whether it needs to run again).
+    """
+    name: str
+    command: List[str]
+    log_path: str
+    cpus: int
+    memory_gb: float
+    gpus: int
+    slurm_args: List[str]
+    dependencies: List[Tuple[str, str]]
+    inputs: List[str]
+    outputs: List[str]
+
+
+def get_zenodo_tokens() -> List[str]:
+    """
+    Read from environment variables, like in run_generic.sh (they should not appear in configs or logs).
+
+    :return:
+    """
+    return [os.environ.get(name, "none") or "none"
+            for name in ["ZENODO_TOKEN_FOCUSNEWS", "ZENODO_TOKEN_SRF_POSES", "ZENODO_TOKEN_SRF_VIDEOS_SUBTITLES"]]
+
+
+def expand_runs(config: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Every run of the config with default values for missing variables. A run with a "grid" (variable names and
+    lists of values) stands for one run per combination of values, its model name is formatted with the variables,
+    for instance "pose_type.{pose_type}".
+
+    :param config:
+    :return:
+    """
+    runs = []  # type: List[Dict[str, str]]
+
+    for run_config in config["runs"]:
+        run_config = dict(run_config)
+        grid = run_config.pop("grid", {})
+
+        names = sorted(grid.keys())
+
+        for values in itertools.product(*[grid[name] for name in names]):
+            run = dict(RUN_DEFAULTS)
+            run.update({key: str(value) for key, value in run_config.items()})
+            run.update({name: str(value) for name, value in zip(names, values)})
+
+            for name in RUN_REQUIRED:
+                if name not in run:
+                    raise ValueError("Run is missing '%s': %s" % (name, run_config))
+
+            run["model_name"] = run["model_name"].format(**run)
+
+            runs.append(run)
+
+    model_names = [(run["src"], run["trg"], run["model_name"]) for run in runs]
+
+    if len(set(model_names)) != len(model_names):
+        raise ValueError("Model names of runs are not unique.")
+
+    return runs
+
+
+def get_download_corpora(run: Dict[str, str]) -> List[Tuple[str, bool]]:
+    """
+
+    :param run:
+    :return: Corpora that need to be downloaded (or linked), and whether each is a training corpus.
+    """
+    corpora = [(corpus, True) for corpus in run["training_corpora"].split()]
+
+    corpora += [(corpus, False) for corpus in run["testing_corpora"].split() if corpus not in ["dev", "test"]]
+
+    return corpora
+
+
+def create_run_nodes(base: str, run: Dict[str, str]) -> List[Node]:
+    """
+    The same steps as run_generic.sh, with separate nodes for each downloaded corpus (which are shared by all runs)
+    and for translating and evaluating each testing corpus.
+
+    :param base:
+    :param run:
+    :return:
+    """
+    scripts = os.path.join(base, "scripts")
+    pair = "%s-%s" % (run["src"], run["trg"])
+    model_name = run["model_name"]
+
+    logs = os.path.join(base, "logs", pair, model_name)
+
+    if run["dry_run"] == "true":
+        generic_args, train_args, translate_args = DRY_RUN_SLURM_ARGS, DRY_RUN_SLURM_ARGS, DRY_RUN_SLURM_ARGS
+        gpus = 0
+    else:
+        generic_args, train_args, translate_args = SLURM_ARGS_GENERIC, SLURM_ARGS_VOLTA_TRAIN, \
+                                                   SLURM_ARGS_VOLTA_TRANSLATE
+        gpus = 1
+
+    data = os.path.join(base, "data", pair, model_name)
+    prepared = os.path.join(base, "prepared", pair, model_name)
+    models = os.path.join(base, "models", pair, model_name)
+    translations = os.path.join(base, "translations", pair, model_name)
+    evaluations = os.path.join(base, "evaluations", pair, model_name)
+
+    nodes = []  # type: List[Node]
+
+    download_nodes = []  # type: List[str]
+
+    for corpus, is_training_corpus in get_download_corpora(run):
+        name = "download.%s" % corpus
+        download_nodes.append(name)
+
+        if is_training_corpus:
+            training_corpora, testing_corpora = corpus, ""
+        else:
+            training_corpora, testing_corpora = "", corpus
+
+        nodes.append(Node(name=name,
+                          command=[os.path.join(scripts, "downloading", "download_generic.sh"),
+                                   base, training_corpora, run["local_download_data"], testing_corpora] +
+                                  get_zenodo_tokens(),
+                          log_path=os.path.join(base, "logs", "download", corpus + ".out"),
+                          cpus=1, memory_gb=2, gpus=0, slurm_args=generic_args,
+                          dependencies=[],
+                          inputs=[],
+                          outputs=[os.path.join(base, "download", corpus)]))
+
+    preprocess = "preprocess.%s.%s" % (pair, model_name)
+
+    nodes.append(Node(name=preprocess,
+                      command=[os.path.join(scripts, "preprocessing", "preprocess_generic.sh"),
+                               base, run["src"], run["trg"], model_name, run["dry_run"], run["seed"],
+                               run["training_corpora"], run["pose_type"], run["sentencepiece_vocab_size"],
+                               run["force_target_fps"], run["normalize_poses"], run["testing_corpora"],
+                               run["keypoint_selection"]],
+                      log_path=os.path.join(logs, "preprocess.out"),
+                      cpus=2, memory_gb=16, gpus=0, slurm_args=generic_args,
+                      dependencies=[(name, "afterok") for name in download_nodes],
+                      inputs=[os.path.join(base, "download", corpus) for corpus, _ in get_download_corpora(run)],
+                      outputs=[data, os.path.join(base, "shared_models", pair, model_name)]))
+
+    prepare = "prepare.%s.%s" % (pair, model_name)
+
+    nodes.append(Node(name=prepare,
+                      command=[os.path.join(scripts, "preprocessing", "prepare_generic.sh"),
+                               base, run["src"], run["trg"], model_name, run["seed"], run["pose_type"],
+                               run["bucket_scaling"]],
+                      log_path=os.path.join(logs, "prepare.out"),
+                      cpus=2, memory_gb=16, gpus=0, slurm_args=generic_args,
+                      dependencies=[(preprocess, "afterok")],
+                      inputs=[data],
+                      outputs=[prepared]))
+
+    train = "train.%s.%s" % (pair, model_name)
+
+    nodes.append(Node(name=train,
+                      command=[os.path.join(scripts, "training", "train_generic.sh"),
+                               base, run["src"], run["trg"], model_name, run["dry_run"], run["seed"],
+                               run["pose_type"], run["bucket_scaling"], run["max_seq_len_source"]],
+                      log_path=os.path.join(logs, "train.out"),
+                      cpus=1, memory_gb=16, gpus=gpus, slurm_args=train_args,
+                      dependencies=[(prepare, "afterok")],
+                      inputs=[prepared],
+                      outputs=[models]))
+
+    for corpus in run["testing_corpora"].split():
+        translate = "translate.%s.%s.%s" % (pair, model_name, corpus)
+
+        nodes.append(Node(name=translate,
+                          command=[os.path.join(scripts, "translation", "translate_generic.sh"),
+                                   base, run["src"], run["trg"], model_name, run["dry_run"], corpus],
+                          log_path=os.path.join(logs, "translate.%s.out" % corpus),
+                          cpus=1, memory_gb=16, gpus=gpus, slurm_args=translate_args,
+                          dependencies=[(train, "afterany")],
+                          inputs=[models, os.path.join(data, corpus + ".src")],
+                          outputs=[os.path.join(translations, corpus + ".trg")]))
+
+        nodes.append(Node(name="evaluate.%s.%s.%s" % (pair, model_name, corpus),
+                          command=[os.path.join(scripts, "evaluation", "evaluate_generic.sh"),
+                                   base, run["src"], run["trg"], model_name, corpus],
+                          log_path=os.path.join(logs, "evaluate.%s.out" % corpus),
+                          cpus=1, memory_gb=2, gpus=0, slurm_args=generic_args,
+                          dependencies=[(translate, "afterok")],
+                          inputs=[os.path.join(translations, corpus + ".trg"), os.path.join(data, corpus + ".trg")],
+                          outputs=[os.path.join(evaluations, corpus + ".trg.bleu"),
+                                   os.path.join(evaluations, corpus + ".trg.chrf")]))
+
+    return nodes
+
+
+def create_graph(config: Dict[str, Any]) -> Dict[str, Node]:
+    """
+    Nodes of all runs, in an order where every node comes after its dependencies. Download nodes of the same
+    corpus are shared between runs.
+
+    :param config:
+    :return: Nodes by name.
+    """
+    graph = {}  # type: Dict[str, Node]
+
+    for run in expand_runs(config):
+        for node in create_run_nodes(config["base"], run):
+            if node.name in graph:
+                if graph[node.name].command != node.command:
+                    raise ValueError("Runs need different commands for the same step '%s' (for instance a "
+                                     "different local_download_data)." % node.name)
+                continue
+
+            graph[node.name] = node
+
+    return graph
+
+
+def get_path_fingerprint(path: str) -> Optional[List[Any]]:
+    """
+    Names, sizes and modification times of a file or of all files in a folder (following symlinks), without
+    reading them.
+
+    :param path:
+    :return: None if the path does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return [[".", stat.st_size, stat.st_mtime_ns]]
+
+    files = []  # type: List[Any]
+
+    for root, dirnames, filenames in os.walk(path, followlinks=True):
+        dirnames.sort()
+
+        for filename in sorted(filenames):
+            file_path = os.path.join(root, filename)
+
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                # broken link
+                continue
+
+            files.append([os.path.relpath(file_path, path), stat.st_size, stat.st_mtime_ns])
+
+    return files
+
+
+def get_fingerprint(paths: List[str]) -> str:
+    """
+
+    :param paths:
+    :return:
+    """
+    fingerprints = [[path, get_path_fingerprint(path)] for path in paths]
+
+    return hashlib.sha1(json.dumps(fingerprints).encode("utf-8")).hexdigest()
+
+
+def get_command_checksum(node: Node) -> str:
+    """
+    Stamps only have a checksum of the command, since commands can contain private tokens.
+
+    :param node:
+    :return:
+    """
+    return hashlib.sha1(json.dumps(node.command).encode("utf-8")).hexdigest()
+
+
+def get_stamp_path(stamp_dir: str, node: Node) -> str:
+    """
+
+    :param stamp_dir:
+    :param node:
+    :return:
+    """
+    return os.path.join(stamp_dir, node.name + ".json")
+
+
+def read_stamp(stamp_dir: str, node: Node) -> Optional[Dict[str, Any]]:
+    """
+
+    :param stamp_dir:
+    :param node:
+    :return: None if the node never succeeded.
+    """
+    stamp_path = get_stamp_path(stamp_dir, node)
+
+    if not os.path.exists(stamp_path):
+        return None
+
+    with open(stamp_path, "r") as handle:
+        return json.load(handle)
+
+
+def write_stamp(stamp_dir: str, node: Node, inputs_fingerprint: str, seconds: float):
+    """
+    Recorded after a node succeeded. Written to a temporary file first, so that there is never an incomplete
+    stamp.
+
+    :param stamp_dir:
+    :param node:
+    :param inputs_fingerprint: Fingerprint of the inputs when the node started.
+    :param seconds:
+    :return:
+    """
+    os.makedirs(stamp_dir, exist_ok=True)
+
+    stamp = {"command": get_command_checksum(node),
+             "inputs": inputs_fingerprint,
+             "outputs": get_fingerprint(node.outputs),
+             "seconds": round(seconds, 4)}
+
+    stamp_path = get_stamp_path(stamp_dir, node)
+    temp_path = stamp_path + ".tmp"
+
+    with open(temp_path, "w") as handle:
+        json.dump(stamp, handle, indent=2)
+
+    os.replace(temp_path, stamp_path)
+
+
+def node_is_unchanged(stamp_dir: str, node: Node) -> bool:
+    """
+    A node does not need to run again if it succeeded before with the same command, and its inputs and outputs
+    are the same as they were then.
+
+    :param stamp_dir:
+    :param node:
+    :return:
+    """
+    stamp = read_stamp(stamp_dir, node)
+
+    if stamp is None:
+        return False
+
+    return stamp["command"] == get_command_checksum(node) and \
+        stamp["inputs"] == get_fingerprint(node.inputs) and \
+        stamp["outputs"] == get_fingerprint(node.outputs)
+
+
+def get_nodes_to_run(graph: Dict[str, Node], stamp_dir: str, force: bool = False) -> Set[str]:
+    """
+    Nodes that need to run before anything runs (for SLURM, or to list them). A node also needs to run if one of
+    its dependencies needs to run, since its inputs can change even if they look unchanged now.
+
+    :param graph: Nodes in an order where dependencies come first.
+    :param stamp_dir:
+    :param force: All nodes need to run.
+    :return: Names of the nodes.
+    """
+    nodes_to_run = set()  # type: Set[str]
+
+    for name, node in graph.items():
+        if force or any([dependency in nodes_to_run for dependency, _ in node.dependencies]) or \
+                not node_is_unchanged(stamp_dir, node):
+            nodes_to_run.add(name)
+
+    return nodes_to_run
+
+
+def open_log(node: Node):
+    """
+
+    :param node:
+    :return:
+    """
+    os.makedirs(os.path.dirname(node.log_path), exist_ok=True)
+
+    return open(node.log_path, "a")
+
+
+def execute_node(node: Node, stamp_dir: str) -> int:
+    """
+    Run a single node in this process and record it if it succeeds (used for SLURM jobs).
+
+    :param node:
+    :param stamp_dir:
+    :return: Exit code of the command.
+    """
+    inputs_fingerprint = get_fingerprint(node.inputs)
+
+    start = time.perf_counter()
+
+    returncode = subprocess.call(node.command)
+
+    if returncode == 0:
+        write_stamp(stamp_dir, node, inputs_fingerprint=inputs_fingerprint, seconds=time.perf_counter() - start)
+
+    return returncode
+
+
+class LocalRunner:
+    """
+    Runs nodes as soon as their dependencies are finished, as many at the same time as the CPUs, memory and
+    GPUs allow (as declared by the nodes, actual usage is not measured). A node that needs more than all resources
+    runs when nothing else is running.
+    """
+
+    def __init__(self, graph: Dict[str, Node], stamp_dir: str, max_cpus: int, max_memory_gb: float, max_gpus: int,
+                 force: bool = False):
+        """
+
+        :param graph:
+        :param stamp_dir:
+        :param max_cpus:
+        :param max_memory_gb:
+        :param max_gpus:
+        :param force: Run all nodes, even if they are unchanged.
+        """
+        self.graph = graph
+        self.stamp_dir = stamp_dir
+        self.max_cpus = max_cpus
+        self.max_memory_gb = max_memory_gb
+        self.max_gpus = max_gpus
+        self.force = force
+
+        self.status = {name: STATUS_PENDING for name in graph}  # type: Dict[str, str]
+        self.seconds = {}  # type: Dict[str, float]
+
+        # name: (process, log handle, start time, inputs fingerprint, GPU IDs)
+        self.running = {}  # type: Dict[str, Tuple[subprocess.Popen, Any, float, str, List[int]]]
+
+        self.free_gpus = list(range(max_gpus))
+
+    def get_used_resources(self) -> Tuple[int, float, int]:
+        """
+
+        :return: CPUs, memory and GPUs of running nodes.
+        """
+        nodes = [self.graph[name] for name in self.running]
+
+        return sum([node.cpus for node in nodes]), sum([node.memory_gb for node in nodes]), \
+            sum([node.gpus for node in nodes])
+
+    def fits(self, node: Node) -> bool:
+        """
+
+        :param node:
+        :return:
+        """
+        if len(self.running) == 0:
+            return True
+
+        cpus, memory_gb, gpus = self.get_used_resources()
+
+        return cpus + node.cpus <= self.max_cpus and memory_gb + node.memory_gb <= self.max_memory_gb and \
+            gpus + node.gpus <= self.max_gpus
+
+    def get_ready(self) -> List[str]:
+        """
+        Pending nodes whose dependencies are finished. Nodes whose "afterok" dependencies did not succeed, or that
+        need more GPUs than there are, are cancelled.
+
+        :return:
+        """
+        ready = []  # type: List[str]
+
+        for name, node in self.graph.items():
+            if self.status[name] != STATUS_PENDING:
+                continue
+
+            dependency_statuses = [(self.status[dependency], dependency_type)
+                                   for dependency, dependency_type in node.dependencies]
+
+            if any([status not in STATUS_FINISHED for status, _ in dependency_statuses]):
+                continue
+
+            if any([dependency_type == "afterok" and status not in [STATUS_SUCCEEDED, STATUS_UNCHANGED]
+                    for status, dependency_type in dependency_statuses]):
+                logging.warning("Cancelled %s, a dependency did not succeed" % name)
+                self.status[name] = STATUS_CANCELLED
+                continue
+
+            if node.gpus > self.max_gpus:
+                logging.warning("Cancelled %s, it needs %d GPUs" % (name, node.gpus))
+                self.status[name] = STATUS_CANCELLED
+                continue
+
+            ready.append(name)
+
+        return ready
+
+    def start(self, name: str):
+        """
+
+        :param name:
+        :return:
+        """
+        node = self.graph[name]
+
+        gpu_ids = self.free_gpus[:node.gpus]
+        self.free_gpus = self.free_gpus[node.gpus:]
+
+        # steps use as many workers as SLURM allocates CPUs
+        env = dict(os.environ, SLURM_CPUS_PER_TASK=str(node.cpus))
+
+        if node.gpus > 0:
+            env["CUDA_VISIBLE_DEVICES"] = ",".join([str(gpu_id) for gpu_id in gpu_ids])
+
+        inputs_fingerprint = get_fingerprint(node.inputs)
+
+        log_handle = open_log(node)
+
+        process = subprocess.Popen(node.command, stdout=log_handle, stderr=subprocess.STDOUT, env=env)
+
+        self.running[name] = (process, log_handle, time.perf_counter(), inputs_fingerprint, gpu_ids)
+        self.status[name] = STATUS_RUNNING
+
+        logging.info("Started %s | %s" % (name, node.log_path))
+
+    def collect(self) -> bool:
+        """
+        Record nodes that finished.
+
+        :return: Whether any node finished.
+        """
+        finished = False
+
+        for name in list(self.running.keys()):
+            process, log_handle, start, inputs_fingerprint, gpu_ids = self.running[name]
+
+            if process.poll() is None:
+                continue
+
+            log_handle.close()
+
+            del self.running[name]
+            self.free_gpus.extend(gpu_ids)
+
+            seconds = time.perf_counter() - start
+            self.seconds[name] = seconds
+
+            if process.returncode == 0:
+                write_stamp(self.stamp_dir, self.graph[name], inputs_fingerprint=inputs_fingerprint,
+                            seconds=seconds)
+                self.status[name] = STATUS_SUCCEEDED
+            else:
+                self.status[name] = STATUS_FAILED
+
+            logging.info("Finished %s (%s) in %.1f seconds" % (name, self.status[name], seconds))
+
+            finished = True
+
+        return finished
+
+    def run(self):
+        """
+
+        :return:
+        """
+        while True:
+            started = False
+
+            for name in self.get_ready():
+                if not self.force and node_is_unchanged(self.stamp_dir, self.graph[name]):
+                    logging.info("Skipping %s, unchanged since it last succeeded" % name)
+                    self.status[name] = STATUS_UNCHANGED
+                    started = True
+                    continue
+
+                if self.fits(self.graph[name]):
+                    self.start(name)
+                    started = True
+
+            if len(self.running) == 0 and not started:
+                break
+
+            if not started and not self.collect():
+                time.sleep(POLL_SECONDS)
+
+
+def get_critical_path(graph: Dict[str, Node], seconds: Dict[str, float]) -> Tuple[List[str], float]:
+    """
+    The chain of dependent nodes with the largest total duration, which bounds the wall time of the pipeline
+    however many nodes run in parallel.
+
+    :param graph: Nodes in an order where every node comes after its dependencies.
+    :param seconds: Duration of each node.
+    :return: Names of the nodes on the path and its total duration.
+    """
+    path_seconds = {}  # type: Dict[str, float]
+    previous = {}  # type: Dict[str, Optional[str]]
+
+    for name, node in graph.items():
+        previous[name] = None
+        longest = 0.0
+
+        for dependency, _ in node.dependencies:
+            if path_seconds[dependency] > longest:
+                longest = path_seconds[dependency]
+                previous[name] = dependency
+
+        path_seconds[name] = longest + seconds.get(name, 0.0)
+
+    if len(path_seconds) == 0:
+        return [], 0.0
+
+    name = max(path_seconds, key=path_seconds.get)  # type: Optional[str]
+    total = path_seconds[name]
+
+    path = []  # type: List[str]
+
+    while name is not None:
+        path.insert(0, name)
+        name = previous[name]
+
+    return path, total
+
+
+def write_report(report_path: str, graph: Dict[str, Node], status: Dict[str, str], seconds: Dict[str, float]):
+    """
+    Status and duration of each node and the critical path. Nodes that did not run this time count with the
+    duration of their last successful run.
+
+    :param report_path:
+    :param graph:
+    :param status:
+    :param seconds: Durations of the nodes that ran this time.
+    :return:
+    """
+    stamp_dir = os.path.dirname(report_path)
+
+    durations = {}  # type: Dict[str, float]
+
+    for name, node in graph.items():
+        if name in seconds:
+            durations[name] = seconds[name]
+        else:
+            stamp = read_stamp(stamp_dir, node)
+            durations[name] = stamp["seconds"] if stamp is not None else 0.0
+
+    critical_path, critical_seconds = get_critical_path(graph, durations)
+
+    report = {"nodes": {name: {"status": status[name], "seconds": round(durations[name], 4)} for name in graph},
+              "critical_path": critical_path,
+              "critical_path_seconds": round(critical_seconds, 4)}
+
+    os.makedirs(stamp_dir, exist_ok=True)
+
+    with open(report_path, "w") as handle:
+        json.dump(report, handle, indent=2)
+
+    logging.info("Critical path (%.1f seconds): %s" % (critical_seconds, " -> ".join(critical_path)))
+    logging.info("Report: %s" % report_path)
+
+
+def submit_to_slurm(graph: Dict[str, Node], config_path: str, stamp_dir: str, force: bool = False):
+    """
+    Submit each node as a SLURM job with dependencies on the jobs of its dependencies (with
+    scripts/running/sbatch_bare.sh, like run_generic.sh). Jobs run their node through this script, so that
+    successful jobs are recorded. Nodes that do not need to run are not submitted, see `get_nodes_to_run`.
+
+    :param graph:
+    :param config_path:
+    :param stamp_dir:
+    :param force: Submit all nodes, even if they are unchanged.
+    :return:
+    """
+    sbatch_bare = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sbatch_bare.sh")
+
+    job_ids = {}  # type: Dict[str, str]
+
+    nodes_to_run = get_nodes_to_run(graph, stamp_dir=stamp_dir, force=force)
+
+    for name, node in graph.items():
+        if name not in nodes_to_run:
+            logging.info("Not submitting %s, unchanged since it last succeeded" % name)
+            continue
+
+        dependencies_by_type = {dependency_type: [job_ids[dependency] for dependency, other_type
+                                                  in node.dependencies
+                                                  if other_type == dependency_type and dependency in job_ids]
+                                for dependency_type in DEPENDENCY_TYPES}
+
+        dependency_args = [dependency_type + ":" + ":".join(ids)
+                           for dependency_type, ids in dependencies_by_type.items() if len(ids) > 0]
+
+        if len(dependency_args) > 0:
+            dependency_args = ["--dependency=" + ",".join(dependency_args)]
+
+        os.makedirs(os.path.dirname(node.log_path), exist_ok=True)
+
+        wrapped_command = " ".join([shlex.quote(part) for part in [sys.executable, os.path.abspath(__file__),
+                                                                     "--config", os.path.abspath(config_path),
+                                                                     "--run-node", name]])
+
+        output = subprocess.check_output([sbatch_bare] + node.slurm_args + dependency_args +
+                                         ["-o", node.log_path, "-e", node.log_path, "--wrap", wrapped_command])
+
+        job_ids[name] = output.decode("utf-8").strip()
+
+        logging.info("Submitted %s: %s | %s" % (name, job_ids[name], node.log_path))
+
+
+def list_graph(graph: Dict[str, Node], stamp_dir: str, force: bool = False):
+    """
+
+    :param graph:
+    :param stamp_dir:
+    :param force: See `get_nodes_to_run`.
+    :return:
+    """
+    nodes_to_run = get_nodes_to_run(graph, stamp_dir=stamp_dir, force=force)
+
+    for name, node in graph.items():
+        dependencies = ", ".join(["%s (%s)" % (dependency, dependency_type)
+                                  for dependency, dependency_type in node.dependencies])
+        state = "needs to run" if name in nodes_to_run else "unchanged"
+
+        print("%s\n    cpus=%d memory_gb=%g gpus=%d, %s\n    after: %s" %
+              (name, node.cpus, node.memory_gb, node.gpus, state, dependencies or "-"))
+
+
+def get_total_memory_gb() -> float:
+    """
+
+    :return:
+    """
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--config", type=str,
+                        help="JSON file with 'base' (like in the scripts in scripts/running) and 'runs', a list of "
+                             "runs with the variables of run_generic.sh (src, trg, model_name, and optionally "
+                             "training_corpora, pose_type and so on). A run can have a 'grid' of variables with "
+                             "lists of values instead, its model name is then formatted with the variables.",
+                        required=True)
+    parser.add_argument("--max-cpus", type=int, default=os.cpu_count(),
+                        help="CPUs of all nodes that run at the same time (default: all CPUs).", required=False)
+    parser.add_argument("--max-memory-gb", type=float, default=get_total_memory_gb(),
+                        help="Memory of all nodes that run at the same time (default: all memory).", required=False)
+    parser.add_argument("--max-gpus", type=int, default=1,
+                        help="GPUs of all nodes that run at the same time, each node gets its own GPUs with "
+                             "CUDA_VISIBLE_DEVICES (default: 1).", required=False)
+    parser.add_argument("--force", action="store_true",
+                        help="Run nodes even if their command, inputs and outputs did not change since they last "
+                             "succeeded.", required=False)
+    parser.add_argument("--slurm", action="store_true",
+                        help="Submit all nodes to SLURM with dependencies instead of running them here.",
+                        required=False)
+    parser.add_argument("--list", action="store_true",
+                        help="Only print the nodes, their resources and dependencies, and whether they need to run.",
+                        required=False)
+    parser.add_argument("--run-node", type=str, default=None,
+                        help="Run a single node (used by SLURM jobs).", required=False)
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+
+    args = parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    logging.debug(args)
+
+    with open(args.config, "r") as handle:
+        config = json.load(handle)
+
+    graph = create_graph(config)
+
+    stamp_dir = os.path.join(config["base"], "logs", "pipeline")
+
+    if args.list:
+        list_graph(graph, stamp_dir=stamp_dir, force=args.force)
+    elif args.run_node is not None:
+        sys.exit(execute_node(graph[args.run_node], stamp_dir=stamp_dir))
+    elif args.slurm:
+        submit_to_slurm(graph, config_path=args.config, stamp_dir=stamp_dir, force=args.force)
+    else:
+        runner = LocalRunner(graph, stamp_dir=stamp_dir, max_cpus=args.max_cpus, max_memory_gb=args.max_memory_gb,
+                             max_gpus=args.max_gpus, force=args.force)
+        runner.run()
+
+        write_report(os.path.join(stamp_dir, "report.json"), graph=graph, status=runner.status,
+                     seconds=runner.seconds)
+
+        if any([status in [STATUS_FAILED, STATUS_CANCELLED] for status in runner.status.values()]):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -37,6 +37,10 @@ pip install --upgrade sign-language-datasets==0.0.7 pose-format==0.0.14
 
 pip install srt
 
+# install test runner
+
+pip install pytest
+
 # install library to make an XML submission in WMT format
 
 pip install git+https://github.com/wmt-conference/wmt-format-tools.git
@@ -134,7 +134,12 @@ else
     dry_run_additional_args=""
 fi
 
-if [[ $pose_type == "openpose" ]]; then
+# written during preprocessing, depends on the pose type and the selected keypoints
+
+if [[ -f $data_sub_sub/num_features ]]; then
+    num_features=$(cat $data_sub_sub/num_features)
+elif [[ $pose_type == "openpose" ]]; then
+    # all points, for data preprocessed before the number was recorded
     num_features=270
 else
     # mediapipe poses
@@ -0,0 +1,111 @@
+import os
+import sys
+import subprocess
+
+import h5py
+import pytest
+
+import numpy as np
+
+from typing import Dict, List, Tuple
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PREPROCESSING_DIR = os.path.join(REPO_DIR, "scripts", "preprocessing")
+BENCHMARKING_DIR = os.path.join(REPO_DIR, "scripts", "benchmarking")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# scripts import their helper modules by bare name
+sys.path.insert(0, PREPROCESSING_DIR)
+
+SUBSETS = ["train", "dev", "test"]
+
+OUTPUT_PREFIX = "corpus"
+
+
+def run_converter(download_sub: str, output_dir: str, *args: str):
+    """
+    Run convert_and_split_data.py in a separate process, with a small dev and test set.
+
+    :param download_sub:
+    :param output_dir: Created if it does not exist.
+    :param args: Additional arguments, for instance "--pose-type", "openpose".
+    :return:
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    command = [sys.executable, os.path.join(PREPROCESSING_DIR, "convert_and_split_data.py"),
+               "--download-sub", download_sub,
+               "--output-dir", output_dir,
+               "--output-prefix", OUTPUT_PREFIX,
+               "--seed", "1",
+               "--dev-size", "3",
+               "--test-size", "3"] + list(args)
+
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def read_converted(output_dir: str, pose_type: str) -> Dict[str, Tuple[List[str], List[np.array]]]:
+    """
+
+    :param output_dir:
+    :param pose_type:
+    :return: Texts and pose arrays of each subset.
+    """
+    converted = {}
+
+    for subset in SUBSETS:
+        with open(os.path.join(output_dir, ".".join([OUTPUT_PREFIX, subset, "txt"])), "r") as handle:
+            texts = handle.read().splitlines()
+
+        with h5py.File(os.path.join(output_dir, ".".join([OUTPUT_PREFIX, pose_type, subset, "h5"])), "r") as h5_file:
+            arrays = [h5_file[str(index)][()] for index in range(len(h5_file.keys()))]
+
+        assert len(texts) == len(arrays)
+
+        converted[subset] = (texts, arrays)
+
+    return converted
+
+
+def assert_same_converted(expected: Dict[str, Tuple[List[str], List[np.array]]],
+                          actual: Dict[str, Tuple[List[str], List[np.array]]]):
+    """
+
+    :param expected: See `read_converted`.
+    :param actual:
+    :return:
+    """
+    for subset in SUBSETS:
+        expected_texts, expected_arrays = expected[subset]
+        actual_texts, actual_arrays = actual[subset]
+
+        assert actual_texts == expected_texts
+
+        for expected_array, actual_array in zip(expected_arrays, actual_arrays):
+            assert actual_array.dtype == expected_array.dtype
+            np.testing.assert_array_equal(actual_array, expected_array)
+
+
+@pytest.fixture(scope="session")
+def synthetic_corpus(tmp_path_factory) -> str:
+    """
+    A few short videos with Openpose and Mediapipe archives, at 25, 50 and 30 fps.
+
+    :param tmp_path_factory:
+    :return: Download folder of the corpus.
+    """
+    corpus_dir = str(tmp_path_factory.mktemp("synthetic_corpus"))
+
+    command = [sys.executable, os.path.join(BENCHMARKING_DIR, "create_synthetic_corpus.py"),
+               "--output-dir", corpus_dir,
+               "--num-videos", "4",
+               "--min-duration", "10",
+               "--max-duration", "20",
+               "--framerates", "25,50,30",
+               "--seed", "1"]
+
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    return corpus_dir
@@ -0,0 +1,48 @@
+import os
+import stat
+
+import pytest
+
+from atomic_files import write_atomically, copy_atomically
+
+
+@pytest.fixture
+def umask():
+    previous_umask = os.umask(0o022)
+    yield 0o022
+    os.umask(previous_umask)
+
+
+def test_usual_permissions(tmp_path, umask):
+    path = os.path.join(str(tmp_path), "written.txt")
+
+    with write_atomically(path) as handle:
+        handle.write("content\n")
+
+    with open(path, "r") as handle:
+        assert handle.read() == "content\n"
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+
+    copied_path = os.path.join(str(tmp_path), "copied.txt")
+
+    copy_atomically(path, copied_path)
+
+    assert stat.S_IMODE(os.stat(copied_path).st_mode) == 0o666 & ~umask
+
+
+def test_error_keeps_previous_file(tmp_path):
+    path = os.path.join(str(tmp_path), "written.bin")
+
+    with write_atomically(path, mode="wb") as handle:
+        handle.write(b"previous")
+
+    with pytest.raises(RuntimeError):
+        with write_atomically(path, mode="wb") as handle:
+            handle.write(b"partial")
+            raise RuntimeError()
+
+    with open(path, "rb") as handle:
+        assert handle.read() == b"previous"
+
+    assert os.listdir(str(tmp_path)) == ["written.bin"]
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import subprocess
+
+import h5py
+import pytest
+
+import numpy as np
+
+from typing import List
+
+from conftest import PREPROCESSING_DIR
+
+from combine_h5_datasets import combine_bulk, combine_link, combine_iterate, expand_inputs
+
+
+def create_inputs(input_dir: str, sizes: List[int], compression: str = None) -> List[str]:
+    """
+    Write h5 datasets with one dataset per example, keyed by index. Values encode the input and example index.
+
+    :param input_dir:
+    :param sizes: Number of examples in each input.
+    :param compression:
+    :return: Paths of the inputs.
+    """
+    random_state = np.random.RandomState(1)
+
+    input_paths = []
+
+    for input_index, size in enumerate(sizes):
+        input_path = os.path.join(input_dir, "input.%d.h5" % input_index)
+
+        with h5py.File(input_path, "w") as input_file:
+            for index in range(size):
+                num_frames = random_state.randint(1, 30)
+                array = np.full(shape=(num_frames, 8), fill_value=input_index * 1000 + index, dtype=np.float32)
+
+                input_file.create_dataset(str(index), data=array, compression=compression)
+
+        input_paths.append(input_path)
+
+    return input_paths
+
+
+def read_all(path: str) -> List[np.ndarray]:
+    """
+    Read every example of an h5 dataset as an array.
+
+    :param path:
+    :return: All examples of an h5 dataset, in the order of their indexes.
+    """
+    with h5py.File(path, "r") as h5_file:
+        return [h5_file[str(index)][()] for index in range(len(h5_file.keys()))]
+
+
+@pytest.mark.parametrize("combine_function", [combine_bulk, combine_link, combine_iterate])
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_combined_same_as_concatenated(tmp_path, combine_function, compression):
+    if combine_function is combine_iterate:
+        pytest.importorskip("sockeye")
+
+    input_paths = create_inputs(str(tmp_path), sizes=[5, 1, 12], compression=compression)
+    output_path = os.path.join(str(tmp_path), "combined.h5")
+
+    combine_function(input_paths=input_paths, output_path=output_path)
+
+    expected = [array for input_path in input_paths for array in read_all(input_path)]
+    actual = read_all(output_path)
+
+    assert len(actual) == len(expected)
+
+    for expected_array, actual_array in zip(expected, actual):
+        np.testing.assert_array_equal(actual_array, expected_array)
+
+
+def test_bulk_keeps_compression(tmp_path):
+    input_paths = create_inputs(str(tmp_path), sizes=[3, 4], compression="gzip")
+    output_path = os.path.join(str(tmp_path), "combined.h5")
+
+    combine_bulk(input_paths=input_paths, output_path=output_path)
+
+    with h5py.File(output_path, "r") as output_file:
+        for index in range(7):
+            assert output_file[str(index)].compression == "gzip"
+
+
+def test_link_does_not_copy(tmp_path):
+    input_paths = create_inputs(str(tmp_path), sizes=[3, 4])
+    output_path = os.path.join(str(tmp_path), "combined.h5")
+
+    combine_link(input_paths=input_paths, output_path=output_path)
+
+    with h5py.File(output_path, "r") as output_file:
+        for index in range(7):
+            assert isinstance(output_file.get(str(index), getlink=True), h5py.ExternalLink)
+
+
+def test_expand_shard_index(tmp_path):
+    shard_paths = create_inputs(str(tmp_path), sizes=[2, 3])
+    index_path = os.path.join(str(tmp_path), "corpus.openpose.train.shards.json")
+
+    with open(index_path, "w") as handle:
+        json.dump({"shards": [{"poses": os.path.basename(shard_path)} for shard_path in shard_paths]}, handle)
+
+    other_path = os.path.join(str(tmp_path), "other.h5")
+
+    assert expand_inputs([index_path, other_path]) == shard_paths + [other_path]
+
+
+def test_command_line_bulk(tmp_path):
+    shard_paths = create_inputs(str(tmp_path), sizes=[2, 3])
+    index_path = os.path.join(str(tmp_path), "corpus.openpose.train.shards.json")
+
+    with open(index_path, "w") as handle:
+        json.dump({"shards": [{"poses": os.path.basename(shard_path)} for shard_path in shard_paths]}, handle)
+
+    output_path = os.path.join(str(tmp_path), "combined.h5")
+
+    command = [sys.executable, os.path.join(PREPROCESSING_DIR, "combine_h5_datasets.py"),
+               "--inputs", index_path,
+               "--output", output_path]
+
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    expected = [array for shard_path in shard_paths for array in read_all(shard_path)]
+    actual = read_all(output_path)
+
+    assert len(actual) == len(expected)
+
+    for expected_array, actual_array in zip(expected, actual):
+        np.testing.assert_array_equal(actual_array, expected_array)
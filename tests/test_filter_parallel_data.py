@@ -0,0 +1,161 @@
+import os
+
+import h5py
+import pytest
+
+import numpy as np
+
+from typing import List, Tuple
+
+from filter_parallel_data import filter_parallel_data, FilterConfig
+
+
+def create_parallel_data(data_dir: str, examples: List[Tuple[np.ndarray, str]]) -> Tuple[str, str]:
+    """
+    Write an H5 source with one dataset per example and a target with one line per example.
+
+    :param data_dir:
+    :param examples: Poses and target text of each example. Targets must not contain "\\n".
+    :return: Paths of the source and target.
+    """
+    src_path = os.path.join(data_dir, "input.h5")
+    trg_path = os.path.join(data_dir, "input.txt")
+
+    with h5py.File(src_path, "w") as src_file:
+        for index, (array, _) in enumerate(examples):
+            src_file.create_dataset(str(index), data=array, compression="gzip" if index % 2 == 1 else None)
+
+    with open(trg_path, "w", newline="\n") as trg_handle:
+        for _, target in examples:
+            trg_handle.write(target + "\n")
+
+    return src_path, trg_path
+
+
+def create_poses(index: int, num_frames: int) -> np.ndarray:
+    """
+    Poses whose values are the index of the example, so that filtered examples show where they come from.
+    """
+    return np.full(shape=(num_frames, 6), fill_value=index, dtype=np.float32)
+
+
+def read_filtered(src_path: str, trg_path: str) -> Tuple[List[np.ndarray], List[str]]:
+    """
+    Read the filtered examples, splitting lines only at "\\n".
+
+    :param src_path:
+    :param trg_path:
+    :return: Poses and target lines (without line breaks).
+    """
+    with h5py.File(src_path, "r") as src_file:
+        arrays = [src_file[str(index)][()] for index in range(len(src_file.keys()))]
+
+    with open(trg_path, "r", newline="\n") as trg_handle:
+        targets = [line[:-1] for line in trg_handle]
+
+    return arrays, targets
+
+
+def create_config(**kwargs) -> FilterConfig:
+    """
+    All rules are disabled, unless set in `kwargs`.
+    """
+    config = dict(min_frames=None,
+                  max_frames=None,
+                  remove_empty_targets=False,
+                  min_frames_per_token=None,
+                  max_frames_per_token=None,
+                  remove_non_finite=False)
+
+    config.update(kwargs)
+
+    return FilterConfig(**config)
+
+
+def test_kept_examples_stay_aligned(tmp_path):
+    nan_poses = create_poses(3, 10)
+    nan_poses[4, 2] = np.nan
+
+    examples = [(create_poses(0, 10), "zero 0"),
+                (create_poses(1, 0), "one 1"),
+                (create_poses(2, 10), ""),
+                (nan_poses, "three 3"),
+                (create_poses(4, 10), "four\rmore 4"),
+                (create_poses(5, 200), "five 5"),
+                (create_poses(6, 10), "   "),
+                (create_poses(7, 10), "seven 7")]
+
+    src_path, trg_path = create_parallel_data(str(tmp_path), examples)
+
+    output_src = os.path.join(str(tmp_path), "output.h5")
+    output_trg = os.path.join(str(tmp_path), "output.txt")
+
+    config = create_config(min_frames=1, max_frames=100, remove_empty_targets=True, remove_non_finite=True)
+
+    report = filter_parallel_data(input_src=src_path, input_trg=trg_path, output_src=output_src,
+                                  output_trg=output_trg, config=config)
+
+    arrays, targets = read_filtered(output_src, output_trg)
+
+    # "\r" is part of the target, not a line break
+    assert targets == ["zero 0", "four\rmore 4", "seven 7"]
+
+    for array, target in zip(arrays, targets):
+        np.testing.assert_array_equal(array, create_poses(int(target.split()[-1]), 10))
+
+    with h5py.File(output_src, "r") as output_file:
+        assert output_file["2"].compression == "gzip"
+
+    assert report["num_examples"] == 8
+    assert report["num_kept"] == 3
+    assert report["num_rejected"] == 5
+    assert report["rejected_by_rule"] == {"min_frames": 1,
+                                          "max_frames": 1,
+                                          "empty_target": 2,
+                                          "min_frames_per_token": 0,
+                                          "max_frames_per_token": 0,
+                                          "non_finite": 1}
+
+
+def test_frames_per_token(tmp_path):
+    examples = [(create_poses(0, 2), "a b"),
+                (create_poses(1, 10), "a b"),
+                (create_poses(2, 50), "a")]
+
+    src_path, trg_path = create_parallel_data(str(tmp_path), examples)
+
+    output_src = os.path.join(str(tmp_path), "output.h5")
+    output_trg = os.path.join(str(tmp_path), "output.txt")
+
+    config = create_config(min_frames_per_token=2, max_frames_per_token=20)
+
+    report = filter_parallel_data(input_src=src_path, input_trg=trg_path, output_src=output_src,
+                                  output_trg=output_trg, config=config)
+
+    arrays, targets = read_filtered(output_src, output_trg)
+
+    assert targets == ["a b"]
+    np.testing.assert_array_equal(arrays[0], create_poses(1, 10))
+
+    assert report["rejected_by_rule"]["min_frames_per_token"] == 1
+    assert report["rejected_by_rule"]["max_frames_per_token"] == 1
+
+
+@pytest.mark.parametrize("extra_lines", [-1, 1])
+def test_different_number_of_lines(tmp_path, extra_lines):
+    examples = [(create_poses(index, 5), "example %d" % index) for index in range(4)]
+
+    src_path, trg_path = create_parallel_data(str(tmp_path), examples)
+
+    if extra_lines > 0:
+        with open(trg_path, "a") as trg_handle:
+            trg_handle.write("extra\n")
+    else:
+        with open(trg_path, "w") as trg_handle:
+            trg_handle.write("".join(["example %d\n" % index for index in range(3)]))
+
+    with pytest.raises(ValueError):
+        filter_parallel_data(input_src=src_path, input_trg=trg_path,
+                             output_src=os.path.join(str(tmp_path), "output.h5"),
+                             output_trg=os.path.join(str(tmp_path), "output.txt"),
+                             config=create_config())
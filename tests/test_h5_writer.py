@@ -0,0 +1,92 @@
+import os
+
+import h5py
+import pytest
+
+import numpy as np
+
+from conftest import run_converter, read_converted, assert_same_converted, SUBSETS, OUTPUT_PREFIX
+
+from h5_writer import H5DatasetWriter
+
+
+def create_arrays(num_arrays: int) -> list:
+    """
+    Arrays of different lengths, one of them without frames.
+    """
+    random_state = np.random.RandomState(1)
+
+    arrays = [random_state.uniform(size=(random_state.randint(1, 50), 12)).astype(np.float32)
+              for _ in range(num_arrays - 1)]
+
+    return arrays + [np.zeros(shape=(0, 12), dtype=np.float32)]
+
+
+@pytest.mark.parametrize("compression, compression_level", [("gzip", None), ("gzip", 9), ("lzf", None)])
+def test_filters_same_arrays(tmp_path, compression, compression_level):
+    filename = os.path.join(str(tmp_path), "poses.h5")
+
+    arrays = create_arrays(10)
+
+    writer = H5DatasetWriter(filename=filename, chunk_frames=8, compression=compression,
+                             compression_level=compression_level, shuffle=True)
+
+    for array in arrays:
+        writer.add(array)
+
+    writer.close()
+
+    with h5py.File(filename, "r") as h5_file:
+        assert len(h5_file.keys()) == len(arrays)
+
+        for index, array in enumerate(arrays):
+            dataset = h5_file[str(index)]
+
+            assert dataset.compression == compression
+            assert dataset.shuffle
+
+            if array.shape[0] > 0:
+                assert dataset.chunks[0] == min(8, array.shape[0])
+
+            np.testing.assert_array_equal(dataset[()], array)
+
+
+def test_data_size_after_resume(tmp_path):
+    filename = os.path.join(str(tmp_path), "poses.h5")
+
+    arrays = create_arrays(6)
+
+    writer = H5DatasetWriter(filename=filename, compression="gzip")
+
+    for array in arrays:
+        writer.add(array)
+
+    assert writer.get_data_size() == sum([array.nbytes for array in arrays])
+
+    writer.close()
+
+    writer = H5DatasetWriter(filename=filename, compression="gzip", resume_size=4)
+
+    assert writer.get_data_size() == sum([array.nbytes for array in arrays[:4]])
+
+    writer.close()
+
+
+def test_converted_with_filters(synthetic_corpus, tmp_path):
+    uncompressed_dir = os.path.join(str(tmp_path), "uncompressed")
+    compressed_dir = os.path.join(str(tmp_path), "compressed")
+
+    run_converter(synthetic_corpus, uncompressed_dir, "--pose-type", "openpose")
+    run_converter(synthetic_corpus, compressed_dir, "--pose-type", "openpose", "--h5-compression", "gzip",
+                  "--h5-shuffle", "--h5-chunk-frames", "16")
+
+    assert_same_converted(expected=read_converted(uncompressed_dir, "openpose"),
+                          actual=read_converted(compressed_dir, "openpose"))
+
+    for subset in SUBSETS:
+        filename = os.path.join(compressed_dir, ".".join([OUTPUT_PREFIX, "openpose", subset, "h5"]))
+
+        with h5py.File(filename, "r") as h5_file:
+            for dataset in h5_file.values():
+                assert dataset.compression == "gzip"
+                assert dataset.shuffle
@@ -0,0 +1,91 @@
+import numpy as np
+
+from convert_and_split_data import parse_landmarks, parse_landmarks_rowwise, load_mediapipe_frames_dict, \
+    MEDIAPIPE_COMPONENTS
+
+
+def create_landmarks(num_points: int, num_values: int, random_state: np.random.RandomState) -> list:
+    """
+    Landmark strings as in Mediapipe output files, with some values in exponent notation.
+    """
+    points = random_state.uniform(-1.0, 1.0, size=(num_points, num_values))
+    points[random_state.random_sample(size=points.shape) < 0.1] *= 1e-6
+
+    return [",".join([repr(value) for value in point]) for point in points]
+
+
+def create_frames(num_frames: int, random_state: np.random.RandomState) -> dict:
+    """
+    Frames in the format of Mediapipe JSON files. Pose landmarks have a visibility value, all other components do
+    not. Hands are missing in some frames.
+    """
+    frames = {}
+
+    for frame_id in range(num_frames):
+        frame = {}
+
+        for name, num_points in MEDIAPIPE_COMPONENTS:
+            if "hand" in name and random_state.random_sample() < 0.3:
+                frame[name] = {"landmarks": []}
+            else:
+                num_values = 4 if name == "pose_landmarks" else 3
+                frame[name] = {"landmarks": create_landmarks(num_points, num_values, random_state)}
+
+        frames[frame_id] = frame
+
+    return frames
+
+
+def test_parse_landmarks_same_as_rowwise():
+    random_state = np.random.RandomState(1)
+
+    for num_values in [3, 4]:
+        landmarks = create_landmarks(50, num_values, random_state)
+
+        np.testing.assert_array_equal(parse_landmarks(landmarks), parse_landmarks_rowwise(landmarks))
+
+
+def test_parse_landmarks_mixed_lengths():
+    random_state = np.random.RandomState(2)
+
+    landmarks = create_landmarks(5, 3, random_state) + create_landmarks(7, 4, random_state)
+
+    np.testing.assert_array_equal(parse_landmarks(landmarks), parse_landmarks_rowwise(landmarks))
+
+
+def test_parse_landmarks_empty():
+    assert parse_landmarks([]).shape == (0, 4)
+
+
+def test_load_frames_same_as_rowwise():
+    random_state = np.random.RandomState(3)
+
+    frames = create_frames(20, random_state)
+
+    pose = load_mediapipe_frames_dict(frames, fps=25, dtype=np.float64)
+
+    # frame by frame and component by component, as in the original decoder
+
+    expected_data = []
+    expected_confidence = []
+
+    for frame_id in range(len(frames)):
+        frame_data = []
+        frame_confidence = []
+
+        for name, num_points in MEDIAPIPE_COMPONENTS:
+            landmarks = frames[frame_id][name]["landmarks"]
+
+            if len(landmarks) == 0:
+                points = np.zeros(shape=(num_points, 4))
+            else:
+                points = parse_landmarks_rowwise(landmarks)
+
+            frame_data.append(points[:, :3])
+            frame_confidence.append(points[:, 3])
+
+        expected_data.append(np.concatenate(frame_data))
+        expected_confidence.append(np.concatenate(frame_confidence))
+
+    np.testing.assert_array_equal(pose.body.data[:, 0], np.stack(expected_data))
+    np.testing.assert_array_equal(pose.body.confidence[:, 0], np.stack(expected_confidence))
@@ -0,0 +1,84 @@
+import io
+import os
+import sys
+import json
+import subprocess
+import collections
+
+import pytest
+
+from conftest import DATA_DIR, PREPROCESSING_DIR
+
+from normalize_text import normalize_file, normalize_line
+
+# Lines of a regression corpus (with Unicode punctuation, escaped characters, non-printing characters, carriage
+# returns and a last line without line break), and their normalization by the chain of perl filters and Moses
+# scripts that normalize_text.py replaces
+
+INPUT_PATH = os.path.join(DATA_DIR, "normalize_text.input.txt")
+EXPECTED_PATH = os.path.join(DATA_DIR, "normalize_text.expected.txt")
+
+
+def read_expected() -> str:
+    """
+    Read the output of the perl chain, splitting lines only at "\\n".
+
+    :return:
+    """
+    with open(EXPECTED_PATH, "r", encoding="utf-8", newline="") as handle:
+        return handle.read()
+
+
+@pytest.mark.parametrize("num_workers", [1, 3])
+def test_same_as_perl(tmp_path, num_workers):
+    output_path = os.path.join(str(tmp_path), "normalized.txt")
+    inventory_path = os.path.join(str(tmp_path), "inventory.json")
+
+    command = [sys.executable, os.path.join(PREPROCESSING_DIR, "normalize_text.py"),
+               "--inputs", INPUT_PATH,
+               "--outputs", output_path,
+               "--num-workers", str(num_workers),
+               "--chunk-size", "4",
+               "--char-inventory", inventory_path]
+
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    with open(output_path, "r", encoding="utf-8", newline="") as handle:
+        actual = handle.read()
+
+    expected = read_expected()
+
+    assert actual == expected
+
+    with open(inventory_path, "r", encoding="utf-8") as handle:
+        inventory = json.load(handle)
+
+    assert inventory == dict(collections.Counter(expected))
+
+
+@pytest.mark.parametrize("max_inventory_lines", [0, 5, 10, 1000])
+def test_inventory_max_lines(max_inventory_lines):
+    with open(INPUT_PATH, "rb") as input_handle:
+        output_handle = io.StringIO(newline="")
+
+        num_lines, inventory = normalize_file(input_handle, output_handle, pool=None, chunk_size=4,
+                                              max_inventory_lines=max_inventory_lines)
+
+    expected_lines = read_expected().split("\n")[:-1]
+
+    assert num_lines == len(expected_lines)
+    assert output_handle.getvalue() == read_expected()
+
+    # characters (including line breaks) of the first lines only
+    expected_inventory = collections.Counter("".join([line + "\n" for line in expected_lines[:max_inventory_lines]]))
+
+    assert inventory == expected_inventory
+
+
+@pytest.mark.parametrize("line, expected", [("  a   b  ", "a b"),
+                                            ("&amp;lt;", "&lt;"),
+                                            ("a&#160;b", "a b"),
+                                            ("ｘ１，", "ｘ1,"),
+                                            ("a​b", "a b")])
+def test_normalize_line(line, expected):
+    assert normalize_line(line) == expected
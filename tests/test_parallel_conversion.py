@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+from conftest import run_converter, read_converted, assert_same_converted
+
+
+@pytest.mark.parametrize("pose_type", ["openpose", "mediapipe"])
+def test_workers_same_as_serial(synthetic_corpus, tmp_path, pose_type):
+    serial_dir = os.path.join(str(tmp_path), "serial")
+    parallel_dir = os.path.join(str(tmp_path), "parallel")
+
+    run_converter(synthetic_corpus, serial_dir, "--pose-type", pose_type)
+    run_converter(synthetic_corpus, parallel_dir, "--pose-type", pose_type, "--num-workers", "3")
+
+    assert_same_converted(expected=read_converted(serial_dir, pose_type),
+                          actual=read_converted(parallel_dir, pose_type))
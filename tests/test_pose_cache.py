@@ -0,0 +1,53 @@
+import os
+import stat
+
+import numpy as np
+
+from conftest import run_converter, read_converted, assert_same_converted
+
+
+def test_cached_float64_same_as_uncached(synthetic_corpus, tmp_path):
+    # synthetic Openpose coordinates are exactly representable as float32, Mediapipe coordinates are not
+    pose_type = "mediapipe"
+
+    cache_dir = os.path.join(str(tmp_path), "cache")
+    uncached_dir = os.path.join(str(tmp_path), "uncached")
+    float32_dir = os.path.join(str(tmp_path), "float32")
+    cached_dir = os.path.join(str(tmp_path), "cached")
+
+    run_converter(synthetic_corpus, uncached_dir, "--pose-type", pose_type, "--dtype", "float64")
+
+    # fills the cache with float32 poses
+    run_converter(synthetic_corpus, float32_dir, "--pose-type", pose_type, "--dtype", "float32",
+                  "--pose-cache-dir", cache_dir)
+    run_converter(synthetic_corpus, cached_dir, "--pose-type", pose_type, "--dtype", "float64",
+                  "--pose-cache-dir", cache_dir)
+
+    expected = read_converted(uncached_dir, pose_type)
+
+    # otherwise the test could not tell float32 entries from float64 entries
+    float32_arrays = read_converted(float32_dir, pose_type)["train"][1]
+    assert not all([np.array_equal(float32_array, expected_array)
+                    for float32_array, expected_array in zip(float32_arrays, expected["train"][1])])
+
+    assert_same_converted(expected=expected, actual=read_converted(cached_dir, pose_type))
+
+
+def test_entries_have_usual_permissions(synthetic_corpus, tmp_path):
+    cache_dir = os.path.join(str(tmp_path), "cache")
+
+    previous_umask = os.umask(0o022)
+
+    try:
+        run_converter(synthetic_corpus, os.path.join(str(tmp_path), "output"), "--pose-type", "openpose",
+                      "--pose-cache-dir", cache_dir)
+    finally:
+        os.umask(previous_umask)
+
+    filenames = os.listdir(cache_dir)
+
+    assert len(filenames) > 0
+
+    for filename in filenames:
+        assert filename.endswith(".npz")
+        assert stat.S_IMODE(os.stat(os.path.join(cache_dir, filename)).st_mode) == 0o644
@@ -0,0 +1,137 @@
+import os
+
+import cv2
+import pytest
+
+import numpy as np
+import numpy.ma as ma
+
+from resample_poses import resample_pose_arrays, get_num_target_frames, get_source_frame_range, round_framerate
+
+from convert_and_split_data import read_video_framerates, get_file_id
+
+
+def create_frame_ids(num_frames: int):
+    """
+    Pose data whose values are the frame indexes, so that resampled data shows which frames were taken.
+    """
+    data = np.arange(num_frames, dtype=np.float32).reshape(num_frames, 1, 1, 1)
+    confidence = np.ones(shape=(num_frames, 1, 1), dtype=np.float32)
+
+    return data, confidence
+
+
+@pytest.mark.parametrize("num_frames", range(1, 40))
+def test_drop_30_to_25_same_as_original(num_frames):
+    data, confidence = create_frame_ids(num_frames)
+
+    # the original conversion deleted every sixth frame, starting with the first one
+    expected = np.delete(data, np.arange(0, num_frames, 6), axis=0)
+
+    actual, _ = resample_pose_arrays(data, confidence, video_fps=30, target_fps=25)
+
+    np.testing.assert_array_equal(actual, expected)
+    assert get_num_target_frames(num_frames, video_fps=30, target_fps=25) == expected.shape[0]
+
+
+@pytest.mark.parametrize("method", ["drop", "nearest"])
+@pytest.mark.parametrize("num_frames", range(1, 20))
+def test_50_to_25_same_as_original(num_frames, method):
+    data, confidence = create_frame_ids(num_frames)
+
+    # the original conversion took every second frame
+    actual, _ = resample_pose_arrays(data, confidence, video_fps=50, target_fps=25, method=method)
+
+    np.testing.assert_array_equal(actual, data[::2])
+
+
+def test_nearest_30_to_25():
+    data, confidence = create_frame_ids(12)
+
+    actual, _ = resample_pose_arrays(data, confidence, video_fps=30, target_fps=25, method="nearest")
+
+    np.testing.assert_array_equal(actual.ravel(), [0, 1, 2, 3, 4, 6, 7, 8, 9, 10])
+
+
+@pytest.mark.parametrize("method", ["drop", "nearest", "linear"])
+@pytest.mark.parametrize("video_fps, target_fps", [(30, 25), (50, 25), (29.97, 25), (25, 30)])
+def test_slices_same_as_video(method, video_fps, target_fps):
+    num_frames = 37
+    data, confidence = create_frame_ids(num_frames)
+
+    video_data, video_confidence = resample_pose_arrays(data, confidence, video_fps=video_fps, target_fps=target_fps,
+                                                        method=method)
+
+    for start_frame in range(video_data.shape[0]):
+        for end_frame in range(start_frame + 1, video_data.shape[0] + 1):
+            first_frame, end_source_frame = get_source_frame_range(start_frame, end_frame, video_fps=video_fps,
+                                                                   target_fps=target_fps)
+            end_source_frame = min(end_source_frame, num_frames)
+
+            slice_data, slice_confidence = resample_pose_arrays(data[first_frame:end_source_frame],
+                                                                confidence[first_frame:end_source_frame],
+                                                                video_fps=video_fps,
+                                                                target_fps=target_fps,
+                                                                method=method,
+                                                                start_frame=start_frame,
+                                                                end_frame=end_frame,
+                                                                source_offset=first_frame)
+
+            np.testing.assert_array_equal(slice_data, video_data[start_frame:end_frame])
+            np.testing.assert_array_equal(slice_confidence, video_confidence[start_frame:end_frame])
+
+
+def test_linear_takes_visible_neighbour():
+    data, confidence = create_frame_ids(8)
+
+    # the point is missing in frames 2 and 4
+    for frame_id in [2, 4]:
+        data[frame_id] = 0
+        confidence[frame_id] = 0
+
+    masked_data = ma.masked_array(data, mask=np.broadcast_to((confidence == 0)[..., None], data.shape))
+
+    actual, actual_confidence = resample_pose_arrays(masked_data, confidence, video_fps=30, target_fps=25,
+                                                     method="linear")
+
+    # positions 0, 1.2, 2.4, 3.6, 4.8, 6, 7.2: positions 1.2 to 4.8 are next to a frame without the point and take
+    # the other neighbour
+    np.testing.assert_allclose(actual.ravel(), [0, 1, 3, 3, 5, 6, 7])
+    np.testing.assert_array_equal(actual_confidence.ravel(), np.ones(7))
+    assert not np.any(ma.getmaskarray(actual))
+
+
+def test_linear_exact_positions():
+    data, confidence = create_frame_ids(6)
+
+    data[2] = 0
+    confidence[2] = 0
+
+    # 50 -> 25: all positions are exactly on source frames, missing points are not filled from the next frame
+    actual, actual_confidence = resample_pose_arrays(data, confidence, video_fps=50, target_fps=25, method="linear")
+
+    np.testing.assert_array_equal(actual.ravel(), [0, 0, 4])
+    np.testing.assert_array_equal(actual_confidence.ravel(), [1, 0, 1])
+
+
+@pytest.mark.parametrize("fps, expected", [(29.97002997, 29.97), (24.999, 25), (50.0, 50)])
+def test_round_framerate(fps, expected):
+    assert round_framerate(fps) == expected
+
+
+def test_framerates_truncated_without_resampling(tmp_path):
+    video_dir = str(tmp_path)
+    filename = "srf.2020-03-12.mp4"
+
+    writer = cv2.VideoWriter(os.path.join(video_dir, filename), cv2.VideoWriter_fourcc(*"mp4v"),
+                             30000 / 1001, (16, 16))
+
+    for _ in range(10):
+        writer.write(np.zeros(shape=(16, 16, 3), dtype=np.uint8))
+
+    writer.release()
+
+    # as in the original conversion
+    assert read_video_framerates(video_dir=video_dir) == {get_file_id(filename): 29}
+
+    assert read_video_framerates(video_dir=video_dir, target_fps=25) == {get_file_id(filename): 29.97}
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+
+import pytest
+
+import convert_and_split_data
+
+from conftest import run_converter, read_converted, assert_same_converted, PREPROCESSING_DIR, OUTPUT_PREFIX
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+def set_arguments(monkeypatch, download_sub: str, output_dir: str, *args: str):
+    """
+    Command line arguments for running the converter in this process.
+    """
+    monkeypatch.setattr(sys, "argv", [os.path.join(PREPROCESSING_DIR, "convert_and_split_data.py"),
+                                      "--download-sub", download_sub,
+                                      "--output-dir", output_dir,
+                                      "--output-prefix", OUTPUT_PREFIX,
+                                      "--seed", "1",
+                                      "--dev-size", "3",
+                                      "--test-size", "3",
+                                      "--resume"] + list(args))
+
+
+def run_interrupted(monkeypatch, download_sub: str, output_dir: str, num_videos: int, *args: str):
+    """
+    Run the converter in this process and crash in the middle of a video, after `num_videos` videos are
+    committed to the journal (some examples of the next video are already written).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    state = {"commits": 0, "adds": 0}
+
+    original_commit = convert_and_split_data.ConversionJournal.commit
+    original_add = convert_and_split_data.ParallelWriter.add
+
+    def commit(self, entry):
+        original_commit(self, entry)
+        state["commits"] += 1
+
+    def add(self, text, pose_slice):
+        original_add(self, text, pose_slice)
+
+        if state["commits"] >= num_videos:
+            state["adds"] += 1
+            if state["adds"] == 2:
+                raise SimulatedCrash()
+
+    monkeypatch.setattr(convert_and_split_data.ConversionJournal, "commit", commit)
+    monkeypatch.setattr(convert_and_split_data.ParallelWriter, "add", add)
+
+    set_arguments(monkeypatch, download_sub, output_dir, *args)
+
+    with pytest.raises(SimulatedCrash):
+        convert_and_split_data.main()
+
+    monkeypatch.undo()
+
+
+def run_resumed(monkeypatch, download_sub: str, output_dir: str, *args: str) -> int:
+    """
+    Run the converter in this process with --resume.
+
+    :return: Number of videos that were converted.
+    """
+    state = {"videos": 0}
+
+    original_convert = convert_and_split_data.convert_pose_files_instrumented
+
+    def convert(tasks, **kwargs):
+        state["videos"] += 1
+        return original_convert(tasks, **kwargs)
+
+    monkeypatch.setattr(convert_and_split_data, "convert_pose_files_instrumented", convert)
+
+    set_arguments(monkeypatch, download_sub, output_dir, *args)
+
+    convert_and_split_data.main()
+
+    monkeypatch.undo()
+
+    return state["videos"]
+
+
+def count_journal_videos(output_dir: str, pose_type: str) -> int:
+    """
+    Count the videos that a complete run committed to its journal.
+
+    :return: Number of videos in the journal of a complete run.
+    """
+    with open(os.path.join(output_dir, ".".join([OUTPUT_PREFIX, pose_type, "journal", "jsonl"])), "r") as handle:
+        records = [json.loads(line) for line in handle]
+
+    assert "complete" in records[-1]
+
+    return len([record for record in records if "job" in record])
+
+
+@pytest.mark.parametrize("num_videos", [0, 2])
+@pytest.mark.parametrize("compression_args", [[], ["--h5-compression", "gzip"]])
+def test_resume_same_as_uninterrupted(synthetic_corpus, tmp_path, monkeypatch, num_videos, compression_args):
+    uninterrupted_dir = os.path.join(str(tmp_path), "uninterrupted")
+    resumed_dir = os.path.join(str(tmp_path), "resumed")
+
+    args = ["--pose-type", "mediapipe"] + compression_args
+
+    run_converter(synthetic_corpus, uninterrupted_dir, *args)
+
+    run_interrupted(monkeypatch, synthetic_corpus, resumed_dir, num_videos, *args)
+    num_resumed_videos = run_resumed(monkeypatch, synthetic_corpus, resumed_dir, *args)
+
+    # only the videos after the last committed one are converted again
+    assert num_resumed_videos == count_journal_videos(uninterrupted_dir, "mediapipe") - num_videos
+
+    assert_same_converted(expected=read_converted(uninterrupted_dir, "mediapipe"),
+                          actual=read_converted(resumed_dir, "mediapipe"))
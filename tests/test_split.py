@@ -0,0 +1,148 @@
+import os
+import shutil
+
+import pytest
+
+import numpy as np
+
+from typing import Optional, Dict
+
+from conftest import run_converter, read_converted
+
+from convert_and_split_data import decide_on_split, decide_on_split_by_hash, read_video_framerates, \
+    read_subtitles, get_file_id, get_subtitle_content, SUBSETS, NOT_SELECTED
+
+
+def decide_on_split_original(num_examples: int,
+                             train_size: Optional[int],
+                             dev_size: int,
+                             test_size: int,
+                             dry_run: bool) -> Dict[int, str]:
+    """
+    The split of the original version of convert_and_split_data.py, with subset names instead of writers.
+    """
+    train_indexes = np.arange(num_examples, dtype=np.int32)
+
+    if train_size is not None:
+        total_size = train_size + dev_size + test_size
+
+        if dry_run:
+            train_indexes = np.arange(total_size)
+        else:
+            train_indexes = np.random.choice(train_indexes, size=(total_size,), replace=False)
+
+    subsets_by_id = {index: "train" for index in train_indexes}
+
+    if dev_size == test_size == 0:
+        return subsets_by_id
+
+    dev_indexes = np.random.choice(train_indexes, size=(dev_size,), replace=False)
+
+    for dev_index in dev_indexes:
+        subsets_by_id[dev_index] = "dev"
+
+    remaining_train_indexes = np.asarray([i for i in train_indexes if i not in dev_indexes])
+
+    test_indexes = np.random.choice(remaining_train_indexes, size=(test_size,), replace=False)
+
+    for test_index in test_indexes:
+        subsets_by_id[test_index] = "test"
+
+    return subsets_by_id
+
+
+@pytest.mark.parametrize("num_examples, train_size, dev_size, test_size, dry_run",
+                         [(1000, None, 100, 100, False),
+                          (1000, 200, 100, 100, False),
+                          (1000, 100, 2, 2, True),
+                          (50, None, 0, 0, False),
+                          (50, 10, 0, 0, False)])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_split_same_as_original(num_examples, train_size, dev_size, test_size, dry_run, seed):
+    np.random.seed(seed)
+    expected = decide_on_split_original(num_examples=num_examples, train_size=train_size, dev_size=dev_size,
+                                        test_size=test_size, dry_run=dry_run)
+
+    np.random.seed(seed)
+    assignment = decide_on_split(num_examples=num_examples, train_size=train_size, dev_size=dev_size,
+                                 test_size=test_size, dry_run=dry_run)
+
+    actual = {index: SUBSETS[subset_index] for index, subset_index in enumerate(assignment)
+              if subset_index != NOT_SELECTED}
+
+    assert actual == expected
+
+
+def test_hash_split_is_stable():
+    keys = ["video.%d.%d" % (video, subtitle) for video in range(50) for subtitle in range(20)]
+
+    assignment = decide_on_split_by_hash(example_keys=keys, train_size=None, dev_fraction=0.1,
+                                         test_fraction=0.1, seed=1)
+
+    # adding videos does not change the subsets of existing examples
+    more_keys = keys + ["other.%d" % index for index in range(500)]
+
+    more_assignment = decide_on_split_by_hash(example_keys=more_keys, train_size=None, dev_fraction=0.1,
+                                              test_fraction=0.1, seed=1)
+
+    np.testing.assert_array_equal(more_assignment[:len(keys)], assignment)
+
+    for subset_index, fraction in enumerate([0.8, 0.1, 0.1]):
+        assert abs(np.mean(assignment == subset_index) - fraction) < 0.05
+
+
+def test_hash_split_train_size():
+    keys = ["video.%d" % index for index in range(1000)]
+
+    assignment = decide_on_split_by_hash(example_keys=keys, train_size=100, dev_fraction=0.1,
+                                         test_fraction=0.1, seed=1)
+
+    assert np.count_nonzero(assignment == SUBSETS.index("train")) == 100
+    assert np.count_nonzero(assignment == SUBSETS.index("dev")) > 0
+    assert np.count_nonzero(assignment == SUBSETS.index("test")) > 0
+
+
+@pytest.mark.parametrize("dev_fraction, test_fraction", [(-0.1, 0.1), (0.1, -0.1), (0.5, 0.5), (1.0, 0.0)])
+def test_hash_split_invalid_fractions(dev_fraction, test_fraction):
+    with pytest.raises(AssertionError):
+        decide_on_split_by_hash(example_keys=["a", "b"], train_size=None, dev_fraction=dev_fraction,
+                                test_fraction=test_fraction, seed=1)
+
+
+def test_missing_pose_archive_same_as_original(synthetic_corpus, tmp_path):
+    download_sub = os.path.join(str(tmp_path), "corpus")
+    shutil.copytree(synthetic_corpus, download_sub)
+
+    # the subtitles of this video still count in the split, but the video is not converted
+    pose_dir = os.path.join(download_sub, "openpose")
+    os.remove(os.path.join(pose_dir, sorted(os.listdir(pose_dir))[0]))
+
+    output_dir = os.path.join(str(tmp_path), "output")
+
+    run_converter(download_sub, output_dir, "--pose-type", "openpose")
+
+    # the original conversion: examples of all subtitles are split, and numbered in the order of pose files
+
+    framerate_by_id = read_video_framerates(video_dir=os.path.join(download_sub, "videos"))
+    subtitles_by_id, _ = read_subtitles(subtitle_dir=os.path.join(download_sub, "subtitles"),
+                                        framerate_by_id=framerate_by_id, target_fps=None)
+
+    num_examples = sum([len(subtitles) for subtitles in subtitles_by_id.values()])
+
+    np.random.seed(1)
+    subsets_by_id = decide_on_split_original(num_examples=num_examples, train_size=None, dev_size=3, test_size=3,
+                                             dry_run=False)
+
+    expected_texts = {subset: [] for subset in SUBSETS}
+
+    example_id = 0
+
+    for filename in os.listdir(pose_dir):
+        for subtitle in subtitles_by_id[get_file_id(filename)]:
+            expected_texts[subsets_by_id[example_id]].append(get_subtitle_content(subtitle))
+            example_id += 1
+
+    actual = read_converted(output_dir, "openpose")
+
+    for subset in SUBSETS:
+        assert actual[subset][0] == expected_texts[subset]
@@ -0,0 +1,49 @@
+import os
+import inspect
+
+import pytest
+
+import numpy as np
+
+from conftest import run_converter, read_converted, assert_same_converted, SUBSETS
+
+from convert_and_split_data import extract_parallel_examples_streaming
+
+
+def test_streaming_is_generator():
+    assert inspect.isgeneratorfunction(extract_parallel_examples_streaming)
+
+
+@pytest.mark.parametrize("pose_type", ["openpose", "mediapipe"])
+@pytest.mark.parametrize("target_fps_args", [[], ["--target-fps", "25"]])
+def test_streaming_same_as_entire_videos(synthetic_corpus, tmp_path, pose_type, target_fps_args):
+    entire_dir = os.path.join(str(tmp_path), "entire")
+    streaming_dir = os.path.join(str(tmp_path), "streaming")
+
+    run_converter(synthetic_corpus, entire_dir, "--pose-type", pose_type, "--resample-slices-only",
+                  *target_fps_args)
+    run_converter(synthetic_corpus, streaming_dir, "--pose-type", pose_type, "--max-resident-frames", "16",
+                  *target_fps_args)
+
+    assert_same_converted(expected=read_converted(entire_dir, pose_type),
+                          actual=read_converted(streaming_dir, pose_type))
+
+
+def test_streaming_normalized(synthetic_corpus, tmp_path):
+    entire_dir = os.path.join(str(tmp_path), "entire")
+    streaming_dir = os.path.join(str(tmp_path), "streaming")
+
+    run_converter(synthetic_corpus, entire_dir, "--pose-type", "openpose", "--normalize-poses", "--target-fps", "25",
+                  "--resample-slices-only")
+    run_converter(synthetic_corpus, streaming_dir, "--pose-type", "openpose", "--normalize-poses", "--target-fps",
+                  "25", "--max-resident-frames", "16")
+
+    expected = read_converted(entire_dir, "openpose")
+    actual = read_converted(streaming_dir, "openpose")
+
+    # normalization statistics are accumulated in a different order
+    for subset in SUBSETS:
+        assert actual[subset][0] == expected[subset][0]
+
+        for expected_array, actual_array in zip(expected[subset][1], actual[subset][1]):
+            np.testing.assert_allclose(actual_array, expected_array, rtol=1e-5, atol=1e-5)